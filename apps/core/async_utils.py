@@ -0,0 +1,95 @@
+"""
+Outils pour les vues asynchrones (déploiement ASGI).
+
+DRF 3.14 ne gère pas les vues `async def` : les vues asynchrones sont des vues
+Django simples qui réutilisent l'authentification de DRF et renvoient du JSON
+au même format que les vues synchrones.
+
+Le calcul des recommandations (CPU + ORM synchrone) ne doit pas bloquer la
+boucle d'événements : `run_in_pool` l'exécute dans un pool de threads dédié,
+borné par `ASYNC_SCORING_WORKERS`.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_SCORING_WORKERS', 2),
+                thread_name_prefix='async-scoring',
+            )
+    return _executor
+
+
+def _call_with_fresh_connection(func, *args, **kwargs):
+    # Threads du pool : pas de signal request_finished, on gère les connexions ici
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """Exécute une fonction synchrone (ORM, calcul) dans le pool sans bloquer la boucle."""
+    loop = asyncio.get_running_loop()
+    # Contexte copié comme asyncio.to_thread (instrumentation de la requête)
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _call_with_fresh_connection, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+def error_response(message, status, key='error'):
+    return JsonResponse({key: message}, status=status)
+
+
+def _authenticate(request):
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    return drf_request.user
+
+
+def async_api_view(view):
+    """
+    Décorateur des vues asynchrones : GET uniquement, utilisateur authentifié
+    (JWT, comme les vues DRF), réponses d'erreur au format DRF (`detail`).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return error_response(f'Méthode « {request.method} » non autorisée.', 405, key='detail')
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except APIException as e:
+            # Même corps que DRF (simplejwt renvoie un dict detail/code/messages)
+            if isinstance(e.detail, dict):
+                return JsonResponse(e.detail, status=e.status_code)
+            return error_response(str(e.detail), e.status_code, key='detail')
+        if not user.is_authenticated:
+            response = error_response(
+                "Informations d'authentification non fournies.", 401, key='detail'
+            )
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,42 @@
+"""
+Versions asynchrones des vues de lecture les plus sollicitées (mode ASGI).
+
+Mêmes URL et mêmes réponses que les vues synchrones de views.py ; elles ne
+sont routées que si `SERVE_ASGI` est actif (voir apps/core/urls.py).
+"""
+from django.http import JsonResponse
+
+from . import stats
+from .async_utils import async_api_view, run_in_pool
+from .serializers import EpreuveListSerializer
+from .views import visible_epreuves
+
+
+async def _list_epreuves(request, ordering):
+    queryset = (
+        visible_epreuves(request.user)
+        .only(*EpreuveListSerializer.queryset_fields)
+        .order_by(ordering)[:10]
+    )
+    epreuves = [ep async for ep in queryset]
+    # Tous les champs sont chargés : la sérialisation ne fait aucune requête
+    serializer = EpreuveListSerializer(epreuves, many=True, context={'request': request})
+    return JsonResponse(serializer.data, safe=False)
+
+
+@async_api_view
+async def populaires(request):
+    """GET /api/epreuves/populaires/"""
+    return await _list_epreuves(request, '-nb_telechargements')
+
+
+@async_api_view
+async def recentes(request):
+    """GET /api/epreuves/recentes/"""
+    return await _list_epreuves(request, '-created_at')
+
+
+@async_api_view
+async def dashboard_stats(request):
+    """GET /api/admin/stats/"""
+    return JsonResponse(await run_in_pool(stats.dashboard, request.user))
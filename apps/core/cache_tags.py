@@ -0,0 +1,86 @@
+"""
+Invalidation du cache par générations (tags), compatible avec tout backend Django.
+
+Chaque tag (`user:12`, `epreuve:34`, `modele`) a un numéro de génération stocké
+dans le cache. Les clés des entrées mises en cache incluent les générations
+des tags dont elles dépendent :
+
+    lite_reco:user_12:k_10:g1718000000123.1718000004567
+
+Invalider un tag revient à incrémenter sa génération : les anciennes entrées
+ne sont plus jamais lues et expirent d'elles-mêmes. Pas besoin de
+`delete_pattern` (propre à django-redis), ce qui permet des TTL longs tout en
+reflétant immédiatement la nouvelle activité d'un utilisateur.
+
+Les générations sont lues dans l'alias `CACHE_TAGS_ALIAS` : avec plusieurs
+workers, il doit être partagé entre processus (Redis, base de données).
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Tag global : version du modèle et du catalogue
+MODELE = 'modele'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def epreuve_tag(epreuve_id):
+    return f'epreuve:{epreuve_id}'
+
+
+def _tags_cache():
+    return caches[getattr(settings, 'CACHE_TAGS_ALIAS', 'default')]
+
+
+def _version_key(tag):
+    return f'tag_gen:{tag}'
+
+
+def _new_generation():
+    # Valeur horodatée : si une génération est évincée du cache, la nouvelle
+    # ne peut pas coïncider avec une ancienne et ressusciter des entrées périmées
+    return int(time.time() * 1000)
+
+
+def get_generations(tags):
+    """Générations courantes des tags (créées à la volée si absentes)."""
+    tags_cache = _tags_cache()
+    keys = {tag: _version_key(tag) for tag in tags}
+    found = tags_cache.get_many(list(keys.values()))
+    generations = {}
+    for tag, key in keys.items():
+        if key in found:
+            generations[tag] = found[key]
+        else:
+            generation = _new_generation()
+            # add() : ne pas écraser une génération posée entre-temps par un autre processus
+            if not tags_cache.add(key, generation, None):
+                generation = tags_cache.get(key, generation)
+            generations[tag] = generation
+    return generations
+
+
+def tagged_key(base_key, tags):
+    """Clé de cache versionnée par les générations des tags."""
+    generations = get_generations(tags)
+    return f"{base_key}:g{'.'.join(str(generations[tag]) for tag in tags)}"
+
+
+def invalidate(*tags):
+    """Invalide toutes les entrées dépendant de ces tags."""
+    tags_cache = _tags_cache()
+    for tag in tags:
+        key = _version_key(tag)
+        try:
+            tags_cache.incr(key)
+        except ValueError:
+            # Génération absente (jamais lue ou évincée) : en poser une nouvelle
+            tags_cache.set(key, _new_generation(), None)
+    logger.debug(f"Cache invalidé pour {', '.join(tags)}")
@@ -0,0 +1,187 @@
+"""
+Export colonnaire (Parquet) pour les pipelines ML.
+
+Un fichier par table, typé et compressé (zstd). Les interactions sont
+partitionnées par mois (partitionnement Hive) :
+
+    export/
+        utilisateurs.parquet
+        epreuves.parquet
+        evaluations.parquet
+        commentaires.parquet
+        interactions/mois=2024-09/part-0.parquet
+        interactions/mois=2024-10/part-0.parquet
+
+Les lecteurs (pyarrow, pandas, `NCFDataLoader.load_data_from_parquet`) ne lisent
+que les colonnes demandées et ignorent les partitions exclues par les filtres :
+
+    read_table('export', 'interactions',
+               columns=['user_id', 'epreuve_id', 'action_type', 'timestamp'],
+               filters=[('mois', '>=', '2024-09')])
+
+Les colonnes à faible cardinalité (niveau, matière, type d'action...) sont
+encodées en dictionnaire : catégories côté pandas.
+
+pyarrow est optionnel (voir `is_available()`) et n'est importé qu'au premier
+export : les workers web qui n'exportent jamais ne le chargent pas.
+"""
+import importlib.util
+import os
+import shutil
+import zipfile
+from itertools import groupby
+
+from .exports import TABLES, ZipSink, iter_rows
+
+PARTITIONED = {'interactions': ('mois', 'timestamp')}
+
+COMPRESSION = 'zstd'
+
+# Lignes par groupe de lignes Parquet (unité de lecture et de filtrage)
+ROW_GROUP_SIZE = 50_000
+
+
+def is_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _pyarrow():
+    if not is_available():
+        raise RuntimeError("pyarrow n'est pas installé : export Parquet indisponible")
+    import pyarrow
+    import pyarrow.parquet
+
+    return pyarrow, pyarrow.parquet
+
+
+def _schemas():
+    pa, _ = _pyarrow()
+    ts = pa.timestamp('us', tz='UTC')
+    category = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'utilisateurs': pa.schema([
+            ('id', pa.int64()), ('username', pa.string()), ('email', pa.string()),
+            ('first_name', pa.string()), ('last_name', pa.string()),
+            ('niveau', category), ('filiere', category), ('date_joined', ts),
+            ('is_staff', pa.bool_()), ('is_active', pa.bool_()),
+        ]),
+        'epreuves': pa.schema([
+            ('id', pa.int64()), ('titre', pa.string()), ('matiere', category),
+            ('niveau', category), ('type_epreuve', category), ('annee_academique', category),
+            ('description', pa.string()), ('fichier_pdf', pa.string()),
+            ('taille_fichier', pa.int64()), ('nb_pages', pa.int32()),
+            ('nb_vues', pa.int32()), ('nb_telechargements', pa.int32()),
+            ('note_moyenne_difficulte', pa.float64()), ('note_moyenne_pertinence', pa.float64()),
+            ('created_at', ts), ('updated_at', ts),
+        ]),
+        'interactions': pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()), ('epreuve_id', pa.int64()),
+            ('action_type', category), ('session_duration', pa.int32()), ('timestamp', ts),
+        ]),
+        'evaluations': pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()), ('epreuve_id', pa.int64()),
+            ('note_difficulte', pa.int8()), ('note_pertinence', pa.int8()),
+            ('created_at', ts), ('updated_at', ts),
+        ]),
+        'commentaires': pa.schema([
+            ('id', pa.int64()), ('user_id', pa.int64()), ('epreuve_id', pa.int64()),
+            ('contenu', pa.string()), ('note_utilite', pa.int8()), ('recommande', pa.bool_()),
+            ('niveau_difficulte_ressenti', pa.int8()), ('created_at', ts), ('updated_at', ts),
+        ]),
+    }
+
+
+def _batches(rows, schema, size):
+    """Groupes de lignes (tuples) convertis en RecordBatch typés."""
+    pa, _ = _pyarrow()
+    columns = [[] for _ in schema]
+    count = 0
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+        count += 1
+        if count >= size:
+            yield pa.record_batch(columns, schema=schema)
+            columns = [[] for _ in schema]
+            count = 0
+    if count:
+        yield pa.record_batch(columns, schema=schema)
+
+
+def _table_rows(table, chunk_size):
+    """Lignes de la table : [(chemin relatif, itérateur de lignes)]."""
+    if table not in PARTITIONED:
+        yield f'{table}.parquet', iter_rows(table, chunk_size)
+        return
+    key, field = PARTITIONED[table]
+    # Tri par date : chaque mois est écrit d'une traite, un fichier à la fois
+    rows = iter_rows(table, chunk_size, order_by=(field, 'id'))
+    position = TABLES[table].index(field)
+    for month, group in groupby(rows, key=lambda row: row[position].strftime('%Y-%m')):
+        yield f'{table}/{key}={month}/part-0.parquet', group
+
+
+def iter_write(where, rows, schema, row_group_size=None):
+    """Écrit des lignes dans un fichier Parquet (chemin ou fichier ouvert), groupe par groupe."""
+    _, pq = _pyarrow()
+    with pq.ParquetWriter(where, schema, compression=COMPRESSION) as writer:
+        for batch in _batches(rows, schema, row_group_size or ROW_GROUP_SIZE):
+            writer.write_batch(batch)
+            yield batch.num_rows
+
+
+def write_table(where, rows, schema, row_group_size=None):
+    """Écrit un fichier Parquet ; renvoie le nombre de lignes."""
+    return sum(iter_write(where, rows, schema, row_group_size))
+
+
+def write_dataset(output_dir, tables=None, chunk_size=None):
+    """
+    Écrit l'export Parquet dans `output_dir`.
+
+    Returns:
+        dict: {table: nombre de lignes}
+    """
+    schemas = _schemas()
+    counts = {}
+    for table in tables or TABLES:
+        counts[table] = 0
+        if table in PARTITIONED:
+            # Pas de partitions d'un export précédent mélangées au nouveau
+            shutil.rmtree(os.path.join(output_dir, table), ignore_errors=True)
+        for relative_path, rows in _table_rows(table, chunk_size):
+            path = os.path.join(output_dir, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            counts[table] += write_table(path, rows, schemas[table])
+    return counts
+
+
+def iter_zip(tables=None, chunk_size=None):
+    """Même arborescence dans une archive ZIP produite en flux (API d'export)."""
+    schemas = _schemas()
+    sink = ZipSink()
+    # Parquet est déjà compressé : entrées stockées telles quelles
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for table in tables or TABLES:
+            for relative_path, rows in _table_rows(table, chunk_size):
+                with archive.open(relative_path, 'w', force_zip64=True) as entry:
+                    for _ in iter_write(entry, rows, schemas[table]):
+                        yield sink.drain()
+                yield sink.drain()
+    yield sink.drain()
+
+
+def read_table(path, table, columns=None, filters=None):
+    """
+    Lit une table d'un export Parquet (pyarrow.Table).
+
+    Args:
+        path: dossier de l'export
+        columns: colonnes à lire (défaut : toutes)
+        filters: filtres pyarrow, appliqués aux partitions puis aux groupes de lignes
+    """
+    _, pq = _pyarrow()
+    target = os.path.join(path, table)
+    if not os.path.isdir(target):
+        target += '.parquet'
+    return pq.read_table(target, columns=columns, filters=filters)
@@ -0,0 +1,223 @@
+"""
+Service des téléchargements de PDF.
+
+- Requêtes conditionnelles : l'ETag est dérivé de `hash_fichier`, un
+  `If-None-Match` correspondant reçoit un 304 sans relire le fichier.
+- Requêtes partielles : un en-tête `Range: bytes=a-b` reçoit un 206 avec la
+  seule plage demandée (chargement progressif par PDF.js).
+- Délégation au proxy : avec `DOWNLOAD_OFFLOAD = 'x-accel-redirect'` (nginx) ou
+  `'x-sendfile'` (Apache, lighttpd), Django ne renvoie que les en-têtes et le
+  proxy se charge du transfert (plages comprises) : le worker est libéré tout
+  de suite.
+- Statistiques : le compteur et l'interaction DOWNLOAD sont enregistrés dans un
+  thread à part, sans attendre la fin du transfert. Les requêtes de plages
+  suivantes (PDF.js) et les 304 ne comptent pas comme un nouveau téléchargement.
+"""
+import logging
+import mimetypes
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+
+from . import metrics
+from .storage import etag_for
+
+logger = logging.getLogger(__name__)
+
+# Taille des blocs envoyés pour une réponse partielle
+CHUNK_SIZE = 64 * 1024
+
+OFFLOAD_ACCEL = 'x-accel-redirect'
+OFFLOAD_SENDFILE = 'x-sendfile'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='download-stats')
+    return _executor
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# PLAGES (RFC 7233)
+# ═══════════════════════════════════════════════════════════════════════════
+
+def parse_range(header, size):
+    """
+    Interprète un en-tête Range portant sur une seule plage d'octets.
+
+    Returns:
+        tuple | None: (début, fin) inclusifs, ou None si l'en-tête est absent,
+        mal formé ou multi-plages (le fichier entier est alors servi)
+
+    Raises:
+        RangeNotSatisfiable: plage hors du fichier
+    """
+    match = _RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def range_start(request):
+    """Premier octet demandé par la requête (0 sans en-tête Range)."""
+    match = _RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return 0
+    return int(match.group(1)) if match.group(1) else None
+
+
+def _iter_range(f, start, length):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RÉPONSES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _offload_response(field_file, mode):
+    response = HttpResponse()
+    if mode == OFFLOAD_ACCEL:
+        prefix = getattr(settings, 'DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(field_file.name)
+    else:
+        response['X-Sendfile'] = field_file.path
+    return response
+
+
+def _file_response(request, field_file, etag):
+    size = field_file.size
+    requested = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == etag:
+        try:
+            requested = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    f = field_file.storage.open(field_file.name, 'rb')
+    if requested is None:
+        # Fichier entier : FileResponse passe par wsgi.file_wrapper (sendfile)
+        return FileResponse(f)
+
+    start, end = requested
+    response = StreamingHttpResponse(_iter_range(f, start, end - start + 1), status=206)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve_pdf(request, field_file, filename, file_hash='', disposition='attachment'):
+    """
+    Réponse de téléchargement d'un PDF stocké localement.
+
+    Gère If-None-Match (304), Range/If-Range (206/416) et la délégation au proxy
+    selon `DOWNLOAD_OFFLOAD`.
+    """
+    etag = etag_for(file_hash)
+    if etag:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+    mode = getattr(settings, 'DOWNLOAD_OFFLOAD', '')
+    if mode in (OFFLOAD_ACCEL, OFFLOAD_SENDFILE):
+        response = _offload_response(field_file, mode)
+        metrics.DOWNLOAD_BYTES.inc(field_file.size, mode='offload')
+    else:
+        response = _file_response(request, field_file, etag)
+        if response.status_code == 416:
+            return response
+        metrics.DOWNLOAD_BYTES.inc(int(response.get('Content-Length') or 0), mode='django')
+
+    content_type, _ = mimetypes.guess_type(filename)
+    response['Content-Type'] = content_type or 'application/pdf'
+    response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    # Toujours revalider : le fichier d'une épreuve peut être remplacé, mais un
+    # ETag identique permet de répondre 304 sans renvoyer le contenu
+    response['Cache-Control'] = 'private, no-cache'
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# STATISTIQUES
+# ═══════════════════════════════════════════════════════════════════════════
+
+def counts_as_download(request, response):
+    """
+    Un téléchargement est compté une seule fois : pas pour un HEAD, un 304 ou
+    les requêtes de plages suivantes qu'émet PDF.js.
+    """
+    if request.method != 'GET' or response.status_code not in (200, 206):
+        return False
+    return range_start(request) == 0
+
+
+def _record(epreuve_id, user_id):
+    from .models import Epreuve, Interaction
+
+    Epreuve.objects.filter(pk=epreuve_id).update(nb_telechargements=F('nb_telechargements') + 1)
+    Interaction.objects.create(user_id=user_id, epreuve_id=epreuve_id, action_type='DOWNLOAD')
+
+
+def _record_in_worker(epreuve_id, user_id):
+    close_old_connections()
+    try:
+        _record(epreuve_id, user_id)
+    except Exception as e:
+        logger.error(f"Enregistrement du téléchargement {epreuve_id} impossible: {e}")
+    finally:
+        close_old_connections()
+
+
+def record_download(epreuve_id, user_id):
+    """Incrémente le compteur et crée l'interaction DOWNLOAD sans bloquer la réponse."""
+    if not getattr(settings, 'DOWNLOAD_STATS_ASYNC', True):
+        _record(epreuve_id, user_id)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_record_in_worker, epreuve_id, user_id))
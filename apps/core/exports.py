@@ -0,0 +1,249 @@
+"""
+Export des données en flux (API d'administration et commande export_data).
+
+Les lignes sont lues par lots avec `QuerySet.iterator(chunk_size)` (curseur
+côté serveur sous PostgreSQL) et encodées au fil de l'eau : la mémoire
+utilisée ne dépend pas de la taille des tables, et les premiers octets
+partent tout de suite (pas de timeout gunicorn sur un export long).
+
+Formats :
+    json    document unique {export_info, utilisateurs: [...], ...}, lu par import_data
+    ndjson  une ligne {"table": ..., "data": {...}} par enregistrement
+    csv     un CSV (UTF-8 avec BOM pour Excel) ; plusieurs tables → archive ZIP
+            écrite en flux (descripteurs de données, pas de retour en arrière)
+    parquet archive ZIP de l'export colonnaire (apps/core/columnar.py)
+
+Tout format texte peut être compressé en gzip (`compress=True`).
+"""
+import csv
+import json
+import logging
+import zipfile
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+EXPORT_VERSION = '1.0'
+EXPORT_BASENAME = 'banque_epreuves_export'
+
+# Colonnes exportées par table (jamais les mots de passe ni le texte extrait)
+TABLES = {
+    'utilisateurs': (
+        'id', 'username', 'email', 'first_name', 'last_name',
+        'niveau', 'filiere', 'date_joined', 'is_staff', 'is_active',
+    ),
+    'epreuves': (
+        'id', 'titre', 'matiere', 'niveau', 'type_epreuve',
+        'annee_academique', 'description',
+        'fichier_pdf', 'taille_fichier', 'nb_pages',
+        'nb_vues', 'nb_telechargements',
+        'note_moyenne_difficulte', 'note_moyenne_pertinence',
+        'created_at', 'updated_at',
+    ),
+    'interactions': (
+        'id', 'user_id', 'epreuve_id',
+        'action_type', 'session_duration', 'timestamp',
+    ),
+    'evaluations': (
+        'id', 'user_id', 'epreuve_id',
+        'note_difficulte', 'note_pertinence', 'created_at', 'updated_at',
+    ),
+    'commentaires': (
+        'id', 'user_id', 'epreuve_id', 'contenu',
+        'note_utilite', 'recommande', 'niveau_difficulte_ressenti',
+        'created_at', 'updated_at',
+    ),
+}
+
+FORMATS = ('json', 'ndjson', 'csv', 'parquet')
+
+# Taille des morceaux envoyés au client
+FLUSH_BYTES = 64 * 1024
+
+
+def _model(table):
+    from django.contrib.auth import get_user_model
+
+    from .models import Commentaire, Epreuve, Evaluation, Interaction
+
+    return {
+        'utilisateurs': get_user_model(),
+        'epreuves': Epreuve,
+        'interactions': Interaction,
+        'evaluations': Evaluation,
+        'commentaires': Commentaire,
+    }[table]
+
+
+def iter_rows(table, chunk_size=None, order_by=('id',)):
+    """Tuples de la table (colonnes de TABLES[table]), lus par lots."""
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    queryset = _model(table).objects.order_by(*order_by).values_list(*TABLES[table])
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, cls=DjangoJSONEncoder)
+
+
+# ════════════════════════════════════════════════════════
+# Encodeurs (générateurs de str)
+# ════════════════════════════════════════════════════════
+
+def iter_json(tables, chunk_size=None):
+    yield '{"export_info": ' + _dumps({'version': EXPORT_VERSION, 'tables': list(tables)})
+    for table in tables:
+        columns = TABLES[table]
+        yield f',\n"{table}": ['
+        separator = '\n'
+        for row in iter_rows(table, chunk_size):
+            yield separator + _dumps(dict(zip(columns, row)))
+            separator = ',\n'
+        yield '\n]'
+    yield '}\n'
+
+
+def iter_ndjson(tables, chunk_size=None):
+    for table in tables:
+        columns = TABLES[table]
+        for row in iter_rows(table, chunk_size):
+            yield _dumps({'table': table, 'data': dict(zip(columns, row))}) + '\n'
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : writerow() renvoie la ligne formatée."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(table, chunk_size=None):
+    writer = csv.writer(_Echo(), quoting=csv.QUOTE_MINIMAL)
+    # BOM UTF-8 pour compatibilité Excel
+    yield '\ufeff' + writer.writerow(TABLES[table])
+    for row in iter_rows(table, chunk_size):
+        yield writer.writerow(['' if v is None else str(v) for v in row])
+
+
+# ════════════════════════════════════════════════════════
+# Assemblage en octets
+# ════════════════════════════════════════════════════════
+
+def encode(pieces, flush_bytes=FLUSH_BYTES):
+    """Regroupe les fragments texte en morceaux UTF-8 d'environ `flush_bytes` octets."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= flush_bytes:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+class ZipSink:
+    """Destination non « seekable » de ZipFile : les octets écrits sont récupérés par drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(tables, chunk_size=None):
+    """Archive ZIP d'un CSV par table, produite morceau par morceau."""
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for table in tables:
+            # force_zip64 : taille inconnue à l'ouverture de l'entrée
+            with archive.open(f'{table}.csv', 'w', force_zip64=True) as entry:
+                for data in encode(iter_csv(table, chunk_size)):
+                    entry.write(data)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+    yield sink.drain()
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _logged(chunks, label):
+    # Une erreur en cours de flux ne peut plus devenir une réponse 500 : la tracer
+    try:
+        yield from chunks
+    except Exception:
+        logger.exception(f"Export {label} interrompu")
+        raise
+
+
+def stream(fmt='json', tables=None, compress=False, chunk_size=None):
+    """
+    Export en flux.
+
+    Args:
+        fmt: 'json', 'ndjson', 'csv' ou 'parquet'
+        tables: noms de tables (défaut : toutes)
+        compress: compresser en gzip (ignoré pour une archive ZIP)
+
+    Returns:
+        tuple: (itérateur d'octets, content_type, nom de fichier)
+    """
+    tables = list(tables or TABLES)
+    if fmt == 'parquet':
+        from . import columnar
+
+        chunks = columnar.iter_zip(tables, chunk_size)
+        content_type, filename = 'application/zip', f'{EXPORT_BASENAME}_parquet.zip'
+        compress = False
+    elif fmt == 'csv' and len(tables) > 1:
+        chunks = iter_zip(tables, chunk_size)
+        content_type, filename = 'application/zip', f'{EXPORT_BASENAME}.zip'
+        compress = False
+    elif fmt == 'csv':
+        chunks = encode(iter_csv(tables[0], chunk_size))
+        content_type, filename = 'text/csv; charset=utf-8', f'{tables[0]}.csv'
+    elif fmt == 'ndjson':
+        chunks = encode(iter_ndjson(tables, chunk_size))
+        content_type, filename = 'application/x-ndjson', f'{EXPORT_BASENAME}.ndjson'
+    else:
+        chunks = encode(iter_json(tables, chunk_size))
+        content_type, filename = 'application/json', f'{EXPORT_BASENAME}.json'
+
+    if compress:
+        chunks = gzip_stream(chunks)
+        content_type, filename = 'application/gzip', f'{filename}.gz'
+    return _logged(chunks, filename), content_type, filename
+
+
+def write_file(path, chunks):
+    """Écrit un flux d'export dans un fichier ; renvoie le nombre d'octets."""
+    total = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            total += len(chunk)
+    return total
@@ -0,0 +1,252 @@
+"""
+Extraction en arrière-plan des métadonnées des PDF (nombre de pages, texte).
+
+L'extraction ne se fait jamais pendant la requête d'upload : `schedule_extraction`
+soumet le travail à un petit pool de threads une fois la transaction validée.
+Le PDF est lu depuis le storage par blocs (copie dans un fichier temporaire
+pour les storages distants comme Cloudinary), puis analysé page par page depuis
+le fichier ouvert, avec une borne sur la quantité de texte conservée.
+
+La commande `manage.py extract_pdf_metadata` traite le catalogue existant en
+parallèle avec un pool de processus.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf absent : l'extraction est désactivée
+    PdfReader = None
+
+# Texte conservé au maximum par épreuve (le reste des pages est ignoré)
+MAX_TEXT_LENGTH = 500_000
+
+# Taille des blocs lus depuis le storage
+CHUNK_SIZE = 256 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_available():
+    return PdfReader is not None
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PDF_EXTRACTION_WORKERS', 1),
+                thread_name_prefix='pdf-extraction',
+            )
+    return _executor
+
+
+def extract_from_path(path, max_text_length=MAX_TEXT_LENGTH):
+    """
+    Analyse un PDF local page par page.
+
+    Le lecteur reçoit le fichier ouvert (et non son chemin, que pypdf chargerait
+    entièrement en mémoire) : les objets sont lus à la demande. Les objets déjà
+    lus restent en cache dans le lecteur ; la mémoire croît donc avec les pages
+    analysées, dont le texte est borné par `max_text_length`.
+
+    Returns:
+        tuple: (nb_pages, texte) — le texte est tronqué à `max_text_length`
+    """
+    with open(path, 'rb') as stream:
+        reader = PdfReader(stream)
+        nb_pages = len(reader.pages)
+        parts = []
+        length = 0
+        for page in reader.pages:
+            if length >= max_text_length:
+                break
+            try:
+                text = page.extract_text() or ''
+            except Exception as e:
+                logger.debug(f"Page illisible dans {path}: {e}")
+                continue
+            # pypdf peut renvoyer des caractères NUL, refusés par PostgreSQL dans un champ texte
+            text = text.replace('\x00', '').strip()
+            if text:
+                parts.append(text[:max_text_length - length])
+                length += len(parts[-1]) + 1
+    return nb_pages, '\n'.join(parts)
+
+
+def extract_stored(name, max_text_length=MAX_TEXT_LENGTH):
+    """
+    Analyse un PDF du storage (copie locale temporaire si distant, supprimée
+    après analyse). Appelée dans les processus de `manage.py extract_pdf_metadata`.
+    """
+    with stored_copy(name) as path:
+        return extract_from_path(path, max_text_length)
+
+
+def pdf_storage():
+    """Storage des PDF des épreuves."""
+    from .models import Epreuve
+    return Epreuve._meta.get_field('fichier_pdf').storage
+
+
+def resolve_stored_path(storage, name):
+    """
+    Chemin local vers le fichier `name` d'un storage.
+
+    Storage local : chemin direct. Storage distant : copie par blocs dans un
+    fichier temporaire, à supprimer par l'appelant.
+
+    Returns:
+        tuple: (chemin, est_temporaire)
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        path = None
+    if path and os.path.exists(path):
+        return path, False
+
+    tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+    try:
+        with storage.open(name, 'rb') as src:
+            shutil.copyfileobj(src, tmp, CHUNK_SIZE)
+    except Exception:
+        tmp.close()
+        os.unlink(tmp.name)
+        raise
+    tmp.close()
+    return tmp.name, True
+
+
+@contextmanager
+def stored_copy(name, storage=None):
+    """Chemin local du PDF `name` (storage des épreuves par défaut), copie temporaire supprimée en sortie."""
+    path, is_temporary = resolve_stored_path(storage or pdf_storage(), name)
+    try:
+        yield path
+    finally:
+        if is_temporary:
+            os.unlink(path)
+
+
+@contextmanager
+def local_copy(field_file):
+    with stored_copy(field_file.name, field_file.storage) as path:
+        yield path
+
+
+def init_worker():
+    """
+    Initialisation des processus des commandes (ProcessPoolExecutor) : chaque
+    processus lit lui-même les PDF depuis le storage, copie comprise.
+    """
+    import django
+    django.setup()
+
+
+def extract_epreuve(epreuve):
+    """Extrait (nb_pages, texte) du PDF d'une épreuve, ou None en cas d'échec."""
+    if not epreuve.fichier_pdf:
+        return None
+    try:
+        with local_copy(epreuve.fichier_pdf) as path:
+            return extract_from_path(path)
+    except Exception as e:
+        logger.warning(f"Extraction impossible pour l'épreuve {epreuve.id}: {e}")
+        return None
+
+
+def save_results(results):
+    """
+    Écrit un lot de résultats en une seule requête (bulk_update) puis réindexe.
+    Si le lot est refusé, il est journalisé puis écrit épreuve par épreuve :
+    seules les épreuves en erreur sont ignorées. Retourne le nombre enregistré.
+
+    Args:
+        results (dict): {epreuve_id: (nb_pages, texte)}
+    """
+    from .models import Epreuve
+    from . import search
+
+    if not results:
+        return 0
+    epreuves = list(Epreuve.objects.filter(id__in=results.keys()).only(*search.INDEXED_FIELDS))
+    for ep in epreuves:
+        ep.nb_pages, ep.texte_extrait = results[ep.id]
+    try:
+        with transaction.atomic():
+            Epreuve.objects.bulk_update(epreuves, ['nb_pages', 'texte_extrait'], batch_size=100)
+    except DatabaseError as e:
+        logger.error(f"Lot de {len(epreuves)} extraction(s) refusé, enregistrement une à une: {e}")
+        saved = []
+        for ep in epreuves:
+            try:
+                with transaction.atomic():
+                    Epreuve.objects.bulk_update([ep], ['nb_pages', 'texte_extrait'])
+            except DatabaseError as e:
+                logger.error(f"Extraction de l'épreuve {ep.id} non enregistrée: {e}")
+                continue
+            saved.append(ep)
+        epreuves = saved
+    # bulk_update n'émet pas post_save : mise à jour explicite de l'index de recherche
+    search.index_epreuves(epreuves)
+    return len(epreuves)
+
+
+def process_epreuves(epreuve_ids, batch_size=20):
+    """Extrait et enregistre les métadonnées d'une liste d'épreuves (dans le thread courant)."""
+    from .models import Epreuve
+
+    results = {}
+    processed = 0
+    for ep in Epreuve.objects.filter(id__in=epreuve_ids).only('id', 'fichier_pdf'):
+        extracted = extract_epreuve(ep)
+        if extracted is not None:
+            results[ep.id] = extracted
+        if len(results) >= batch_size:
+            processed += save_results(results)
+            results = {}
+    processed += save_results(results)
+    return processed
+
+
+def _process_in_worker(epreuve_ids):
+    # Chaque thread du pool a sa propre connexion : ne pas garder de connexion périmée
+    close_old_connections()
+    try:
+        return process_epreuves(epreuve_ids)
+    finally:
+        close_old_connections()
+
+
+def schedule_extraction(*epreuve_ids):
+    """Planifie l'extraction après la validation de la transaction courante."""
+    if not is_available() or not epreuve_ids:
+        return
+    if not getattr(settings, 'PDF_EXTRACTION_ASYNC', True):
+        transaction.on_commit(lambda: process_epreuves(list(epreuve_ids)))
+        return
+
+    def _submit():
+        future = get_executor().submit(_process_in_worker, list(epreuve_ids))
+        future.add_done_callback(_log_failure)
+
+    transaction.on_commit(_submit)
+
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"Échec de l'extraction PDF en arrière-plan: {exc}")
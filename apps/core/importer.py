@@ -0,0 +1,308 @@
+"""
+Import en masse d'un export (commande import_data).
+
+Chaque table est chargée par lots `bulk_create` dans une seule transaction :
+un échec annule tout l'import. Les correspondances ancien ID → nouvel ID sont
+résolues par lot (une requête par lot, pas par ligne), le mot de passe par
+défaut est haché une seule fois, et les structures dérivées (moyennes des
+évaluations, compteurs du tableau de bord, index de recherche, cache des
+recommandations) sont recalculées une fois à la fin.
+
+Les dates de l'export (inscription, création, horodatage des interactions)
+sont conservées.
+
+Entrées acceptées (apps/core/exports.py, apps/core/columnar.py) :
+    fichier .json / .json.gz      document {utilisateurs: [...], epreuves: [...], ...}
+    fichier .ndjson / .ndjson.gz  {"table": ..., "data": {...}} par ligne, lu en flux
+    dossier                       export Parquet, lu par groupes de lignes
+"""
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby, islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Avg
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache_tags, search, stats, taxonomy
+from .exports import TABLES
+from .models import Commentaire, Epreuve, Evaluation, Interaction
+from .signals import derived_updates_suspended
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'password123'
+
+
+# ════════════════════════════════════════════════════════
+# Lecture des exports
+# ════════════════════════════════════════════════════════
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def read_records(path):
+    """
+    Enregistrements d'un export : itérateur de (table, dict), table par table
+    dans l'ordre des dépendances (utilisateurs et épreuves d'abord).
+
+    Raises:
+        FileNotFoundError, ValueError (JSON invalide)
+    """
+    if os.path.isdir(path):
+        return _read_parquet(path)
+    if path.endswith(('.ndjson', '.ndjson.gz')):
+        return _read_ndjson(path)
+    with _open_text(path) as f:
+        data = json.load(f)
+    return ((table, row) for table in TABLES for row in data.get(table, []))
+
+
+def _read_ndjson(path):
+    with _open_text(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['table'], record['data']
+
+
+def _read_parquet(path):
+    from . import columnar
+
+    for table in TABLES:
+        try:
+            data = columnar.read_table(path, table)
+        except FileNotFoundError:
+            continue
+        for batch in data.to_batches():
+            for row in batch.to_pylist():
+                yield table, row
+
+
+# ════════════════════════════════════════════════════════
+# Import
+# ════════════════════════════════════════════════════════
+
+def _datetime(value, default):
+    if isinstance(value, datetime):
+        return value
+    return (parse_datetime(value) if value else None) or default
+
+
+@contextmanager
+def explicit_dates(*models):
+    """
+    Désactive auto_now / auto_now_add le temps de l'import : bulk_create
+    écraserait sinon les dates de l'export par l'heure courante.
+    """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class BulkImporter:
+    """Charge un export dans la base ; `counts` donne les lignes traitées par table."""
+
+    def __init__(self, batch_size=1000, default_password=DEFAULT_PASSWORD, log=None):
+        self.batch_size = batch_size
+        self.default_password = default_password
+        self.log = log or (lambda message: None)
+        self.user_ids = {}
+        self.epreuve_ids = {}
+        self.evaluated_epreuves = set()
+        self.counts = dict.fromkeys(TABLES, 0)
+        self.skipped = dict.fromkeys(TABLES, 0)
+        self.now = timezone.now()
+        self._password_hash = None
+
+    def run(self, records, clear=False):
+        handlers = {
+            'utilisateurs': self._import_users,
+            'epreuves': self._import_epreuves,
+            'interactions': self._import_interactions,
+            'evaluations': self._import_evaluations,
+            'commentaires': self._import_commentaires,
+        }
+        with transaction.atomic(), derived_updates_suspended(), \
+                explicit_dates(User, Epreuve, Interaction, Evaluation, Commentaire):
+            if clear:
+                self._clear()
+            for table, group in groupby(records, key=lambda record: record[0]):
+                if table not in handlers:
+                    continue
+                for batch in _batched((row for _, row in group), self.batch_size):
+                    handlers[table](batch)
+                self.log(f"{table} : {self.counts[table]} importé(e)s")
+            self._finish()
+        # Après validation : les recommandations en cache reflètent l'ancien catalogue
+        cache_tags.invalidate(cache_tags.MODELE)
+        return self.counts
+
+    def _clear(self):
+        for model in (Commentaire, Evaluation, Interaction, Epreuve):
+            model.objects.all().delete()
+        User.objects.filter(is_superuser=False).delete()
+        self.log("données existantes supprimées")
+
+    # ── Tables ──
+
+    def _import_users(self, rows):
+        if self._password_hash is None:
+            # Un seul hachage (PBKDF2) pour tous les comptes importés
+            self._password_hash = make_password(self.default_password)
+
+        usernames = {row['username'] for row in rows}
+        known = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        new_users = {}
+        for row in rows:
+            if row['username'] in known or row['username'] in new_users:
+                continue
+            new_users[row['username']] = User(
+                username=row['username'],
+                email=row.get('email') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                password=self._password_hash,
+                niveau=row.get('niveau'),
+                filiere=row.get('filiere'),
+                is_staff=row.get('is_staff', False),
+                is_active=row.get('is_active', True),
+                date_joined=_datetime(row.get('date_joined'), self.now),
+                date_inscription=_datetime(row.get('date_joined'), self.now),
+            )
+        if new_users:
+            User.objects.bulk_create(new_users.values(), batch_size=self.batch_size)
+            # ID relus par nom d'utilisateur : indépendant du support de RETURNING
+            known.update(User.objects.filter(username__in=new_users).values_list('username', 'id'))
+        for row in rows:
+            self.user_ids[row['id']] = known[row['username']]
+        self.counts['utilisateurs'] += len(new_users)
+
+    def _import_epreuves(self, rows):
+        epreuves = [
+            Epreuve(
+                titre=row['titre'],
+                matiere=row['matiere'],
+                **taxonomy.fields(row['matiere']),
+                niveau=row['niveau'],
+                type_epreuve=row['type_epreuve'],
+                annee_academique=row.get('annee_academique') or '',
+                description=row.get('description') or '',
+                nb_vues=row.get('nb_vues') or 0,
+                nb_telechargements=row.get('nb_telechargements') or 0,
+                note_moyenne_difficulte=row.get('note_moyenne_difficulte') or 0,
+                note_moyenne_pertinence=row.get('note_moyenne_pertinence') or 0,
+                nb_pages=row.get('nb_pages') or 0,
+                taille_fichier=row.get('taille_fichier') or 0,
+                created_at=_datetime(row.get('created_at'), self.now),
+                updated_at=_datetime(row.get('updated_at'), self.now),
+            )
+            for row in rows
+        ]
+        # PostgreSQL et SQLite ≥ 3.35 renseignent les clés primaires créées
+        Epreuve.objects.bulk_create(epreuves, batch_size=self.batch_size)
+        for row, epreuve in zip(rows, epreuves):
+            self.epreuve_ids[row['id']] = epreuve.pk
+        search.index_epreuves(epreuves)
+        self.counts['epreuves'] += len(epreuves)
+
+    def _resolve(self, table, rows):
+        """Lignes dont l'utilisateur et l'épreuve ont été importés, avec leurs nouveaux ID."""
+        resolved = []
+        for row in rows:
+            user_id = self.user_ids.get(row['user_id'])
+            epreuve_id = self.epreuve_ids.get(row['epreuve_id'])
+            if user_id and epreuve_id:
+                resolved.append((row, user_id, epreuve_id))
+        self.skipped[table] += len(rows) - len(resolved)
+        self.counts[table] += len(resolved)
+        return resolved
+
+    def _import_interactions(self, rows):
+        Interaction.objects.bulk_create([
+            Interaction(
+                user_id=user_id,
+                epreuve_id=epreuve_id,
+                action_type=row['action_type'],
+                session_duration=row.get('session_duration'),
+                timestamp=_datetime(row.get('timestamp'), self.now),
+            )
+            for row, user_id, epreuve_id in self._resolve('interactions', rows)
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+
+    def _import_evaluations(self, rows):
+        evaluations = []
+        for row, user_id, epreuve_id in self._resolve('evaluations', rows):
+            evaluations.append(Evaluation(
+                user_id=user_id,
+                epreuve_id=epreuve_id,
+                note_difficulte=row['note_difficulte'],
+                note_pertinence=row['note_pertinence'],
+                created_at=_datetime(row.get('created_at'), self.now),
+                updated_at=_datetime(row.get('updated_at'), self.now),
+            ))
+            self.evaluated_epreuves.add(epreuve_id)
+        # Une évaluation par (utilisateur, épreuve) : les existantes sont conservées
+        Evaluation.objects.bulk_create(evaluations, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def _import_commentaires(self, rows):
+        Commentaire.objects.bulk_create([
+            Commentaire(
+                user_id=user_id,
+                epreuve_id=epreuve_id,
+                contenu=row['contenu'],
+                note_utilite=row.get('note_utilite'),
+                recommande=row.get('recommande'),
+                niveau_difficulte_ressenti=row.get('niveau_difficulte_ressenti'),
+                created_at=_datetime(row.get('created_at'), self.now),
+                updated_at=_datetime(row.get('updated_at'), self.now),
+            )
+            for row, user_id, epreuve_id in self._resolve('commentaires', rows)
+        ], batch_size=self.batch_size, ignore_conflicts=True)
+
+    # ── Structures dérivées ──
+
+    def _finish(self):
+        self._update_moyennes()
+        stats.reconcile()
+
+    def _update_moyennes(self):
+        """Moyennes des épreuves évaluées (Evaluation.update_epreuve_moyennes, en masse)."""
+        for epreuve_ids in _batched(sorted(self.evaluated_epreuves), self.batch_size):
+            moyennes = (
+                Evaluation.objects.filter(epreuve_id__in=epreuve_ids)
+                .values('epreuve_id')
+                .annotate(difficulte=Avg('note_difficulte'), pertinence=Avg('note_pertinence'))
+            )
+            Epreuve.objects.bulk_update([
+                Epreuve(
+                    id=row['epreuve_id'],
+                    note_moyenne_difficulte=row['difficulte'] or 0.0,
+                    note_moyenne_pertinence=row['pertinence'] or 0.0,
+                )
+                for row in moyennes
+            ], ['note_moyenne_difficulte', 'note_moyenne_pertinence'], batch_size=self.batch_size)
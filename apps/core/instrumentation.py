@@ -0,0 +1,344 @@
+"""
+Instrumentation des requêtes (optionnelle : INSTRUMENTATION_ENABLED).
+
+Pour chaque requête routée, `InstrumentationMiddleware` mesure :
+- le nombre et la durée des requêtes SQL (execute_wrapper posé sur chaque
+  connexion ouverte, y compris dans les threads du pool de scoring) ;
+- les succès / échecs des caches nommés (apps/core/tiered_cache.py) ;
+- le temps passé dans les prédicteurs (`timed('predictor')`) ;
+- la latence totale.
+
+Les mesures sont rangées dans un tampon circulaire en mémoire du processus
+(INSTRUMENTATION_BUFFER_SIZE dernières requêtes) et dans des totaux cumulés
+par vue. `summary()` les agrège par vue (percentiles sur la fenêtre du
+tampon) ; un résumé est écrit dans les logs toutes les
+INSTRUMENTATION_LOG_INTERVAL secondes et servi par /api/admin/metrics/.
+
+Une requête au-delà de son budget SQL (INSTRUMENTATION_QUERY_BUDGET, ou
+INSTRUMENTATION_QUERY_BUDGETS par nom de vue) ou plus lente que
+INSTRUMENTATION_SLOW_MS est signalée par un avertissement dans les logs.
+
+Les réponses portent les en-têtes `Server-Timing` (onglet réseau du
+navigateur) et `X-DB-Queries` (lu par `manage.py loadtest --url`).
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Mesures de la requête en cours."""
+
+    __slots__ = ('sql_count', 'sql_time', 'cache_hits', 'cache_misses', 'timers')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timers = {}
+
+
+def current():
+    """Mesures de la requête en cours (None hors requête ou instrumentation inactive)."""
+    return _current.get()
+
+
+def is_enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', False)
+
+
+# ════════════════════════════════════════════════════════
+# Points de mesure
+# ════════════════════════════════════════════════════════
+
+def _sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_time += time.perf_counter() - start
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_wrapper)
+
+
+def install():
+    """Pose le compteur SQL sur les connexions ouvertes et à venir."""
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_on_connection_created, dispatch_uid='instrumentation_sql')
+    for connection in connections.all(initialized_only=True):
+        _on_connection_created(None, connection)
+
+
+@contextmanager
+def collect():
+    """
+    Mesures du bloc, hors middleware (`manage.py loadtest` en processus). Le
+    contexte est recopié dans les threads du pool de scoring : leurs requêtes
+    SQL sont comptées aussi.
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def record_cache(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+@contextmanager
+def span(name):
+    """Cumule la durée du bloc dans le minuteur `name` de la requête en cours."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timers[name] = metrics.timers.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed(name):
+    """Décorateur : durée de la fonction ajoutée au minuteur `name`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ════════════════════════════════════════════════════════
+# Agrégation
+# ════════════════════════════════════════════════════════
+
+TOTAL_FIELDS = (
+    'requests', 'errors', 'over_budget', 'latency_s', 'sql_count', 'sql_s',
+    'cache_hits', 'cache_misses', 'predictor_s',
+)
+
+
+class Recorder:
+    """Tampon circulaire des dernières requêtes et totaux cumulés par vue."""
+
+    def __init__(self, size=2048):
+        # deque.append est atomique : pas de verrou sur le chemin des requêtes
+        self.samples = deque(maxlen=size)
+        self.totals = defaultdict(lambda: dict.fromkeys(TOTAL_FIELDS, 0))
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def add(self, view, status, latency, metrics, over_budget):
+        predictor = metrics.timers.get('predictor', 0.0)
+        self.samples.append((view, status, latency, metrics.sql_count, metrics.sql_time,
+                             metrics.cache_hits, metrics.cache_misses, predictor, over_budget))
+        with self._lock:
+            totals = self.totals[view]
+            totals['requests'] += 1
+            totals['errors'] += status >= 500
+            totals['over_budget'] += over_budget
+            totals['latency_s'] += latency
+            totals['sql_count'] += metrics.sql_count
+            totals['sql_s'] += metrics.sql_time
+            totals['cache_hits'] += metrics.cache_hits
+            totals['cache_misses'] += metrics.cache_misses
+            totals['predictor_s'] += predictor
+
+    def window(self):
+        """Mesures du tampon regroupées par vue."""
+        by_view = defaultdict(list)
+        for sample in list(self.samples):
+            by_view[sample[0]].append(sample)
+        return by_view
+
+    def cumulative(self):
+        with self._lock:
+            return {view: dict(totals) for view, totals in self.totals.items()}
+
+    def reset(self):
+        self.samples.clear()
+        with self._lock:
+            self.totals.clear()
+        self.started_at = time.time()
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summarize(samples):
+    latencies = sorted(s[2] for s in samples)
+    count = len(samples)
+    hits = sum(s[5] for s in samples)
+    lookups = hits + sum(s[6] for s in samples)
+    return {
+        'requests': count,
+        'errors': sum(1 for s in samples if s[1] >= 500),
+        'over_budget': sum(1 for s in samples if s[8]),
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'sql_mean': round(sum(s[3] for s in samples) / count, 1),
+        'sql_max': max(s[3] for s in samples),
+        'sql_ms_mean': round(sum(s[4] for s in samples) / count * 1000, 1),
+        'cache_hit_ratio': round(hits / lookups, 3) if lookups else None,
+        'predictor_ms_mean': round(sum(s[7] for s in samples) / count * 1000, 1),
+    }
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = Recorder(getattr(settings, 'INSTRUMENTATION_BUFFER_SIZE', 2048))
+    return _recorder
+
+
+def summary():
+    """Agrégats par vue : fenêtre du tampon (percentiles) et totaux depuis le démarrage."""
+    recorder = get_recorder()
+    window = recorder.window()
+    return {
+        'enabled': is_enabled(),
+        'since': recorder.started_at,
+        'window': {view: _summarize(samples) for view, samples in sorted(window.items())},
+        'totals': recorder.cumulative(),
+    }
+
+
+# ════════════════════════════════════════════════════════
+# Middleware
+# ════════════════════════════════════════════════════════
+
+def query_budget(view):
+    budgets = getattr(settings, 'INSTRUMENTATION_QUERY_BUDGETS', {})
+    return budgets.get(view, getattr(settings, 'INSTRUMENTATION_QUERY_BUDGET', 25))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match.route or match._func_path
+
+
+class InstrumentationMiddleware:
+    """Mesure chaque requête routée ; compatible WSGI et ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.recorder = get_recorder()
+        self.log_interval = getattr(settings, 'INSTRUMENTATION_LOG_INTERVAL', 300)
+        self.slow = getattr(settings, 'INSTRUMENTATION_SLOW_MS', 1000) / 1000
+        self.headers = getattr(settings, 'INSTRUMENTATION_HEADERS', True)
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+        install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, metrics, time.perf_counter() - start)
+        return response
+
+    def _finish(self, request, response, metrics, latency):
+        view = _view_name(request)
+        if view is None:
+            # Fichiers statiques, URL inconnues
+            return
+        budget = query_budget(view)
+        over_budget = metrics.sql_count > budget or latency > self.slow
+        self.recorder.add(view, response.status_code, latency, metrics, over_budget)
+
+        if over_budget:
+            logger.warning(
+                f"Budget dépassé {request.method} {request.path} ({view}) : "
+                f"{metrics.sql_count} requêtes SQL (budget {budget}), "
+                f"SQL {metrics.sql_time * 1000:.0f} ms, total {latency * 1000:.0f} ms"
+            )
+        if self.headers:
+            timings = [f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} requetes"']
+            timings += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in metrics.timers.items()]
+            timings.append(f'total;dur={latency * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(timings)
+            response['X-DB-Queries'] = str(metrics.sql_count)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if not self.log_interval or time.monotonic() - self._last_flush < self.log_interval:
+            return
+        # Un seul thread écrit le résumé
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            for view, stats in summary()['window'].items():
+                logger.info(
+                    f"{view} : {stats['requests']} req, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+                    f"SQL {stats['sql_mean']} (max {stats['sql_max']}), "
+                    f"cache {stats['cache_hit_ratio']}, prédicteur {stats['predictor_ms_mean']} ms, "
+                    f"{stats['over_budget']} hors budget"
+                )
+        finally:
+            self._flush_lock.release()
@@ -0,0 +1,474 @@
+"""
+Test de charge de l'API (commande loadtest).
+
+Rejoue un mélange pondéré de requêtes réalistes (profil de trafic) avec N
+utilisateurs virtuels authentifiés par JWT, puis rapporte par endpoint :
+débit, percentiles de latence, taux d'erreur et requêtes SQL par requête.
+
+Deux cibles :
+- `ClientTransport` : client de test Django dans le processus, sur la base
+  configurée ; les requêtes SQL sont comptées pour chaque requête HTTP.
+- `HttpTransport` : serveur démarré (runserver, gunicorn, Render) ; les
+  requêtes SQL ne sont connues que si le serveur renvoie l'en-tête X-DB-Queries.
+
+Les épreuves consultées sont tirées selon leur popularité (rang en nombre
+de vues), comme le trafic réel.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from itertools import accumulate
+from urllib.parse import urlencode, urlsplit
+
+# ════════════════════════════════════════════════════════
+# Profils de trafic
+# ════════════════════════════════════════════════════════
+
+# Poids relatifs des endpoints (voir ENDPOINTS)
+PROFILES = {
+    # Trafic courant : surtout de la consultation
+    'navigation': {
+        'liste': 20, 'liste_filtree': 15, 'recherche': 10, 'detail': 20,
+        'vue': 8, 'telechargement': 5, 'recommandations': 8, 'similaires': 8,
+        'evaluation': 3, 'commentaire': 3,
+    },
+    # Veille d'examens : téléchargements et recommandations en hausse
+    'examens': {
+        'liste': 10, 'liste_filtree': 20, 'recherche': 15, 'detail': 15,
+        'vue': 10, 'telechargement': 15, 'recommandations': 10, 'similaires': 5,
+        'evaluation': 0, 'commentaire': 0,
+    },
+    # Sans écriture : rejouable sur une base partagée
+    'lecture': {
+        'liste': 25, 'liste_filtree': 20, 'recherche': 15, 'detail': 20,
+        'recommandations': 10, 'similaires': 10,
+    },
+}
+DEFAULT_PROFILE = 'navigation'
+
+RECHERCHES = ['analyse', 'algebre', 'probabilites', 'examen', 'partiel', 'reseaux', 'mecanique', 'graphes']
+COMMENTAIRES = ['Tres utile pour reviser', 'Questions claires', 'Un peu long', 'Bonne preparation']
+
+
+def load_profile(name_or_path):
+    """Profil nommé (PROFILES) ou fichier JSON {endpoint: poids}."""
+    if name_or_path in PROFILES:
+        return dict(PROFILES[name_or_path])
+    with open(name_or_path, 'r', encoding='utf-8') as f:
+        weights = json.load(f)
+    unknown = set(weights) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Endpoints inconnus dans le profil : {', '.join(sorted(unknown))}")
+    return weights
+
+
+# ════════════════════════════════════════════════════════
+# Endpoints : (méthode, chemin, corps JSON)
+# ════════════════════════════════════════════════════════
+
+class Catalogue:
+    """Épreuves visibles par un utilisateur (selon son niveau), classées par popularité."""
+
+    def __init__(self, rows, pages=1):
+        self.pages = pages
+        self.ids = [row['id'] for row in rows]
+        self.with_pdf = [row['id'] for row in rows if row.get('apercu_url')]
+        self.matieres = sorted({row['matiere'] for row in rows if row.get('matiere')})
+        self.niveaux = sorted({row['niveau'] for row in rows if row.get('niveau')})
+        self._weights = [1.0 / rank for rank in range(1, len(self.ids) + 1)]
+
+    def epreuve(self, rng, ids=None):
+        if ids is None:
+            return rng.choices(self.ids, weights=self._weights)[0]
+        return rng.choice(ids)
+
+
+def _liste(catalogue, rng):
+    # Surtout la première page
+    page = min(rng.choice([1, 1, 1, 2, 3]), catalogue.pages)
+    return 'GET', f'/api/epreuves/?page={page}', None
+
+
+def _liste_filtree(catalogue, rng):
+    params = {'niveau': rng.choice(catalogue.niveaux), 'ordering': rng.choice(['-created_at', '-nb_vues'])}
+    if rng.random() < 0.5:
+        params['matiere'] = rng.choice(catalogue.matieres)
+    return 'GET', f'/api/epreuves/?{urlencode(params)}', None
+
+
+def _recherche(catalogue, rng):
+    return 'GET', f"/api/epreuves/?{urlencode({'search': rng.choice(RECHERCHES)})}", None
+
+
+def _detail(catalogue, rng):
+    return 'GET', f'/api/epreuves/{catalogue.epreuve(rng)}/', None
+
+
+def _vue(catalogue, rng):
+    return 'POST', f'/api/epreuves/{catalogue.epreuve(rng)}/view/', {}
+
+
+def _telechargement(catalogue, rng):
+    return 'GET', f'/api/epreuves/{catalogue.epreuve(rng, catalogue.with_pdf)}/download/', None
+
+
+def _recommandations(catalogue, rng):
+    return 'GET', '/api/recommendations/personalized/?top_k=10', None
+
+
+def _similaires(catalogue, rng):
+    return 'GET', f'/api/recommendations/similar/?epreuve_id={catalogue.epreuve(rng)}&top_k=5', None
+
+
+def _evaluation(catalogue, rng):
+    return 'POST', '/api/evaluations/', {
+        'epreuve': catalogue.epreuve(rng),
+        'note_difficulte': rng.randint(1, 5),
+        'note_pertinence': rng.randint(1, 5),
+    }
+
+
+def _commentaire(catalogue, rng):
+    return 'POST', '/api/commentaires/', {
+        'epreuve': catalogue.epreuve(rng),
+        'contenu': rng.choice(COMMENTAIRES),
+    }
+
+
+ENDPOINTS = {
+    'liste': _liste,
+    'liste_filtree': _liste_filtree,
+    'recherche': _recherche,
+    'detail': _detail,
+    'vue': _vue,
+    'telechargement': _telechargement,
+    'recommandations': _recommandations,
+    'similaires': _similaires,
+    'evaluation': _evaluation,
+    'commentaire': _commentaire,
+}
+
+
+# ════════════════════════════════════════════════════════
+# Transports
+# ════════════════════════════════════════════════════════
+
+class ClientTransport:
+    """
+    Client de test Django (un par thread), requêtes SQL comptées par
+    l'instrumentation : `CaptureQueriesContext` ne verrait que la connexion du
+    thread appelant, pas celles du pool de scoring des recommandations.
+    """
+
+    def __init__(self):
+        from django.conf import settings
+
+        from . import instrumentation
+
+        instrumentation.install()
+
+        self._local = threading.local()
+        hosts = [h for h in settings.ALLOWED_HOSTS if h != '*']
+        self.host = hosts[0].lstrip('.') if hosts else 'testserver'
+        self.secure = getattr(settings, 'SECURE_SSL_REDIRECT', False)
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            from django.test import Client
+
+            self._local.client = Client(raise_request_exception=False, HTTP_HOST=self.host)
+        return self._local.client
+
+    def request(self, method, path, body=None, token=None):
+        from . import instrumentation
+
+        extra = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        client = self._client()
+        with instrumentation.collect() as metrics:
+            start = time.perf_counter()
+            if method == 'GET':
+                response = client.get(path, secure=self.secure, **extra)
+            else:
+                response = client.generic(
+                    method, path, json.dumps(body or {}), 'application/json',
+                    secure=self.secure, **extra,
+                )
+            # Les réponses en flux ne sont complètes qu'une fois lues
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - start
+        # En-tête du middleware s'il est actif (ses mesures remplacent alors les nôtres)
+        count = int(response['X-DB-Queries']) if response.has_header('X-DB-Queries') else metrics.sql_count
+        return response.status_code, elapsed, count, content
+
+    def close(self):
+        from django.db import connections
+
+        connections.close_all()
+
+
+class HttpTransport:
+    """
+    Serveur HTTP(S) démarré ; une connexion persistante par thread.
+
+    keepalive=False ouvre une connexion par requête : runserver (wsgiref)
+    ajoute ~40 ms par réponse sur une connexion persistante.
+    """
+
+    def __init__(self, base_url, timeout=30, keepalive=True):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self._local = threading.local()
+
+    def _connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._local.connection = cls(self.netloc, timeout=self.timeout)
+        return self._local.connection
+
+    def request(self, method, path, body=None, token=None):
+        headers = {'Accept': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        start = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request(method, self.prefix + path, payload, headers)
+            response = connection.getresponse()
+            content = response.read()
+            if not self.keepalive:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            # Connexion perdue : recréée à la requête suivante
+            self._local.connection = None
+            return 0, time.perf_counter() - start, None, b''
+        elapsed = time.perf_counter() - start
+        queries = response.getheader('X-DB-Queries')
+        return response.status, elapsed, int(queries) if queries else None, content
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+# ════════════════════════════════════════════════════════
+# Exécution
+# ════════════════════════════════════════════════════════
+
+def obtain_token(transport, username, password):
+    status, _, _, content = transport.request('POST', '/api/token/', {'username': username, 'password': password})
+    if status != 200:
+        raise RuntimeError(f"Authentification refusée pour {username} (HTTP {status})")
+    return json.loads(content)['access']
+
+
+def fetch_catalogue(transport, token, pages=5):
+    """Les `pages` premières pages des épreuves les plus vues."""
+    rows = []
+    total_pages = 1
+    for page in range(1, pages + 1):
+        status, _, _, content = transport.request('GET', f'/api/epreuves/?ordering=-nb_vues&page={page}', token=token)
+        if status != 200:
+            break
+        data = json.loads(content)
+        if not isinstance(data, dict):
+            rows.extend(data)
+            break
+        rows.extend(data['results'])
+        if page == 1 and data['results']:
+            total_pages = -(-data['count'] // len(data['results']))
+        if not data.get('next'):
+            break
+    if not rows:
+        raise RuntimeError("Aucune épreuve visible : générez des données (generate_data) avant le test")
+    return Catalogue(rows, total_pages)
+
+
+class Samples:
+    """Mesures brutes d'un endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = defaultdict(int)
+        self.queries = []
+
+    def add(self, status, elapsed, queries):
+        self.latencies.append(elapsed)
+        self.statuses[status] += 1
+        if status == 0 or status >= 400:
+            self.errors += 1
+        if queries is not None:
+            self.queries.append(queries)
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.errors += other.errors
+        for status, count in other.statuses.items():
+            self.statuses[status] += count
+        self.queries.extend(other.queries)
+
+
+def percentile(sorted_values, q):
+    """Percentile par rang (q entre 0 et 100) d'une liste triée."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run(transport, weights, users, password, concurrency=4, duration=30.0,
+        max_requests=None, warmup=0.0, seed=None, log=None):
+    """
+    Lance le test de charge.
+
+    Args:
+        weights: {endpoint: poids} (profil de trafic)
+        users: noms des utilisateurs virtuels (un par thread, réutilisés si moins nombreux)
+        duration: durée en secondes (hors préchauffage)
+        max_requests: arrêt après ce nombre de requêtes mesurées
+        warmup: secondes de préchauffage non mesurées (chargement des modèles, caches)
+
+    Returns:
+        Report
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+
+    tokens = {}
+    for username in users[:concurrency]:
+        tokens[username] = obtain_token(transport, username, password)
+    log(f"{len(tokens)} utilisateur(s) authentifié(s)")
+
+    # Chaque utilisateur ne voit que les épreuves de son niveau et des niveaux inférieurs
+    catalogues = {username: fetch_catalogue(transport, token) for username, token in tokens.items()}
+    weights = {name: weight for name, weight in weights.items() if weight > 0}
+    if not all(c.with_pdf for c in catalogues.values()) and weights.pop('telechargement', None):
+        log("épreuves sans PDF pour certains utilisateurs : téléchargements exclus du profil")
+    names = list(weights)
+    cum_weights = list(accumulate(weights[name] for name in names))
+    log(f"{max(len(c.ids) for c in catalogues.values())} épreuves au catalogue, profil : {', '.join(names)}")
+
+    usernames = list(tokens)
+    results = [defaultdict(Samples) for _ in range(concurrency)]
+    remaining = [max_requests] if max_requests else None
+    lock = threading.Lock()
+    stop = threading.Event()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration if duration else None
+
+    def take():
+        if remaining is None:
+            return True
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        worker_rng = random.Random(rng.randrange(2 ** 32))
+        username = usernames[index % len(usernames)]
+        token, catalogue = tokens[username], catalogues[username]
+        samples = results[index]
+        try:
+            while not stop.is_set():
+                now = time.perf_counter()
+                if deadline and now >= deadline:
+                    break
+                name = worker_rng.choices(names, cum_weights=cum_weights)[0]
+                method, path, body = ENDPOINTS[name](catalogue, worker_rng)
+                measured = now >= measure_from
+                if measured and not take():
+                    break
+                status, elapsed, queries, _ = transport.request(method, path, body, token)
+                if measured:
+                    samples[name].add(status, elapsed, queries)
+        finally:
+            transport.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    elapsed = max(time.perf_counter() - measure_from, 1e-9)
+
+    merged = defaultdict(Samples)
+    for worker_results in results:
+        for name, samples in worker_results.items():
+            merged[name].merge(samples)
+    return Report(merged, elapsed, concurrency)
+
+
+# ════════════════════════════════════════════════════════
+# Rapport
+# ════════════════════════════════════════════════════════
+
+class Report:
+    def __init__(self, samples, elapsed, concurrency):
+        self.samples = dict(sorted(samples.items()))
+        self.elapsed = elapsed
+        self.concurrency = concurrency
+
+    @staticmethod
+    def _summary(samples, elapsed):
+        latencies = sorted(samples.latencies)
+        count = len(latencies)
+        return {
+            'requetes': count,
+            'debit': count / elapsed,
+            'erreurs': samples.errors,
+            'taux_erreur': samples.errors / count if count else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'requetes_sql': sum(samples.queries) / len(samples.queries) if samples.queries else None,
+            'statuts': {str(status): n for status, n in sorted(samples.statuses.items())},
+        }
+
+    @property
+    def total(self):
+        total = Samples()
+        for samples in self.samples.values():
+            total.merge(samples)
+        return self._summary(total, self.elapsed)
+
+    def as_dict(self):
+        return {
+            'duree_s': self.elapsed,
+            'concurrence': self.concurrency,
+            'total': self.total,
+            'endpoints': {name: self._summary(s, self.elapsed) for name, s in self.samples.items()},
+        }
+
+    def lines(self):
+        header = f"{'endpoint':<16}{'req':>7}{'req/s':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'SQL':>7}"
+        rows = [header, '-' * len(header)]
+        summaries = [(name, self._summary(s, self.elapsed)) for name, s in self.samples.items()]
+        summaries.append(('TOTAL', self.total))
+        for name, s in summaries:
+            sql = f"{s['requetes_sql']:.1f}" if s['requetes_sql'] is not None else '-'
+            rows.append(
+                f"{name:<16}{s['requetes']:>7}{s['debit']:>9.1f}{s['taux_erreur'] * 100:>7.1f}"
+                f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}{sql:>7}"
+            )
+        return rows
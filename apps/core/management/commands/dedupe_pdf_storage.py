@@ -0,0 +1,116 @@
+"""
+Migre les PDF existants vers le stockage adressé par contenu.
+
+Pour chaque épreuve ayant un fichier :
+  1. recalcule le SHA-256 du fichier (en parallèle) ;
+  2. copie le contenu sous epreuves/sha256/xx/<hash>.pdf s'il n'y est pas déjà ;
+  3. fait pointer l'épreuve vers ce chemin et met à jour hash/taille ;
+  4. supprime l'ancien fichier quand plus aucune épreuve ne l'utilise.
+
+Les doublons (même contenu sous plusieurs noms) ne sont donc plus stockés qu'une fois.
+
+Usage :
+    python manage.py dedupe_pdf_storage --dry-run
+    python manage.py dedupe_pdf_storage --workers 8
+"""
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.core import previews, storage as cas
+from apps.core.models import Epreuve
+
+
+class Command(BaseCommand):
+    help = "Recalcule les hash des PDF et déduplique le stockage (adressage par contenu)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help="Nombre de threads pour le calcul des hash (défaut: 4)",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Afficher ce qui serait fait sans rien modifier",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        file_storage = Epreuve._meta.get_field('fichier_pdf').storage
+
+        epreuves = list(
+            Epreuve.objects.exclude(fichier_pdf='').exclude(fichier_pdf__isnull=True)
+            .only('id', 'fichier_pdf', 'hash_fichier', 'taille_fichier')
+            .order_by('id')
+        )
+        names = sorted({ep.fichier_pdf.name for ep in epreuves})
+        self.stdout.write(f"{len(epreuves)} épreuve(s), {len(names)} fichier(s) à vérifier...")
+
+        # 1. Hash des fichiers (E/S bornées : un pool de threads suffit)
+        start = time.time()
+        hashes = {}
+        missing = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {pool.submit(cas.hash_stored_file, file_storage, name): name for name in names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    hashes[name] = future.result()
+                except Exception as e:
+                    missing += 1
+                    self.stderr.write(f"  ⚠️ {name}: {e}")
+        self.stdout.write(f"  → {len(hashes)} fichier(s) hachés en {time.time() - start:.1f}s ({missing} illisible(s))")
+
+        # 2. Regroupement par contenu
+        by_hash = defaultdict(list)
+        for ep in epreuves:
+            if ep.fichier_pdf.name in hashes:
+                by_hash[hashes[ep.fichier_pdf.name][0]].append(ep)
+
+        moved = duplicates = freed = 0
+        for file_hash, group in by_hash.items():
+            target = cas.content_addressed_name(file_hash)
+            sources = sorted({ep.fichier_pdf.name for ep in group})
+            size = hashes[sources[0]][1]
+            duplicates += len(sources) - 1
+            if dry_run:
+                if sources != [target]:
+                    self.stdout.write(f"  {file_hash[:12]}… : {sources} → {target}")
+                continue
+
+            if not file_storage.exists(target):
+                with file_storage.open(sources[0], 'rb') as src:
+                    saved_name = file_storage.save(target, src)
+                if saved_name != target:
+                    self.stderr.write(f"  ⚠️ {target} enregistré sous {saved_name}, ignoré")
+                    file_storage.delete(saved_name)
+                    continue
+                moved += 1
+
+            with transaction.atomic():
+                Epreuve.objects.filter(id__in=[ep.id for ep in group]).update(
+                    fichier_pdf=target, hash_fichier=file_hash, taille_fichier=size,
+                )
+            cas.sync_references(file_hash)
+
+            for name in sources:
+                if name != target and not Epreuve.objects.filter(fichier_pdf=name).exists():
+                    file_storage.delete(name)
+                    previews.delete_previews(file_storage, name)
+                    freed += hashes[name][1]
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"DRY-RUN : {len(by_hash)} contenu(s) distinct(s), {duplicates} doublon(s)."
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(by_hash)} contenu(s) distinct(s), {moved} fichier(s) migré(s), "
+            f"{duplicates} doublon(s) supprimé(s), {freed / (1024 * 1024):.1f} MB libérés"
+        ))
@@ -1,23 +1,28 @@
 """
-Commande Django pour exporter les données de la BDD en JSON/CSV.
+Commande Django pour exporter les données de la BDD en JSON/NDJSON/CSV/Parquet.
 Utile pour récupérer les données réelles de Render vers le local
 pour l'entraînement du modèle ML.
+
+Les tables sont lues par lots et écrites au fil de l'eau (apps/core/exports.py) :
+la mémoire utilisée ne dépend pas du volume d'interactions.
+
+Usage :
+    python manage.py export_data
+    python manage.py export_data --format csv --tables interactions evaluations
+    python manage.py export_data --format ndjson --gzip
+    python manage.py export_data --format parquet -o data/export/parquet
 """
-import json
-import csv
 import os
-from django.core.management.base import BaseCommand
+import time
+
 from django.core.management import call_command
-from django.core.serializers.json import DjangoJSONEncoder
-from io import StringIO
-from apps.core.models import Epreuve, Interaction, Evaluation, Commentaire
-from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
 
-User = get_user_model()
+from apps.core import columnar, exports
 
 
 class Command(BaseCommand):
-    help = "Exporte les données de la BDD en JSON/CSV pour entraînement ML local"
+    help = "Exporte les données de la BDD en JSON/NDJSON/CSV/Parquet pour entraînement ML local"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -28,100 +33,76 @@ class Command(BaseCommand):
         parser.add_argument(
             '--format', '-f',
             default='json',
-            choices=['json', 'csv', 'both'],
-            help='Format de sortie (défaut: json)'
+            choices=['json', 'ndjson', 'csv', 'parquet', 'both'],
+            help='Format de sortie (défaut: json ; both = json + csv)'
+        )
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=list(exports.TABLES),
+            help='Tables à exporter (défaut: toutes)'
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='Compresse les fichiers en gzip'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Lignes lues par lot (défaut: EXPORT_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--no-dump',
+            action='store_true',
+            help='Ne pas produire full_dump.json (dumpdata)'
         )
 
     def handle(self, *args, **options):
         output_dir = options['output']
         fmt = options['format']
+        tables = options['tables'] or list(exports.TABLES)
         os.makedirs(output_dir, exist_ok=True)
 
         if fmt in ('json', 'both'):
-            self._export_json(output_dir)
+            self.stdout.write("\n--- Export JSON ---")
+            self._export('json', tables, output_dir, options)
+        if fmt == 'ndjson':
+            self.stdout.write("\n--- Export NDJSON ---")
+            self._export('ndjson', tables, output_dir, options)
+        if fmt == 'parquet':
+            self.stdout.write("\n--- Export Parquet ---")
+            self._export_parquet(tables, output_dir, options)
         if fmt in ('csv', 'both'):
-            self._export_csv(output_dir)
-
-        # Dump complet Django (pour loaddata en local)
-        self.stdout.write("Export dumpdata complet...")
-        out = StringIO()
-        call_command('dumpdata', 'core', '--indent', '2', stdout=out)
-        with open(os.path.join(output_dir, 'full_dump.json'), 'w') as f:
-            f.write(out.getvalue())
+            self.stdout.write("\n--- Export CSV ---")
+            # Un fichier par table plutôt qu'une archive ZIP
+            for table in tables:
+                self._export('csv', [table], output_dir, options)
+
+        if not options['no_dump']:
+            # Dump complet Django (pour loaddata en local), écrit directement dans le fichier
+            self.stdout.write("Export dumpdata complet...")
+            call_command(
+                'dumpdata', 'core', '--indent', '2',
+                '--output', os.path.join(output_dir, 'full_dump.json'),
+            )
 
         self.stdout.write(self.style.SUCCESS(f"\n✅ Export terminé dans {output_dir}/"))
 
-    def _export_json(self, output_dir):
-        self.stdout.write("\n--- Export JSON ---")
-
-        # Utilisateurs (sans mots de passe)
-        users = list(User.objects.values(
-            'id', 'username', 'email', 'niveau', 'filiere', 'date_joined'
-        ))
-        self._write_json(os.path.join(output_dir, 'utilisateurs.json'), users)
-        self.stdout.write(f"  → {len(users)} utilisateurs")
-
-        # Épreuves
-        epreuves = list(Epreuve.objects.values(
-            'id', 'titre', 'matiere', 'niveau', 'type_epreuve',
-            'annee_academique', 'description',
-            'nb_vues', 'nb_telechargements',
-            'note_moyenne_difficulte', 'note_moyenne_pertinence',
-            'created_at'
-        ))
-        self._write_json(os.path.join(output_dir, 'epreuves.json'), epreuves)
-        self.stdout.write(f"  → {len(epreuves)} épreuves")
-
-        # Interactions
-        interactions = list(Interaction.objects.values(
-            'id', 'user_id', 'epreuve_id',
-            'action_type', 'session_duration', 'timestamp'
-        ))
-        self._write_json(os.path.join(output_dir, 'interactions.json'), interactions)
-        self.stdout.write(f"  → {len(interactions)} interactions")
-
-        # Évaluations
-        evaluations = list(Evaluation.objects.values(
-            'id', 'user_id', 'epreuve_id',
-            'note_difficulte', 'note_pertinence', 'created_at'
-        ))
-        self._write_json(os.path.join(output_dir, 'evaluations.json'), evaluations)
-        self.stdout.write(f"  → {len(evaluations)} évaluations")
-
-        # Commentaires
-        commentaires = list(Commentaire.objects.values(
-            'id', 'user_id', 'epreuve_id', 'contenu', 'created_at'
-        ))
-        self._write_json(os.path.join(output_dir, 'commentaires.json'), commentaires)
-        self.stdout.write(f"  → {len(commentaires)} commentaires")
-
-    def _export_csv(self, output_dir):
-        self.stdout.write("\n--- Export CSV ---")
-
-        # Interactions (crucial pour entraînement ML)
-        rows = Interaction.objects.values_list(
-            'user_id', 'epreuve_id', 'action_type', 'session_duration', 'timestamp'
+    def _export(self, fmt, tables, output_dir, options):
+        start = time.time()
+        chunks, _, filename = exports.stream(
+            fmt, tables=tables, compress=options['gzip'], chunk_size=options['chunk_size'],
         )
-        filepath = os.path.join(output_dir, 'interactions.csv')
-        with open(filepath, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['user_id', 'epreuve_id', 'action_type', 'session_duration', 'timestamp'])
-            for row in rows:
-                writer.writerow(row)
-        self.stdout.write(f"  → {rows.count()} interactions (CSV)")
-
-        # Évaluations
-        rows = Evaluation.objects.values_list(
-            'user_id', 'epreuve_id', 'note_difficulte', 'note_pertinence', 'created_at'
-        )
-        filepath = os.path.join(output_dir, 'evaluations.csv')
-        with open(filepath, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['user_id', 'epreuve_id', 'note_difficulte', 'note_pertinence', 'timestamp'])
-            for row in rows:
-                writer.writerow(row)
-        self.stdout.write(f"  → {rows.count()} évaluations (CSV)")
-
-    def _write_json(self, filepath, data):
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, cls=DjangoJSONEncoder)
+        size = exports.write_file(os.path.join(output_dir, filename), chunks)
+        self.stdout.write(f"  → {filename} ({size / 1024:.0f} Ko, {time.time() - start:.1f}s)")
+
+    def _export_parquet(self, tables, output_dir, options):
+        if not columnar.is_available():
+            raise CommandError("pyarrow n'est pas installé : pip install pyarrow")
+        start = time.time()
+        counts = columnar.write_dataset(output_dir, tables=tables, chunk_size=options['chunk_size'])
+        for table, count in counts.items():
+            self.stdout.write(f"  → {count} {table}")
+        self.stdout.write(f"  ({time.time() - start:.1f}s)")
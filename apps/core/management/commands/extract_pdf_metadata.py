@@ -0,0 +1,79 @@
+"""
+Extrait le nombre de pages et le texte des PDF déjà présents dans le catalogue.
+
+Par défaut, seules les épreuves sans métadonnées (nb_pages = 0) sont traitées.
+L'analyse des PDF est faite en parallèle dans un pool de processus : chaque
+processus lit son PDF depuis le storage (copie locale temporaire pour les
+storages distants, supprimée après analyse). L'écriture en base se fait par
+lots depuis le processus principal.
+
+Usage :
+    python manage.py extract_pdf_metadata
+    python manage.py extract_pdf_metadata --workers 4 --all
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import extraction
+from apps.core.models import Epreuve
+
+
+class Command(BaseCommand):
+    help = "Extrait nb_pages et texte_extrait des PDF existants (en parallèle)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help="Nombre de processus d'extraction (défaut: nombre de CPU)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help="Nombre de résultats écrits par requête (défaut: 50)",
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Retraiter aussi les épreuves déjà extraites",
+        )
+
+    def handle(self, *args, **options):
+        if not extraction.is_available():
+            raise CommandError("pypdf n'est pas installé : pip install pypdf")
+
+        queryset = Epreuve.objects.exclude(fichier_pdf='').exclude(fichier_pdf__isnull=True)
+        if not options['all']:
+            queryset = queryset.filter(nb_pages=0)
+        epreuves = list(queryset.only('id', 'fichier_pdf').order_by('id'))
+        self.stdout.write(f"{len(epreuves)} épreuve(s) à traiter avec {options['workers']} processus...")
+
+        start = time.time()
+        results = {}
+        saved = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=extraction.init_worker) as pool:
+            futures = {
+                pool.submit(extraction.extract_stored, ep.fichier_pdf.name): ep.id
+                for ep in epreuves
+            }
+            for future in as_completed(futures):
+                epreuve_id = futures[future]
+                try:
+                    results[epreuve_id] = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"  ⚠️ Épreuve {epreuve_id}: {e}")
+                    continue
+                if len(results) >= options['batch_size']:
+                    saved += extraction.save_results(results)
+                    results = {}
+            saved += extraction.save_results(results)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {saved} épreuve(s) mise(s) à jour, {failed} échec(s) en {time.time() - start:.1f}s"
+        ))
@@ -4,9 +4,11 @@ Commande de normalisation des noms de matières dans la base de données.
 Corrige les noms non-standards pour améliorer les recommandations ML.
 Usage :
     python manage.py fix_matieres [--dry-run]
+    python manage.py fix_matieres --categories   # après modification de taxonomy.py
 """
 
 from django.core.management.base import BaseCommand
+from apps.core import stats, taxonomy
 from apps.core.models import Epreuve
 
 
@@ -69,12 +71,23 @@ class Command(BaseCommand):
             type=str,
             help="Nouvelle valeur de matière",
         )
+        parser.add_argument(
+            '--categories',
+            action='store_true',
+            help="Recalculer uniquement les catégories de toutes les épreuves",
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         matiere_from = options.get('matiere_from')
         matiere_to = options.get('matiere_to')
 
+        if options['categories']:
+            self.stdout.write("🏷  Recalcul des catégories de matières...")
+            changed = taxonomy.backfill(stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(f"✓ {changed} épreuve(s) recatégorisée(s)."))
+            return
+
         if dry_run:
             self.stdout.write(self.style.WARNING("Mode DRY-RUN — aucune modification en base"))
 
@@ -97,12 +110,15 @@ class Command(BaseCommand):
             )
 
             if not dry_run:
-                epreuves.update(matiere=new_name)
+                # QuerySet.update ne passe pas par Epreuve.save() : catégories incluses
+                epreuves.update(matiere=new_name, **taxonomy.fields(new_name))
                 total_changed += count
 
         if dry_run:
             self.stdout.write(self.style.SUCCESS("DRY-RUN terminé."))
         else:
+            # QuerySet.update ne déclenche pas les signaux : épreuves par matière
+            stats.reconcile()
             self.stdout.write(
                 self.style.SUCCESS(f"✓ {total_changed} épreuve(s) mise(s) à jour.")
             )
@@ -0,0 +1,84 @@
+"""
+Génère l'aperçu de la première page et les miniatures des PDF existants.
+
+Chaque processus du pool lit son PDF depuis le storage (copie locale temporaire
+pour les storages distants, supprimée après rendu) puis rend les pages : les
+téléchargements se font en parallèle, eux aussi. Les images sont enregistrées
+à côté du PDF depuis le processus principal.
+
+Usage :
+    python manage.py generate_previews
+    python manage.py generate_previews --workers 4 --max-pages 20 --force
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import extraction, previews
+from apps.core.models import Epreuve
+
+
+class Command(BaseCommand):
+    help = "Génère les aperçus et miniatures des PDF (en parallèle)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help="Nombre de processus de rendu (défaut: nombre de CPU)",
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=previews.MAX_MINIATURES,
+            help=f"Miniatures générées au maximum par PDF (défaut: {previews.MAX_MINIATURES})",
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Régénérer aussi les aperçus existants",
+        )
+
+    def handle(self, *args, **options):
+        if not previews.is_available():
+            raise CommandError("pypdfium2 n'est pas installé : pip install pypdfium2")
+
+        epreuves = list(
+            Epreuve.objects.exclude(fichier_pdf='').exclude(fichier_pdf__isnull=True)
+            .only('id', 'fichier_pdf').order_by('id')
+        )
+        # Un PDF partagé par plusieurs épreuves n'est rendu qu'une fois
+        by_name = {}
+        for ep in epreuves:
+            by_name.setdefault(ep.fichier_pdf.name, ep)
+        storage = Epreuve._meta.get_field('fichier_pdf').storage
+        if not options['force']:
+            by_name = {
+                name: ep for name, ep in by_name.items()
+                if not storage.exists(previews.preview_name(name))
+            }
+        self.stdout.write(f"{len(by_name)} PDF à traiter avec {options['workers']} processus...")
+
+        start = time.time()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=extraction.init_worker) as pool:
+            futures = {
+                pool.submit(previews.render_stored, name, max_pages=options['max_pages']): ep
+                for name, ep in by_name.items()
+            }
+            for future in as_completed(futures):
+                ep = futures[future]
+                try:
+                    images = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"  ⚠️ Épreuve {ep.id}: {e}")
+                    continue
+                written += previews.save_images(ep.fichier_pdf, images, overwrite=options['force'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {written} image(s) générée(s), {failed} échec(s) en {time.time() - start:.1f}s"
+        ))
@@ -0,0 +1,151 @@
+"""
+Commande Django de test de charge de l'API (apps/core/loadtest.py).
+
+Sans --url, les requêtes passent par le client de test Django sur la base
+configurée (les écritures du profil y sont réellement enregistrées) ; avec
+--url, elles visent un serveur démarré.
+
+À lancer avant chaque déploiement, avec les seuils pour échouer
+(code de sortie non nul) en cas de régression :
+
+Usage:
+    python manage.py loadtest --duration 30 --concurrency 4
+    python manage.py loadtest --url http://localhost:8000 --no-keepalive --profile examens --concurrency 8
+    python manage.py loadtest --profile lecture --max-p95 500 --max-error-rate 1 --output rapport.json
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import loadtest
+
+
+class Command(BaseCommand):
+    help = "Test de charge de l'API avec un mélange de trafic réaliste"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default=None,
+            help='Serveur cible (défaut: client de test Django, dans le processus)'
+        )
+        parser.add_argument(
+            '--no-keepalive',
+            action='store_true',
+            help='Une connexion par requête avec --url (recommandé contre runserver)'
+        )
+        parser.add_argument(
+            '--profile',
+            default=loadtest.DEFAULT_PROFILE,
+            help=f"Profil de trafic ({', '.join(loadtest.PROFILES)}) ou fichier JSON {{endpoint: poids}}"
+        )
+        parser.add_argument(
+            '--concurrency', '-c',
+            type=int,
+            default=4,
+            help='Utilisateurs virtuels simultanés (défaut: 4)'
+        )
+        parser.add_argument(
+            '--duration', '-d',
+            type=float,
+            default=30,
+            help='Durée mesurée en secondes (défaut: 30)'
+        )
+        parser.add_argument(
+            '--requests', '-n',
+            type=int,
+            default=None,
+            help='Arrêt après ce nombre de requêtes mesurées'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=5,
+            help='Préchauffage non mesuré en secondes (défaut: 5)'
+        )
+        parser.add_argument(
+            '--users',
+            default='etudiant{}',
+            help="Modèle des noms d'utilisateur, {} = 1..concurrence (défaut: etudiant{})"
+        )
+        parser.add_argument(
+            '--password',
+            default='password123',
+            help='Mot de passe des utilisateurs virtuels (défaut: password123)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Graine aléatoire (séquence de requêtes reproductible)'
+        )
+        parser.add_argument(
+            '--output', '-o',
+            default=None,
+            help='Écrit le rapport complet en JSON'
+        )
+        parser.add_argument(
+            '--max-p95',
+            type=float,
+            default=None,
+            help='Échoue si le p95 global dépasse ce seuil (ms)'
+        )
+        parser.add_argument(
+            '--max-error-rate',
+            type=float,
+            default=None,
+            help="Échoue si le taux d'erreur global dépasse ce seuil (%%)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            weights = loadtest.load_profile(options['profile'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Profil invalide : {e}")
+
+        concurrency = max(options['concurrency'], 1)
+        users = [options['users'].format(i) for i in range(1, concurrency + 1)]
+        if options['url']:
+            transport = loadtest.HttpTransport(options['url'], keepalive=not options['no_keepalive'])
+            target = options['url']
+        else:
+            transport = loadtest.ClientTransport()
+            target = 'client de test Django'
+
+        self.stdout.write(
+            f"\n🚀 Test de charge : {target}, profil {options['profile']}, "
+            f"{concurrency} utilisateur(s), {options['duration']:.0f}s (+{options['warmup']:.0f}s de préchauffage)"
+        )
+        try:
+            report = loadtest.run(
+                transport, weights, users, options['password'],
+                concurrency=concurrency,
+                duration=options['duration'],
+                max_requests=options['requests'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                log=lambda message: self.stdout.write(f"   {message}"),
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('')
+        for line in report.lines():
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report.as_dict(), f, indent=2)
+            self.stdout.write(f"\n📄 Rapport écrit dans {options['output']}")
+
+        total = report.total
+        failures = []
+        if options['max_p95'] is not None and total['p95_ms'] > options['max_p95']:
+            failures.append(f"p95 {total['p95_ms']:.0f} ms > {options['max_p95']:.0f} ms")
+        if options['max_error_rate'] is not None and total['taux_erreur'] * 100 > options['max_error_rate']:
+            failures.append(f"erreurs {total['taux_erreur'] * 100:.1f}% > {options['max_error_rate']:.1f}%")
+        if failures:
+            raise CommandError(f"Seuils dépassés : {' ; '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ {total['requetes']} requêtes, {total['debit']:.1f} req/s, p95 {total['p95_ms']:.0f} ms"
+        ))
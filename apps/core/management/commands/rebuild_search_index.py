@@ -0,0 +1,31 @@
+"""
+Reconstruit l'index plein texte des épreuves.
+
+Usage :
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --batch-size 1000
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte (titre, matière, description, texte du PDF)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Nombre d'épreuves indexées par lot (défaut: 500)",
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {total} épreuve(s) indexée(s) en {time.time() - start:.1f}s"
+        ))
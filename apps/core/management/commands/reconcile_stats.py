@@ -0,0 +1,44 @@
+"""
+Recalcule les compteurs du tableau de bord depuis les tables sources.
+
+À lancer périodiquement (cron) et après les écritures en masse qui ne passent
+pas par les signaux (bulk_create, QuerySet.update).
+
+Usage :
+    python manage.py reconcile_stats
+    python manage.py reconcile_stats --dry-run
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats du tableau de bord (StatCompteur) et affiche les écarts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Affiche les écarts sans modifier les compteurs",
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        rows = stats.reconcile(dry_run=True)
+        ecarts = stats.drift(rows)
+
+        for nom, cle, stocke, attendu in ecarts:
+            groupe = f"[{cle}]" if cle else ''
+            self.stdout.write(f"  {nom}{groupe} : {stocke} → {attendu}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"DRY-RUN terminé : {len(ecarts)} écart(s)."))
+            return
+
+        stats.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(rows)} compteur(s) recalculé(s), {len(ecarts)} écart(s) corrigé(s) en {time.time() - start:.1f}s"
+        ))
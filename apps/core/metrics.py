@@ -0,0 +1,368 @@
+"""
+Métriques au format Prometheus (exposition texte 0.0.4 sur /metrics).
+
+Compteurs et histogrammes sans verrou sur le chemin des requêtes : chaque
+thread incrémente son propre fragment (dict), les fragments ne sont
+additionnés qu'à la lecture. Les jauges gardent la dernière valeur écrite.
+
+Plusieurs workers gunicorn : avec METRICS_DIR, chaque processus écrit son
+instantané dans `METRICS_DIR/<pid>.json` toutes les METRICS_FLUSH_INTERVAL
+secondes (et à la lecture) ; /metrics additionne les instantanés des
+processus vivants (jauges : maximum). Sans METRICS_DIR, /metrics ne montre
+que le processus qui répond.
+
+Taux de succès d'un cache (PromQL) :
+
+    sum by (cache) (rate(banque_cache_lookups_total{result!="miss"}[5m]))
+      / sum by (cache) (rate(banque_cache_lookups_total[5m]))
+
+Aucune dépendance : prometheus_client n'est pas nécessaire.
+"""
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'banque_'
+
+# Secondes : du cache local (~1 ms) au calcul complet sous charge
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = {}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry[self.name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = _shard()
+        key = (self.name, self._key(labels))
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        _shard()
+        _state.gauges[(self.name, self._key(labels))] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        shard = _shard()
+        key = (self.name, self._key(labels))
+        values = shard.get(key)
+        if values is None:
+            # Comptes par intervalle (non cumulés), puis somme et nombre
+            values = shard[key] = [0] * len(self.buckets) + [0.0, 0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Décorateur : durée de chaque appel."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+# ════════════════════════════════════════════════════════
+# Métriques de l'application
+# ════════════════════════════════════════════════════════
+
+RECOMMENDATION_SECONDS = Histogram(
+    'recommendation_seconds', 'Durée des recommandations (cache compris)', ('engine', 'kind'),
+)
+STRATEGY_SECONDS = Histogram(
+    'recommendation_strategy_seconds', 'Durée de chaque stratégie de recommandation', ('engine', 'strategy'),
+)
+STRATEGY_TRUNCATED = Counter(
+    'recommendation_strategy_truncated_total', 'Stratégies arrêtées à leur budget (RECO_STRATEGY_BUDGETS)', ('engine', 'strategy'),
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups_total', 'Lectures des caches nommés par résultat (l1_hit, l2_hit, miss)', ('cache', 'result'),
+)
+MODEL_LOAD_SECONDS = Gauge(
+    'model_load_seconds', 'Durée du dernier chargement du modèle', ('engine',),
+)
+MODEL_INFO = Gauge(
+    'model_info', 'Modèle chargé (valeur 1)', ('engine', 'version'),
+)
+INTERACTIONS = Counter(
+    'interactions_total', 'Interactions enregistrées', ('action',),
+)
+UPLOAD_BYTES = Counter(
+    'upload_bytes_total', 'Octets de PDF reçus', (),
+)
+UPLOADS = Counter(
+    'uploads_total', 'PDF reçus par résultat (accepted, rejected)', ('result',),
+)
+DOWNLOAD_BYTES = Counter(
+    'download_bytes_total', 'Octets de PDF servis (par Django ou délégués au proxy)', ('mode',),
+)
+
+
+# ════════════════════════════════════════════════════════
+# État du processus
+# ════════════════════════════════════════════════════════
+
+class _ProcessState:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.shards = []
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.flusher = None
+
+
+_state = _ProcessState()
+
+
+def _shard():
+    """Fragment du thread courant (créé au premier appel, recréé après un fork)."""
+    global _state
+    shard = getattr(_state.local, 'shard', None)
+    if shard is not None and _state.pid == os.getpid():
+        return shard
+    if _state.pid != os.getpid():
+        # Processus fils : les mesures du parent ne sont pas les siennes
+        _state = _ProcessState()
+    shard = {}
+    with _state.lock:
+        _state.shards.append(shard)
+        _start_flusher()
+    _state.local.shard = shard
+    return shard
+
+
+def snapshot():
+    """Valeurs de ce processus : {'counters': [...], 'histograms': [...], 'gauges': [...]}."""
+    _shard()
+    with _state.lock:
+        shards = [dict(shard) for shard in _state.shards]
+    counters, histograms = {}, {}
+    for shard in shards:
+        for key, value in shard.items():
+            if isinstance(value, list):
+                total = histograms.setdefault(key, [0] * len(value))
+                for i, v in enumerate(value):
+                    total[i] += v
+            else:
+                counters[key] = counters.get(key, 0) + value
+    return {
+        'pid': os.getpid(),
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+        'gauges': [[name, list(labels), value] for (name, labels), value in dict(_state.gauges).items()],
+    }
+
+
+# ════════════════════════════════════════════════════════
+# Agrégation entre workers (METRICS_DIR)
+# ════════════════════════════════════════════════════════
+
+def _metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '')
+
+
+def write_snapshot():
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning(f"Écriture des métriques impossible : {e}")
+
+
+def _start_flusher():
+    if _state.flusher is not None or not _metrics_dir():
+        return
+    _state.flusher = threading.Thread(
+        target=_flush_loop,
+        args=(getattr(settings, 'METRICS_FLUSH_INTERVAL', 10),),
+        name='metrics-flush',
+        daemon=True,
+    )
+    _state.flusher.start()
+    atexit.register(write_snapshot)
+
+
+def _is_alive(pid):
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Instantanés de tous les processus (celui-ci seul sans METRICS_DIR)."""
+    directory = _metrics_dir()
+    if not directory:
+        return [snapshot()]
+    write_snapshot()
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not _is_alive(data['pid']):
+            # Worker arrêté : ses compteurs repartent de zéro côté Prometheus
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        snapshots.append(data)
+    return snapshots
+
+
+def merge(snapshots):
+    counters, histograms, gauges = {}, {}, {}
+    for data in snapshots:
+        for name, labels, value in data['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in data['histograms']:
+            total = histograms.setdefault((name, tuple(labels)), [0] * len(values))
+            for i, v in enumerate(values):
+                total[i] += v
+        for name, labels, value in data['gauges']:
+            key = (name, tuple(labels))
+            gauges[key] = max(gauges.get(key, value), value)
+    return counters, histograms, gauges
+
+
+# ════════════════════════════════════════════════════════
+# Exposition
+# ════════════════════════════════════════════════════════
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshots=None):
+    """Texte d'exposition Prometheus des métriques agrégées."""
+    counters, histograms, gauges = merge(collect() if snapshots is None else snapshots)
+    values_by_kind = {'counter': counters, 'gauge': gauges}
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        if metric.kind == 'histogram':
+            for (series, labels), values in sorted(histograms.items()):
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, values):
+                    cumulative += count
+                    le = '+Inf' if bound == math.inf else repr(bound)
+                    lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_number(values[-2])}')
+                lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {values[-1]}')
+        else:
+            for (series, labels), value in sorted(values_by_kind[metric.kind].items()):
+                if series == name:
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized(request):
+    """
+    METRICS_TOKEN défini : en-tête `Authorization: Bearer <jeton>` (Prometheus).
+    Sinon : ouvert en DEBUG, réservé aux administrateurs (JWT) en production.
+    """
+    import hmac
+
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+    if settings.DEBUG:
+        return True
+
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user.is_staff
+    except APIException:
+        return False
@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_increase_fichier_pdf_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="epreuve",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="core_epreuv_created_f4827c_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="epreuve",
+            index=models.Index(
+                fields=["-nb_telechargements", "-id"],
+                name="core_epreuv_nb_tele_5699f7_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="epreuve",
+            index=models.Index(
+                fields=["-nb_vues", "-id"], name="core_epreuv_nb_vues_bb5aac_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="epreuve",
+            index=models.Index(
+                fields=["-note_moyenne_pertinence", "-id"],
+                name="core_epreuv_note_mo_0b9fac_idx",
+            ),
+        ),
+    ]
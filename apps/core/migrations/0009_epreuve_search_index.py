@@ -0,0 +1,78 @@
+# Generated by Django 5.0 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', titre), 'A') || "
+    "setweight(to_tsvector('simple', matiere), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C') || "
+    "setweight(to_tsvector('simple', contenu), 'D')"
+)
+
+
+def create_fulltext_index(apps, schema_editor):
+    """Index GIN sur PostgreSQL, table FTS5 sur SQLite, rien ailleurs."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS core_epreuvesearchindex_fts_idx "
+            f"ON core_epreuvesearchindex USING gin (({PG_VECTOR_SQL}))"
+        )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS core_epreuve_fts "
+                "USING fts5(titre, matiere, description, contenu, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            # SQLite compilé sans FTS5 : la recherche utilisera le repli Python
+            pass
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS core_epreuvesearchindex_fts_idx")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_epreuve_fts")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0008_epreuve_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EpreuveSearchIndex",
+            fields=[
+                (
+                    "epreuve",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="core.epreuve",
+                    ),
+                ),
+                ("titre", models.TextField(blank=True)),
+                ("matiere", models.TextField(blank=True)),
+                ("description", models.TextField(blank=True)),
+                (
+                    "contenu",
+                    models.TextField(
+                        blank=True, help_text="Racines uniques du texte extrait du PDF"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Index de recherche",
+                "verbose_name_plural": "Index de recherche",
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_epreuve_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FichierPDF",
+            fields=[
+                (
+                    "hash",
+                    models.CharField(
+                        help_text="SHA-256 du contenu",
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "chemin",
+                    models.CharField(
+                        help_text="Nom du fichier dans le storage", max_length=500
+                    ),
+                ),
+                (
+                    "taille",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Taille en octets"
+                    ),
+                ),
+                (
+                    "nb_references",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Nombre d'épreuves utilisant ce fichier"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Fichier PDF",
+                "verbose_name_plural": "Fichiers PDF",
+            },
+        ),
+        migrations.AlterField(
+            model_name="epreuve",
+            name="hash_fichier",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="Hash SHA-256 du fichier pour vérifier l'intégrité",
+                max_length=64,
+            ),
+        ),
+    ]
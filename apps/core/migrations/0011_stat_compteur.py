@@ -0,0 +1,48 @@
+# Generated by Django 5.0 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_fichier_pdf_content_addressed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatCompteur",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "nom",
+                    models.CharField(
+                        help_text="Agrégat (ex: epreuves_par_matiere)", max_length=50
+                    ),
+                ),
+                (
+                    "cle",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Groupe ('' pour un total)",
+                        max_length=100,
+                    ),
+                ),
+                ("valeur", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Compteur statistique",
+                "verbose_name_plural": "Compteurs statistiques",
+                "unique_together": {("nom", "cle")},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+from apps.core import taxonomy
+
+
+def backfill_categories(apps, schema_editor):
+    """Une requête UPDATE par matière distincte."""
+    taxonomy.backfill(apps.get_model("core", "Epreuve"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_stat_compteur"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="epreuve",
+            name="categorie",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                help_text="Catégorie principale de la matière",
+                max_length=30,
+            ),
+        ),
+        migrations.AddField(
+            model_name="epreuve",
+            name="categories",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Masque des catégories reconnues dans la matière",
+            ),
+        ),
+        migrations.RunPython(backfill_categories, migrations.RunPython.noop),
+    ]
@@ -4,13 +4,23 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
 
+from . import taxonomy
+
 
 def epreuve_upload_path(instance, filename):
     """
-    Génère un chemin d'upload organisé par année/mois
+    Chemin d'upload adressé par contenu quand le hash est connu :
+    Ex: epreuves/sha256/3f/3f2a...9c.pdf
+
+    Sinon, chemin organisé par année/mois (ancien schéma) :
     Ex: epreuves/2025/01/epreuve_math_l3_xyz123.pdf
     """
     from django.utils import timezone
+    from .storage import content_addressed_name
+
+    if instance.hash_fichier:
+        return content_addressed_name(instance.hash_fichier)
+
     now = timezone.now()
     
     # Nettoyer le nom de fichier
@@ -87,6 +97,19 @@ class Epreuve(models.Model):
     
     titre = models.CharField(max_length=255)
     matiere = models.CharField(max_length=100)
+    # Taxonomie de la matière (taxonomy.py), recalculée à chaque enregistrement
+    categorie = models.CharField(
+        max_length=30,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Catégorie principale de la matière"
+    )
+    categories = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Masque des catégories reconnues dans la matière"
+    )
     niveau = models.CharField(max_length=2, choices=NIVEAU_CHOICES)
     type_epreuve = models.CharField(max_length=15, choices=TYPE_CHOICES)
     annee_academique = models.CharField(max_length=20, help_text="Ex: 2023-2024")
@@ -109,6 +132,7 @@ class Epreuve(models.Model):
     hash_fichier = models.CharField(
         max_length=64,
         blank=True,
+        db_index=True,
         help_text="Hash SHA-256 du fichier pour vérifier l'intégrité"
     )
     
@@ -151,27 +175,48 @@ class Epreuve(models.Model):
             models.Index(fields=['annee_academique']),
             models.Index(fields=['-nb_telechargements']),
             models.Index(fields=['is_approved']),
+            # Pagination keyset : (champ d'ordre, id)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['-nb_telechargements', '-id']),
+            models.Index(fields=['-nb_vues', '-id']),
+            models.Index(fields=['-note_moyenne_pertinence', '-id']),
         ]
     
     def __str__(self):
         return f"{self.titre} - {self.matiere} {self.niveau}"
     
     def save(self, *args, **kwargs):
-        # Calculer automatiquement la taille et le hash si nouveau fichier
-        if self.fichier_pdf and hasattr(self.fichier_pdf, 'size') and not self.taille_fichier:
+        # Nouveau fichier (création ou remplacement) : taille et hash recalculés,
+        # sinon l'ancien hash désignerait l'ancien fichier adressé par contenu
+        if self.fichier_pdf and not self.fichier_pdf._committed:
+            from .upload_handlers import compute_sha256
             self.taille_fichier = self.fichier_pdf.size
-            
-            # Calculer le hash SHA-256
             try:
-                hasher = hashlib.sha256()
-                for chunk in self.fichier_pdf.chunks():
-                    hasher.update(chunk)
-                self.hash_fichier = hasher.hexdigest()
-                
-                # Réinitialiser le curseur du fichier
-                self.fichier_pdf.seek(0)
+                # Hash déjà calculé par HashingPDFUploadHandler si le fichier vient d'un upload
+                self.hash_fichier = compute_sha256(self.fichier_pdf.file)
             except Exception as e:
+                # Chemin daté (epreuve_upload_path) plutôt que l'ancien fichier
+                self.hash_fichier = ''
                 print(f"Erreur lors du calcul du hash: {e}")
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'taille_fichier', 'hash_fichier'}
+        
+        # Stockage adressé par contenu : si ce PDF est déjà stocké, on réutilise
+        # le fichier existant au lieu d'en écrire une nouvelle copie
+        if self.fichier_pdf and not self.fichier_pdf._committed and self.hash_fichier:
+            from .storage import content_addressed_name
+            name = content_addressed_name(self.hash_fichier)
+            if self.fichier_pdf.storage.exists(name):
+                self.fichier_pdf = name
+        
+        # Catégories de la matière : calculées ici une fois pour toutes
+        # (pas pour les sauvegardes de compteurs, update_fields sans 'matiere')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'matiere' in update_fields:
+            self.categorie, self.categories = taxonomy.classify(self.matiere)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *taxonomy.FIELDS}
         
         super().save(*args, **kwargs)
     
@@ -307,3 +352,65 @@ class Commentaire(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.epreuve.titre[:30]} - {self.created_at.strftime('%Y-%m-%d')}"
+
+
+class FichierPDF(models.Model):
+    """
+    PDF stocké une seule fois sous son SHA-256, partagé entre épreuves.
+    Maintenu par `apps.core.storage.sync_references`.
+    """
+    hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 du contenu")
+    chemin = models.CharField(max_length=500, help_text="Nom du fichier dans le storage")
+    taille = models.PositiveIntegerField(default=0, help_text="Taille en octets")
+    nb_references = models.PositiveIntegerField(default=0, help_text="Nombre d'épreuves utilisant ce fichier")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Fichier PDF'
+        verbose_name_plural = 'Fichiers PDF'
+    
+    def __str__(self):
+        return f"{self.hash[:12]}… ({self.nb_references} réf.)"
+
+
+class EpreuveSearchIndex(models.Model):
+    """
+    Index plein texte d'une épreuve : champs normalisés (sans accents, racinisés).
+    Maintenu par `apps.core.search` ; ne pas modifier à la main.
+    """
+    epreuve = models.OneToOneField(
+        Epreuve,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_index'
+    )
+    titre = models.TextField(blank=True)
+    matiere = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    contenu = models.TextField(blank=True, help_text="Racines uniques du texte extrait du PDF")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Index de recherche'
+        verbose_name_plural = 'Index de recherche'
+    
+    def __str__(self):
+        return f"Index {self.epreuve_id}"
+
+
+class StatCompteur(models.Model):
+    """
+    Agrégat du tableau de bord (total ou effectif d'un groupe).
+    Maintenu par `apps.core.stats` ; recalculé par `manage.py reconcile_stats`.
+    """
+    nom = models.CharField(max_length=50, help_text="Agrégat (ex: epreuves_par_matiere)")
+    cle = models.CharField(max_length=100, blank=True, default='', help_text="Groupe ('' pour un total)")
+    valeur = models.BigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Compteur statistique'
+        verbose_name_plural = 'Compteurs statistiques'
+        unique_together = ['nom', 'cle']
+    
+    def __str__(self):
+        return f"{self.nom}[{self.cle}] = {self.valeur}"
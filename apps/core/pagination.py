@@ -0,0 +1,188 @@
+"""
+Pagination par curseur (keyset) pour la liste des épreuves.
+
+La pagination par numéro de page de DRF exécute un COUNT(*) à chaque page et
+un OFFSET qui devient de plus en plus coûteux quand on descend dans la liste.
+Ici, la page suivante est obtenue avec un filtre `(champ, id) < (valeur, id)`
+sur l'ordre demandé : le coût reste proportionnel à la taille de la page,
+quelle que soit la profondeur du défilement.
+
+Usage :
+    GET /api/epreuves/?cursor=                → première page
+    GET /api/epreuves/?cursor=<token>         → page suivante (lien `next`)
+    GET /api/epreuves/?cursor=&with_count=1   → ajoute un total approximatif
+
+Une recherche sans `ordering` est triée par pertinence (`apps.core.search`) :
+le rang n'est pas une colonne filtrable, le curseur porte alors la position
+dans le classement (décalage), et l'ordre de la recherche est conservé.
+"""
+import base64
+import json
+import logging
+from collections import OrderedDict
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+def approximate_count(queryset):
+    """
+    Estimation du nombre de lignes d'un queryset.
+
+    Sur PostgreSQL, on lit l'estimation du planificateur (EXPLAIN) au lieu de
+    parcourir la table. Sur les autres moteurs, on retombe sur un COUNT exact.
+    """
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.query.sql_with_params()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            logger.warning(f"Estimation du nombre de lignes impossible: {e}")
+    return queryset.count()
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset sur un champ d'ordre autorisé, départagé par `id`.
+
+    Les champs triables sont ceux déclarés dans `view.ordering_fields` ; le
+    paramètre `ordering` garde la même syntaxe que `OrderingFilter`.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'with_count'
+    ordering_param = 'ordering'
+    tie_breaker = 'id'
+    # Pseudo-champ des curseurs du classement par pertinence
+    rank_field = 'rang'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        from .search import is_ranked
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = approximate_count(queryset.order_by())
+
+        if is_ranked(request):
+            return self.paginate_ranked(queryset, request)
+
+        field, descending = self.get_ordering(request, view)
+        self.ordering = (field, descending)
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}{self.tie_breaker}')
+
+        position = self.decode_cursor(request, field)
+        if position is not None:
+            value, pk = position
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value})
+                | Q(**{field: value, f'{self.tie_breaker}__{lookup}': pk})
+            )
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+
+        self.next_position = None
+        if self.has_next and page:
+            last = page[-1]
+            self.next_position = (getattr(last, field), getattr(last, self.tie_breaker))
+        return page
+
+    def paginate_ranked(self, queryset, request):
+        """Garde l'ordre de la recherche ; la page suivante commence à la position suivante."""
+        self.ordering = (self.rank_field, True)
+        position = self.decode_cursor(request, self.rank_field)
+        offset = position[0] if position is not None else 0
+
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_position = (offset + len(page), 0) if self.has_next else None
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ── Utilitaires ──────────────────────────────────────────
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, view):
+        default = (getattr(view, 'ordering', None) or ['-created_at'])[0]
+        allowed = getattr(view, 'ordering_fields', None) or []
+        requested = request.query_params.get(self.ordering_param, '').split(',')[0].strip()
+        candidate = requested if requested.lstrip('-') in allowed else default
+        return candidate.lstrip('-'), candidate.startswith('-')
+
+    def encode_cursor(self, value, pk):
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        raw = json.dumps([value, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, field):
+        token = request.query_params.get(self.cursor_query_param, '')
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if field == 'created_at':
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError(token)
+            elif field == self.rank_field:
+                value = int(value)
+                if value < 0:
+                    raise ValueError(token)
+            return value, int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Curseur invalide.')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(*self.next_position))
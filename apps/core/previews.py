@@ -0,0 +1,227 @@
+"""
+Aperçus des PDF : image basse résolution de la première page et miniatures par page.
+
+Les images sont rangées à côté du PDF, dans un dossier portant son nom :
+    epreuves/sha256/ab/ab12...ef.pdf
+    epreuves/sha256/ab/ab12...ef/apercu.webp       (1re page, 600 px)
+    epreuves/sha256/ab/ab12...ef/page-001.webp     (miniatures, 180 px)
+
+Elles sont générées en arrière-plan après l'upload (`schedule_previews`), ou en
+lot par la commande `manage.py generate_previews`. Aucun rendu n'a lieu pendant
+une requête : une image manquante est planifiée (`get_or_schedule`) et l'API
+répond 202 en attendant. Un PDF partagé par plusieurs épreuves (stockage
+adressé par contenu) n'a donc qu'un seul jeu d'aperçus.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from . import extraction
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pypdfium2 absent : pas de rendu d'aperçus
+    pdfium = None
+
+APERCU_WIDTH = 600
+MINIATURE_WIDTH = 180
+WEBP_QUALITY = 70
+
+# Miniatures générées au maximum par épreuve lors du traitement en lot
+MAX_MINIATURES = 50
+
+CONTENT_TYPE = 'image/webp'
+
+# Délai avant de replanifier la génération d'un PDF (en cours ou en échec)
+PENDING_TIMEOUT = 600
+
+
+def is_available():
+    return pdfium is not None
+
+
+def preview_dir(pdf_name):
+    """Dossier des aperçus d'un PDF (même nom, sans l'extension)."""
+    return pdf_name.rsplit('.', 1)[0]
+
+
+def preview_name(pdf_name, page=None):
+    """Nom de l'aperçu (page=None) ou de la miniature d'une page (à partir de 1)."""
+    if page is None:
+        return f'{preview_dir(pdf_name)}/apercu.webp'
+    return f'{preview_dir(pdf_name)}/page-{page:03d}.webp'
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# RENDU
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _render(document, index, width):
+    page = document[index]
+    try:
+        scale = width / page.get_width()
+        image = page.render(scale=scale).to_pil()
+    finally:
+        page.close()
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='WEBP', quality=WEBP_QUALITY)
+    return buffer.getvalue()
+
+
+def render_from_path(path, pages=None, apercu=True, max_pages=MAX_MINIATURES):
+    """
+    Rend les images d'un PDF local.
+
+    Args:
+        pages: numéros de pages (à partir de 1) à rendre en miniature ; None =
+               toutes les pages jusqu'à `max_pages`
+        apercu: rendre aussi l'aperçu de la première page
+
+    Returns:
+        dict: {None: aperçu, numéro_de_page: miniature} en octets WebP
+    """
+    document = pdfium.PdfDocument(path)
+    try:
+        nb_pages = len(document)
+        if pages is None:
+            pages = range(1, min(nb_pages, max_pages) + 1)
+        images = {}
+        if apercu and nb_pages:
+            images[None] = _render(document, 0, APERCU_WIDTH)
+        for page in pages:
+            if 1 <= page <= nb_pages:
+                images[page] = _render(document, page - 1, MINIATURE_WIDTH)
+        return images
+    finally:
+        document.close()
+
+
+def save_images(field_file, images, overwrite=False):
+    """Enregistre les images rendues à côté du PDF. Retourne le nombre d'images écrites."""
+    storage = field_file.storage
+    written = 0
+    for page, content in images.items():
+        name = preview_name(field_file.name, page)
+        if storage.exists(name):
+            if not overwrite:
+                continue
+            storage.delete(name)
+        storage.save(name, ContentFile(content))
+        written += 1
+    return written
+
+
+def delete_previews(storage, pdf_name):
+    """Supprime le dossier d'aperçus d'un PDF (appelé quand le PDF est supprimé)."""
+    directory = preview_dir(pdf_name)
+    try:
+        _, files = storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for filename in files:
+        storage.delete(f'{directory}/{filename}')
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# GÉNÉRATION
+# ═══════════════════════════════════════════════════════════════════════════
+
+def _pending_key(pdf_name):
+    return f'previews:pending:{pdf_name}'
+
+
+def _failed_key(pdf_name):
+    return f'previews:failed:{pdf_name}'
+
+
+def get_or_schedule(epreuve, page=None):
+    """
+    Nom de l'aperçu (ou de la miniature `page`) s'il a déjà été généré. Sinon,
+    la génération du PDF est planifiée en arrière-plan, au plus une fois par
+    PENDING_TIMEOUT secondes : la requête ne rend jamais de page elle-même.
+
+    Returns:
+        tuple: (nom ou None, en_attente) — en_attente si la génération est
+               planifiée ou en cours ; (None, False) si l'image n'existera pas
+               (PDF absent ou illisible, page hors des miniatures générées)
+    """
+    if not epreuve.fichier_pdf:
+        return None, False
+    pdf_name = epreuve.fichier_pdf.name
+    name = preview_name(pdf_name, page)
+    storage = epreuve.fichier_pdf.storage
+    if storage.exists(name):
+        return name, False
+    if not is_available() or (page and page > MAX_MINIATURES) or cache.get(_failed_key(pdf_name)):
+        return None, False
+    # Aperçus déjà générés sans cette miniature : la page n'existe pas
+    if page and storage.exists(preview_name(pdf_name)):
+        return None, False
+    if cache.add(_pending_key(pdf_name), True, PENDING_TIMEOUT):
+        schedule_previews(epreuve.id)
+    return None, True
+
+
+def render_stored(pdf_name, max_pages=MAX_MINIATURES):
+    """
+    Rend les images d'un PDF du storage (copie locale temporaire si distant).
+    Appelée dans les processus de `manage.py generate_previews`.
+    """
+    with extraction.stored_copy(pdf_name) as path:
+        return render_from_path(path, max_pages=max_pages)
+
+
+def generate_previews(epreuve_ids):
+    """Génère aperçu et miniatures manquants pour une liste d'épreuves."""
+    from .models import Epreuve
+
+    generated = 0
+    for ep in Epreuve.objects.filter(id__in=epreuve_ids).only('id', 'fichier_pdf'):
+        if not ep.fichier_pdf:
+            continue
+        try:
+            with extraction.local_copy(ep.fichier_pdf) as path:
+                images = render_from_path(path)
+        except Exception as e:
+            logger.warning(f"Génération des aperçus impossible pour l'épreuve {ep.id}: {e}")
+            cache.set(_failed_key(ep.fichier_pdf.name), True, PENDING_TIMEOUT)
+            continue
+        generated += save_images(ep.fichier_pdf, images)
+        cache.delete(_pending_key(ep.fichier_pdf.name))
+    return generated
+
+
+def _generate_in_worker(epreuve_ids):
+    close_old_connections()
+    try:
+        return generate_previews(epreuve_ids)
+    finally:
+        close_old_connections()
+
+
+def schedule_previews(*epreuve_ids):
+    """Planifie la génération des aperçus après la validation de la transaction."""
+    if not is_available() or not epreuve_ids:
+        return
+    if not getattr(settings, 'PDF_EXTRACTION_ASYNC', True):
+        transaction.on_commit(lambda: generate_previews(list(epreuve_ids)))
+        return
+
+    def _submit():
+        # Même pool que l'extraction : un seul traitement de PDF à la fois par worker
+        future = extraction.get_executor().submit(_generate_in_worker, list(epreuve_ids))
+        future.add_done_callback(_log_failure)
+
+    transaction.on_commit(_submit)
+
+
+def _log_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"Échec de la génération des aperçus en arrière-plan: {exc}")
@@ -0,0 +1,308 @@
+"""
+Recherche plein texte sur les épreuves.
+
+Chaque épreuve possède une ligne dans `EpreuveSearchIndex` contenant ses champs
+texte déjà normalisés (minuscules, sans accents, racinisés en français). La
+normalisation est faite en Python pour que tous les moteurs se comportent de
+la même façon ; seul l'index change :
+
+  - PostgreSQL : index GIN sur un tsvector pondéré (titre > matière >
+    description > contenu du PDF), classement avec ts_rank_cd ;
+  - SQLite     : table virtuelle FTS5 `core_epreuve_fts`, classement bm25 ;
+  - autres     : repli en Python sur la table d'index (MySQL sur PythonAnywhere).
+
+La recherche s'applique au queryset déjà filtré (visibilité, niveau, matière...) :
+jointure avec l'index et classement dans la même requête SQL.
+
+L'index est mis à jour de façon incrémentale à chaque enregistrement d'une
+épreuve (voir `apps.core.signals`) ; `manage.py rebuild_search_index` le
+reconstruit entièrement.
+"""
+import heapq
+import logging
+import re
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, When
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+# Champs de `Epreuve` qui alimentent l'index
+INDEXED_FIELDS = ('titre', 'matiere', 'description', 'texte_extrait')
+
+# Pondération des colonnes (titre, matière, description, contenu)
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+# Taille max du contenu PDF indexé (en caractères normalisés)
+MAX_CONTENT_LENGTH = 200_000
+
+# Repli sans index plein texte : nombre max de résultats classés par pertinence
+MAX_RESULTS = 1000
+
+FTS_TABLE = 'core_epreuve_fts'
+
+# tsvector pondéré — doit correspondre exactement à l'expression de l'index GIN
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', titre), 'A') || "
+    "setweight(to_tsvector('simple', matiere), 'B') || "
+    "setweight(to_tsvector('simple', description), 'C') || "
+    "setweight(to_tsvector('simple', contenu), 'D')"
+)
+
+
+def _qualified_pg_vector(table):
+    """PG_VECTOR_SQL aux colonnes qualifiées (jointure avec core_epreuve, mêmes noms)."""
+    return re.sub(r"(to_tsvector\('simple', )(\w+)\)", rf'\1{table}.\2)', PG_VECTOR_SQL)
+
+STOP_WORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'en', 'et',
+    'il', 'la', 'le', 'les', 'leur', 'on', 'ou', 'par', 'pas', 'pour', 'qu',
+    'que', 'qui', 'sa', 'se', 'ses', 'son', 'sur', 'un', 'une', 'est', 'sont',
+    'l', 'd', 'j', 'n', 's', 't', 'c', 'm', 'y',
+}
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Suffixes retirés par le raciniseur léger, du plus long au plus court
+_SUFFIXES = (
+    'issements', 'issement', 'ements', 'ement', 'ations', 'ation', 'atrices',
+    'atrice', 'ateurs', 'ateur', 'logies', 'logie', 'ences', 'ence', 'ances',
+    'ance', 'ismes', 'isme', 'istes', 'iste', 'ables', 'able', 'ites', 'ite',
+    'iques', 'ique', 'ives', 'ive', 'if', 'euse', 'eur', 'ee', 'er', 'ez', 'e',
+)
+
+
+def strip_accents(text):
+    """Supprime les accents (é → e, ç → c...)."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(word):
+    """
+    Raciniseur français léger (suffixes flexionnels et dérivationnels courants).
+    Garde toujours au moins 3 caractères pour ne pas confondre les mots courts.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    # Pluriels : réseaux → réseau, généraux → général, épreuves → épreuve
+    if word.endswith('eaux'):
+        word = word[:-1]
+    elif word.endswith('aux'):
+        word = word[:-3] + 'al'
+    elif word[-1] in 'sx' and len(word) > 4:
+        word = word[:-1]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Texte brut → liste de racines normalisées (sans mots vides)."""
+    if not text:
+        return []
+    words = _TOKEN_RE.findall(strip_accents(text).lower())
+    return [stem(w) for w in words if w not in STOP_WORDS]
+
+
+def normalize(text, unique=False, max_length=None):
+    tokens = tokenize(text)
+    if unique:
+        tokens = list(dict.fromkeys(tokens))
+    document = ' '.join(tokens)
+    if max_length and len(document) > max_length:
+        document = document[:max_length].rsplit(' ', 1)[0]
+    return document
+
+
+def build_document(epreuve):
+    """Colonnes normalisées d'une épreuve pour `EpreuveSearchIndex`."""
+    return {
+        'titre': normalize(epreuve.titre),
+        'matiere': normalize(epreuve.matiere),
+        'description': normalize(epreuve.description or ''),
+        # Le contenu des PDF est long : on ne garde qu'une occurrence par racine
+        'contenu': normalize(epreuve.texte_extrait, unique=True, max_length=MAX_CONTENT_LENGTH),
+    }
+
+
+# ════════════════════════════════════════════════════════════
+#  Maintenance de l'index
+# ════════════════════════════════════════════════════════════
+
+def _fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    if not hasattr(_fts_available, 'result'):
+        _fts_available.result = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available.result
+
+
+def index_epreuves(epreuves):
+    """Crée ou met à jour les lignes d'index des épreuves données."""
+    from .models import EpreuveSearchIndex
+
+    rows = [EpreuveSearchIndex(epreuve_id=ep.id, **build_document(ep)) for ep in epreuves]
+    if not rows:
+        return 0
+
+    with transaction.atomic():
+        EpreuveSearchIndex.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['epreuve'],
+            update_fields=['titre', 'matiere', 'description', 'contenu'],
+        )
+        if _fts_available():
+            ids = [row.epreuve_id for row in rows]
+            with connection.cursor() as cursor:
+                cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(i,) for i in ids])
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, titre, matiere, description, contenu) '
+                    f'VALUES (%s, %s, %s, %s, %s)',
+                    [(r.epreuve_id, r.titre, r.matiere, r.description, r.contenu) for r in rows],
+                )
+    return len(rows)
+
+
+def index_epreuve(epreuve):
+    index_epreuves([epreuve])
+
+
+def remove_from_index(epreuve_id):
+    """La ligne `EpreuveSearchIndex` part en cascade ; seule la table FTS5 est à nettoyer."""
+    if _fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [epreuve_id])
+
+
+def rebuild_index(batch_size=500):
+    """Reconstruit l'index complet, par lots."""
+    from .models import Epreuve
+
+    if _fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    total = 0
+    queryset = Epreuve.objects.only(*INDEXED_FIELDS).order_by('id')
+    batch = []
+    for ep in queryset.iterator(chunk_size=batch_size):
+        batch.append(ep)
+        if len(batch) >= batch_size:
+            total += index_epreuves(batch)
+            batch = []
+    total += index_epreuves(batch)
+    return total
+
+
+# ════════════════════════════════════════════════════════════
+#  Requêtes
+# ════════════════════════════════════════════════════════════
+
+def search(queryset, query, order=True):
+    """
+    Restreint `queryset` (visibilité et filtres déjà appliqués) aux épreuves
+    correspondant à `query`. Le classement est calculé dans la même requête, sur
+    ces seules épreuves : les résultats sont complets quels que soient les filtres.
+
+    Args:
+        order: trier par pertinence décroissante (colonne `search_rank`)
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        return _search_postgres(queryset, terms, order)
+    if _fts_available():
+        return _search_fts5(queryset, terms, order)
+    return _search_python(queryset, terms, order)
+
+
+def _search_postgres(queryset, terms, order):
+    # Préfixes (`:*`) pour une recherche au fil de la frappe
+    tsquery = ' & '.join(f'{t}:*' for t in terms)
+    vector = _qualified_pg_vector('core_epreuvesearchindex')
+    queryset = queryset.extra(
+        select={'search_rank': f"ts_rank_cd({vector}, to_tsquery('simple', %s))"},
+        select_params=[tsquery],
+        tables=['core_epreuvesearchindex'],
+        where=[
+            f'core_epreuvesearchindex.epreuve_id = {queryset.model._meta.db_table}.id',
+            f"({vector}) @@ to_tsquery('simple', %s)",
+        ],
+        params=[tsquery],
+    )
+    return queryset.order_by('-search_rank', '-id') if order else queryset
+
+
+def _search_fts5(queryset, terms, order):
+    match = ' AND '.join(f'"{t}"*' for t in terms)
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    # Jointure sur les rowid FTS5 ; bm25() renvoie un score négatif (plus petit = plus pertinent)
+    queryset = queryset.extra(
+        select={'search_rank': f'-bm25({FTS_TABLE}, {weights})'},
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {queryset.model._meta.db_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+    )
+    return queryset.order_by('-search_rank', '-id') if order else queryset
+
+
+def _search_python(queryset, terms, order):
+    """
+    Repli sans index plein texte : filtre SQL sur les colonnes normalisées des
+    épreuves du queryset, score en Python. Seules les MAX_RESULTS premières
+    sont classées, les suivantes viennent après, des plus récentes aux plus anciennes.
+    """
+    columns = [f'search_index__{column}' for column in ('titre', 'matiere', 'description', 'contenu')]
+    for term in terms:
+        q = Q()
+        for column in columns:
+            q |= Q(**{f'{column}__contains': term})
+        queryset = queryset.filter(q)
+    if not order:
+        return queryset
+
+    scored = []
+    for row in queryset.order_by().values_list('id', *columns).iterator():
+        epreuve_id, values = row[0], row[1:]
+        rank = 0.0
+        for value, weight in zip(values, COLUMN_WEIGHTS):
+            tokens = value.split()
+            for term in terms:
+                rank += weight * sum(1 for tok in tokens if tok.startswith(term))
+        scored.append((rank, epreuve_id))
+    ids = [epreuve_id for _, epreuve_id in heapq.nlargest(MAX_RESULTS, scored)]
+    position = Case(
+        *[When(id=epreuve_id, then=i) for i, epreuve_id in enumerate(ids)],
+        default=len(ids),
+        output_field=IntegerField(),
+    )
+    return queryset.annotate(search_position=position).order_by('search_position', '-id')
+
+
+def is_ranked(request):
+    """Vrai si la liste est triée par pertinence : recherche sans paramètre `ordering`."""
+    query = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+    return bool(query) and 'ordering' not in request.query_params
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Remplace les `ILIKE '%terme%'` de `SearchFilter` par l'index plein texte.
+    Sans paramètre `ordering` explicite, les résultats sont triés par pertinence.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search(queryset, query, order=is_ranked(request))
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema_field
 from .models import Epreuve, Interaction, Evaluation, Commentaire
+from .upload_handlers import MAX_PDF_SIZE
 
 User = get_user_model()
 
@@ -79,17 +80,40 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
+def build_apercu_url(serializer, obj):
+    """URL de l'aperçu de la 1re page, versionnée par le hash du PDF (cache longue durée)."""
+    request = serializer.context.get('request')
+    if not obj.fichier_pdf or not request:
+        return None
+    url = f'/api/epreuves/{obj.id}/apercu/'
+    if obj.hash_fichier:
+        url += f'?v={obj.hash_fichier[:16]}'
+    return request.build_absolute_uri(url)
+
+
 class EpreuveListSerializer(serializers.ModelSerializer):
+    apercu_url = serializers.SerializerMethodField()
+
+    # Colonnes chargées par EpreuveViewSet pour la liste (projection .only())
+    queryset_fields = ['id', 'titre', 'matiere', 'niveau', 'type_epreuve',
+                       'annee_academique', 'nb_vues', 'nb_telechargements',
+                       'note_moyenne_difficulte', 'note_moyenne_pertinence',
+                       'created_at', 'fichier_pdf', 'hash_fichier']
+
     class Meta:
         model = Epreuve
         fields = ['id', 'titre', 'matiere', 'niveau', 'type_epreuve', 
                   'annee_academique', 'nb_vues', 
                   'nb_telechargements', 'note_moyenne_difficulte', 
-                  'note_moyenne_pertinence', 'created_at']
+                  'note_moyenne_pertinence', 'created_at', 'apercu_url']
         read_only_fields = ['id', 'nb_vues', 'nb_telechargements', 
                             'note_moyenne_difficulte', 'note_moyenne_pertinence', 
                             'created_at']
 
+    @extend_schema_field(serializers.CharField)
+    def get_apercu_url(self, obj):
+        return build_apercu_url(self, obj)
+
 
 class EpreuveDetailSerializer(serializers.ModelSerializer):
     nb_evaluations = serializers.SerializerMethodField()
@@ -99,6 +123,7 @@ class EpreuveDetailSerializer(serializers.ModelSerializer):
     fichier_url = serializers.SerializerMethodField()
     download_url = serializers.SerializerMethodField()
     preview_url = serializers.SerializerMethodField()
+    apercu_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Epreuve
@@ -107,12 +132,12 @@ class EpreuveDetailSerializer(serializers.ModelSerializer):
                   'nb_vues', 'nb_telechargements', 'note_moyenne_difficulte', 
                   'note_moyenne_pertinence', 'nb_evaluations', 'nb_commentaires',
                   'taille_fichier', 'taille_fichier_mb', 'hash_fichier', 'nb_pages',
-                  'texte_extrait', 'uploaded_by', 'uploaded_by_username',
-                  'fichier_url', 'download_url', 'preview_url',
+                  'uploaded_by', 'uploaded_by_username',
+                  'fichier_url', 'download_url', 'preview_url', 'apercu_url',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'nb_vues', 'nb_telechargements', 
                             'note_moyenne_difficulte', 'note_moyenne_pertinence',
-                            'taille_fichier', 'hash_fichier', 'nb_pages', 'texte_extrait',
+                            'taille_fichier', 'hash_fichier', 'nb_pages',
                             'uploaded_by', 'created_at', 'updated_at']
     
     @extend_schema_field(serializers.IntegerField)
@@ -161,11 +186,15 @@ class EpreuveDetailSerializer(serializers.ModelSerializer):
                     return url
             except Exception:
                 pass
-        # Fallback : passer par l'API de téléchargement
+        # Fallback : lecture via l'API de téléchargement, sans compter de téléchargement
         request = self.context.get('request')
         if request:
-            return request.build_absolute_uri(f'/api/epreuves/{obj.id}/download/')
+            return request.build_absolute_uri(f'/api/epreuves/{obj.id}/download/?inline=1')
         return None
+    
+    @extend_schema_field(serializers.CharField)
+    def get_apercu_url(self, obj):
+        return build_apercu_url(self, obj)
 
 
 class EpreuveCreateUpdateSerializer(serializers.ModelSerializer):
@@ -193,8 +222,7 @@ class EpreuveUploadSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Seuls les fichiers PDF sont acceptés")
         
         # Vérifier la taille (20 MB max)
-        max_size = 20 * 1024 * 1024  # 20 MB
-        if value.size > max_size:
+        if value.size > MAX_PDF_SIZE:
             raise serializers.ValidationError(
                 f"Le fichier ne doit pas dépasser 20 MB. Taille actuelle: {value.size / (1024*1024):.2f} MB"
             )
@@ -207,7 +235,8 @@ class EpreuveUploadSerializer(serializers.ModelSerializer):
         if request and hasattr(request, 'user'):
             validated_data['uploaded_by'] = request.user
         
-        # Le modèle Epreuve gérera automatiquement l'extraction des métadonnées dans save()
+        # Taille et hash sont calculés dans Epreuve.save() ; pages et texte
+        # sont extraits en arrière-plan (voir apps.core.extraction)
         return super().create(validated_data)
 
 
@@ -0,0 +1,265 @@
+"""
+Signaux du module core : maintien des structures dérivées des épreuves.
+"""
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Commentaire, Epreuve, Evaluation, Interaction, User
+from . import cache_tags
+from . import metrics
+from . import search
+from . import snapshots
+from . import stats
+from . import storage
+
+# Champs qui modifient le fichier référencé par une épreuve
+FILE_FIELDS = ('fichier_pdf', 'hash_fichier')
+
+# Compteurs et moyennes : leur mise à jour n'invalide pas tout le cache de recommandations
+COUNTER_FIELDS = (
+    'nb_vues', 'nb_telechargements', 'note_moyenne_difficulte', 'note_moyenne_pertinence',
+)
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+@contextmanager
+def derived_updates_suspended():
+    """
+    Suspend la mise à jour incrémentale des compteurs et du cache de
+    recommandations (imports en masse). L'appelant les reconstruit ensuite :
+    `stats.reconcile()` et `cache_tags.invalidate(cache_tags.MODELE)`.
+    """
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def updates_suspended():
+    """Vrai pendant `derived_updates_suspended()` (thread courant)."""
+    return getattr(_state, 'suspended', False)
+
+
+def _unless_suspended(handler):
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        if updates_suspended():
+            return None
+        return handler(*args, **kwargs)
+    return wrapper
+
+
+@receiver(post_save, sender=Epreuve)
+def update_search_index(sender, instance, created, update_fields=None, **kwargs):
+    """Réindexe l'épreuve quand un champ texte change (pas pour les compteurs)."""
+    if update_fields is not None and not set(update_fields) & set(search.INDEXED_FIELDS):
+        return
+
+    def _index():
+        try:
+            search.index_epreuve(instance)
+        except Exception as e:
+            logger.error(f"Indexation de l'épreuve {instance.pk} impossible: {e}")
+
+    transaction.on_commit(_index)
+
+
+@receiver(post_delete, sender=Epreuve)
+def remove_search_index(sender, instance, **kwargs):
+    search.remove_from_index(instance.pk)
+
+
+@receiver(pre_save, sender=Epreuve)
+def remember_previous_hash(sender, instance, update_fields=None, **kwargs):
+    """Mémorise l'ancien hash pour libérer l'ancien fichier si le PDF change."""
+    instance._previous_hash = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(FILE_FIELDS):
+        return
+    instance._previous_hash = (
+        Epreuve.objects.filter(pk=instance.pk).values_list('hash_fichier', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Epreuve)
+def update_file_references(sender, instance, update_fields=None, **kwargs):
+    """Met à jour le compteur de références du fichier (et de l'ancien s'il a changé)."""
+    if update_fields is not None and not set(update_fields) & set(FILE_FIELDS):
+        return
+    previous = getattr(instance, '_previous_hash', None)
+    hashes = {instance.hash_fichier, previous} - {None, ''}
+    if not hashes:
+        return
+    transaction.on_commit(lambda: [storage.sync_references(h) for h in hashes])
+
+
+@receiver(post_delete, sender=Epreuve)
+def release_file_reference(sender, instance, **kwargs):
+    """Le fichier n'est supprimé du storage que si plus aucune épreuve ne l'utilise."""
+    if instance.hash_fichier:
+        transaction.on_commit(lambda: storage.sync_references(instance.hash_fichier))
+
+
+# ── Invalidation du cache de recommandations ──
+
+def _invalidate_on_commit(*tags):
+    # Après validation : une requête concurrente ne doit pas remettre en cache
+    # un résultat calculé avant l'écriture sous la nouvelle génération
+    transaction.on_commit(lambda: cache_tags.invalidate(*tags))
+
+
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+@_unless_suspended
+def invalidate_user_recommendations(sender, instance, **kwargs):
+    _invalidate_on_commit(cache_tags.user_tag(instance.user_id))
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_save, sender=Commentaire)
+@receiver(post_delete, sender=Commentaire)
+@_unless_suspended
+def invalidate_feedback_recommendations(sender, instance, **kwargs):
+    _invalidate_on_commit(
+        cache_tags.user_tag(instance.user_id), cache_tags.epreuve_tag(instance.epreuve_id),
+    )
+
+
+@receiver(post_save, sender=Epreuve)
+@_unless_suspended
+def invalidate_catalogue_on_save(sender, instance, update_fields=None, **kwargs):
+    """Nouvelle épreuve ou métadonnées modifiées : toutes les recommandations sont à refaire."""
+    if update_fields is not None and set(update_fields) <= set(COUNTER_FIELDS):
+        return
+    _invalidate_on_commit(cache_tags.MODELE, cache_tags.epreuve_tag(instance.pk))
+    transaction.on_commit(lambda: snapshots.forget(instance.pk))
+
+
+@receiver(post_delete, sender=Epreuve)
+@_unless_suspended
+def invalidate_catalogue_on_delete(sender, instance, **kwargs):
+    _invalidate_on_commit(cache_tags.MODELE, cache_tags.epreuve_tag(instance.pk))
+    pk = instance.pk
+    transaction.on_commit(lambda: snapshots.forget(pk))
+
+
+# ── Agrégats du tableau de bord (apps/core/stats.py) ──
+# Mis à jour dans la transaction de l'écriture : un rollback annule aussi le compteur.
+
+def _previous_values(model, instance, fields, update_fields):
+    if instance.pk is None:
+        return None
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return None
+    return model.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(pre_save, sender=User)
+@_unless_suspended
+def remember_previous_user_stats(sender, instance, update_fields=None, **kwargs):
+    instance._stats_previous = _previous_values(User, instance, stats.USER_FIELDS, update_fields)
+
+
+@receiver(pre_save, sender=Epreuve)
+@_unless_suspended
+def remember_previous_epreuve_stats(sender, instance, update_fields=None, **kwargs):
+    instance._stats_previous = _previous_values(Epreuve, instance, stats.EPREUVE_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+@_unless_suspended
+def update_user_stats(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    if not created and previous is None:
+        return
+    stats.apply_change(
+        stats.user_keys(**previous) if previous else [],
+        stats.user_keys(instance.is_superuser, instance.filiere, instance.niveau),
+    )
+
+
+@receiver(post_save, sender=Epreuve)
+@_unless_suspended
+def update_epreuve_stats(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    if not created and previous is None:
+        return
+    stats.apply_change(
+        stats.epreuve_keys(**previous) if previous else [],
+        stats.epreuve_keys(instance.is_approved, instance.matiere, instance.niveau),
+    )
+
+
+@receiver(post_delete, sender=User)
+@_unless_suspended
+def remove_user_stats(sender, instance, **kwargs):
+    stats.apply_change(stats.user_keys(instance.is_superuser, instance.filiere, instance.niveau), [])
+
+
+@receiver(post_delete, sender=Epreuve)
+@_unless_suspended
+def remove_epreuve_stats(sender, instance, **kwargs):
+    stats.apply_change(stats.epreuve_keys(instance.is_approved, instance.matiere, instance.niveau), [])
+
+
+@receiver(post_save, sender=Interaction)
+@_unless_suspended
+def count_interaction(sender, instance, created, **kwargs):
+    if not created:
+        return
+    stats.increment('interactions')
+    if not Interaction.objects.filter(user_id=instance.user_id).exclude(pk=instance.pk).exists():
+        stats.increment('interactions_users')
+
+
+@receiver(post_save, sender=Interaction)
+def meter_interaction(sender, instance, created, **kwargs):
+    # Débit d'ingestion (/metrics), y compris pendant un import
+    if created:
+        metrics.INTERACTIONS.inc(action=instance.action_type)
+
+
+@receiver(post_delete, sender=Interaction)
+@_unless_suspended
+def uncount_interaction(sender, instance, origin=None, **kwargs):
+    stats.increment('interactions', delta=-1)
+    # Suppression groupée (queryset, cascade depuis l'utilisateur) : les post_delete
+    # arrivent après le DELETE, un utilisateur n'est décompté qu'une fois par opération
+    released = getattr(origin, '_stats_released_users', None)
+    if released is None:
+        released = set()
+        if origin is not None:
+            origin._stats_released_users = released
+    if instance.user_id in released:
+        return
+    if not Interaction.objects.filter(user_id=instance.user_id).exists():
+        released.add(instance.user_id)
+        stats.increment('interactions_users', delta=-1)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_save, sender=Commentaire)
+@_unless_suspended
+def count_feedback(sender, instance, created, **kwargs):
+    if created:
+        stats.increment('evaluations' if sender is Evaluation else 'commentaires')
+
+
+@receiver(post_delete, sender=Evaluation)
+@receiver(post_delete, sender=Commentaire)
+@_unless_suspended
+def uncount_feedback(sender, instance, **kwargs):
+    stats.increment('evaluations' if sender is Evaluation else 'commentaires', delta=-1)
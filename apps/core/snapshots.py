@@ -0,0 +1,67 @@
+"""
+Instantanés compacts des épreuves pour les résultats mis en cache.
+
+Les résultats de recommandation mis en cache ne contiennent que des ID et des
+scores ; les épreuves sont reconstruites à partir d'un instantané limité aux
+champs affichés (jamais `texte_extrait` ni `description`). Les champs absents
+de l'instantané restent différés : y accéder déclenche une requête, comme
+avec `.only()`.
+"""
+from .tiered_cache import get_tiered_cache
+
+SNAPSHOT_FIELDS = (
+    'id', 'titre', 'matiere', 'niveau', 'type_epreuve', 'annee_academique',
+    'nb_vues', 'nb_telechargements', 'note_moyenne_difficulte', 'note_moyenne_pertinence',
+    'is_approved',
+)
+
+# Les compteurs d'un instantané peuvent avoir jusqu'à 5 minutes de retard
+SNAPSHOT_TIMEOUT = 300
+
+
+def _cache():
+    return get_tiered_cache('epreuve_snap', local_timeout=SNAPSHOT_TIMEOUT)
+
+
+def _snapshot(epreuve):
+    return tuple(getattr(epreuve, field) for field in SNAPSHOT_FIELDS)
+
+
+def _rebuild(values):
+    from .models import Epreuve
+
+    # from_db attend les champs dans l'ordre du modèle
+    by_name = dict(zip(SNAPSHOT_FIELDS, values))
+    field_names = [f.attname for f in Epreuve._meta.concrete_fields if f.attname in by_name]
+    return Epreuve.from_db('default', field_names, [by_name[name] for name in field_names])
+
+
+def remember(epreuves):
+    """Met en cache l'instantané d'épreuves déjà chargées."""
+    snapshots = {ep.pk: _snapshot(ep) for ep in epreuves}
+    if snapshots:
+        _cache().set_many(snapshots, SNAPSHOT_TIMEOUT)
+
+
+def get_epreuves(ids):
+    """
+    Épreuves reconstruites depuis le cache, les manquantes en une seule requête.
+
+    Returns:
+        dict: {id: Epreuve} (les épreuves supprimées sont absentes)
+    """
+    from .models import Epreuve
+
+    ids = list(ids)
+    cached = _cache().get_many(ids)
+    result = {pk: _rebuild(values) for pk, values in cached.items()}
+    missing = [pk for pk in ids if pk not in result]
+    if missing:
+        loaded = Epreuve.objects.only(*SNAPSHOT_FIELDS).in_bulk(missing)
+        remember(loaded.values())
+        result.update(loaded)
+    return result
+
+
+def forget(epreuve_id):
+    _cache().delete(epreuve_id)
@@ -0,0 +1,237 @@
+"""
+Agrégats du tableau de bord maintenus incrémentalement.
+
+Les totaux et effectifs par groupe (utilisateurs par filière, épreuves par
+matière...) sont stockés dans `StatCompteur` et mis à jour par les signaux
+(apps/core/signals.py) dans la transaction de l'écriture. Les vues de
+statistiques lisent cette petite table en une requête, quelle que soit la
+taille des tables sources.
+
+Les écritures en masse (`bulk_create`, `QuerySet.update`) ne déclenchent pas
+les signaux : les commandes concernées appellent `reconcile()`, également
+disponible via `python manage.py reconcile_stats`.
+
+Compteurs (nom → clé) :
+    users, users_hors_admin                  total ('')
+    users_par_filiere, users_par_niveau      filière / niveau ('' si non renseigné)
+    epreuves_approuvees, epreuves_en_attente total
+    epreuves_par_matiere, epreuves_par_niveau
+    interactions, interactions_users         interactions / utilisateurs distincts
+    evaluations, commentaires                total
+"""
+import logging
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+logger = logging.getLogger(__name__)
+
+TOTAL = ''
+
+# Champs dont dépend la contribution d'une ligne aux compteurs
+USER_FIELDS = ('is_superuser', 'filiere', 'niveau')
+EPREUVE_FIELDS = ('is_approved', 'matiere', 'niveau')
+
+
+# ════════════════════════════════════════════════════════
+# Contributions d'une ligne
+# ════════════════════════════════════════════════════════
+
+def user_keys(is_superuser, filiere, niveau):
+    keys = [('users', TOTAL)]
+    if not is_superuser:
+        keys += [
+            ('users_hors_admin', TOTAL),
+            ('users_par_filiere', filiere or ''),
+            ('users_par_niveau', niveau or ''),
+        ]
+    return keys
+
+
+def epreuve_keys(is_approved, matiere, niveau):
+    return [
+        ('epreuves_approuvees' if is_approved else 'epreuves_en_attente', TOTAL),
+        ('epreuves_par_matiere', matiere),
+        ('epreuves_par_niveau', niveau),
+    ]
+
+
+# ════════════════════════════════════════════════════════
+# Mise à jour incrémentale
+# ════════════════════════════════════════════════════════
+
+def increment(nom, cle=TOTAL, delta=1):
+    """Ajoute `delta` au compteur (créé à la volée)."""
+    from .models import StatCompteur
+
+    if not delta:
+        return
+    compteurs = StatCompteur.objects.filter(nom=nom, cle=cle)
+    if compteurs.update(valeur=F('valeur') + delta):
+        return
+    try:
+        with transaction.atomic():
+            StatCompteur.objects.create(nom=nom, cle=cle, valeur=delta)
+    except IntegrityError:
+        # Créé entre-temps par une écriture concurrente
+        compteurs.update(valeur=F('valeur') + delta)
+
+
+def apply_change(old_keys, new_keys):
+    """Retire les contributions de l'ancien état et ajoute celles du nouveau."""
+    deltas = Counter(new_keys)
+    deltas.subtract(Counter(old_keys))
+    for (nom, cle), delta in deltas.items():
+        increment(nom, cle, delta)
+
+
+# ════════════════════════════════════════════════════════
+# Lecture
+# ════════════════════════════════════════════════════════
+
+def get_counters():
+    """
+    Tous les compteurs : {nom: {clé: valeur}}.
+    Table vide (premier déploiement) : calculés une fois depuis les tables sources.
+    """
+    from .models import StatCompteur
+
+    rows = list(StatCompteur.objects.values_list('nom', 'cle', 'valeur'))
+    if not rows:
+        return _group(reconcile())
+    return _group(rows)
+
+
+def _group(rows):
+    counters = defaultdict(dict)
+    for nom, cle, valeur in rows:
+        counters[nom][cle] = valeur
+    return counters
+
+
+def _total(counters, nom):
+    return counters.get(nom, {}).get(TOTAL, 0)
+
+
+def _groups(counters, nom, field):
+    # Clé '' = champ non renseigné (NULL), comme dans un GROUP BY
+    return [
+        {field: cle or None, 'count': valeur}
+        for cle, valeur in counters.get(nom, {}).items()
+        if valeur > 0
+    ]
+
+
+def dashboard(user):
+    """Statistiques globales du tableau de bord (GET /api/admin/stats/)."""
+    from .models import Epreuve
+
+    counters = get_counters()
+    stats = {
+        'total_users': _total(counters, 'users_hors_admin'),
+        'total_epreuves': _total(counters, 'epreuves_approuvees'),
+        'total_interactions': _total(counters, 'interactions'),
+        'total_evaluations': _total(counters, 'evaluations'),
+        'total_commentaires': _total(counters, 'commentaires'),
+        'pending_count': _total(counters, 'epreuves_en_attente'),
+        'epreuves_par_matiere': sorted(
+            _groups(counters, 'epreuves_par_matiere', 'matiere'), key=lambda g: -g['count'],
+        )[:10],
+        'epreuves_par_niveau': sorted(
+            _groups(counters, 'epreuves_par_niveau', 'niveau'), key=lambda g: g['niveau'] or '',
+        ),
+        # Index (-nb_telechargements, -id) : lecture des 5 premières entrées seulement
+        'top_epreuves': list(
+            Epreuve.objects.order_by('-nb_telechargements')[:5]
+            .values('id', 'titre', 'matiere', 'niveau', 'nb_telechargements', 'nb_vues')
+        ),
+    }
+    if user.is_staff:
+        stats['users_par_filiere'] = sorted(
+            _groups(counters, 'users_par_filiere', 'filiere'), key=lambda g: -g['count'],
+        )
+        stats['users_par_niveau'] = sorted(
+            _groups(counters, 'users_par_niveau', 'niveau'), key=lambda g: g['niveau'] or '',
+        )
+    return stats
+
+
+def global_recommendation_stats():
+    """Statistiques globales de RecommendationStatsView (administrateurs)."""
+    from .models import Epreuve
+
+    counters = get_counters()
+    interactions = _total(counters, 'interactions')
+    active_users = _total(counters, 'interactions_users')
+    return {
+        'total_users': _total(counters, 'users'),
+        'total_epreuves': _total(counters, 'epreuves_approuvees') + _total(counters, 'epreuves_en_attente'),
+        'total_interactions': interactions,
+        'avg_interactions_per_user': interactions / active_users if active_users else None,
+        'most_popular_epreuves': list(
+            Epreuve.objects.order_by('-nb_telechargements')[:5]
+            .values('id', 'titre', 'nb_telechargements', 'nb_vues')
+        ),
+    }
+
+
+# ════════════════════════════════════════════════════════
+# Recalcul complet
+# ════════════════════════════════════════════════════════
+
+def compute():
+    """Compteurs recalculés depuis les tables sources : {(nom, clé): valeur}."""
+    from .models import Commentaire, Epreuve, Evaluation, Interaction
+
+    User = get_user_model()
+    values = Counter()
+
+    for row in User.objects.values(*USER_FIELDS).annotate(n=Count('id')):
+        for key in user_keys(row['is_superuser'], row['filiere'], row['niveau']):
+            values[key] += row['n']
+
+    for row in Epreuve.objects.values(*EPREUVE_FIELDS).annotate(n=Count('id')):
+        for key in epreuve_keys(row['is_approved'], row['matiere'], row['niveau']):
+            values[key] += row['n']
+
+    values[('interactions', TOTAL)] = Interaction.objects.count()
+    values[('interactions_users', TOTAL)] = Interaction.objects.values('user').distinct().count()
+    values[('evaluations', TOTAL)] = Evaluation.objects.count()
+    values[('commentaires', TOTAL)] = Commentaire.objects.count()
+    return values
+
+
+def reconcile(dry_run=False):
+    """
+    Recalcule tous les compteurs et remplace le contenu de `StatCompteur`.
+
+    Returns:
+        list: [(nom, clé, valeur)] recalculés
+    """
+    from .models import StatCompteur
+
+    rows = [(nom, cle, valeur) for (nom, cle), valeur in compute().items() if valeur]
+    if dry_run:
+        return rows
+    with transaction.atomic():
+        StatCompteur.objects.all().delete()
+        StatCompteur.objects.bulk_create([
+            StatCompteur(nom=nom, cle=cle, valeur=valeur) for nom, cle, valeur in rows
+        ])
+    logger.info(f"Statistiques recalculées ({len(rows)} compteurs)")
+    return rows
+
+
+def drift(rows):
+    """Écarts entre les compteurs stockés et `rows` : [(nom, clé, stocké, attendu)]."""
+    from .models import StatCompteur
+
+    stored = {(nom, cle): valeur for nom, cle, valeur in StatCompteur.objects.values_list('nom', 'cle', 'valeur')}
+    expected = {(nom, cle): valeur for nom, cle, valeur in rows}
+    return sorted(
+        (nom, cle, stored.get((nom, cle), 0), expected.get((nom, cle), 0))
+        for nom, cle in stored.keys() | expected.keys()
+        if stored.get((nom, cle), 0) != expected.get((nom, cle), 0)
+    )
@@ -0,0 +1,95 @@
+"""
+Stockage des PDF adressé par contenu.
+
+Chaque PDF est stocké une seule fois sous son SHA-256 :
+    epreuves/sha256/ab/ab12...ef.pdf
+
+Plusieurs épreuves peuvent pointer vers le même fichier ; `FichierPDF` tient le
+compte des références et le fichier n'est supprimé du storage que lorsque plus
+aucune épreuve ne l'utilise. Le hash sert aussi d'ETag fort au téléchargement :
+un contenu donné a toujours la même URL et le même ETag.
+"""
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+CAS_PREFIX = 'epreuves/sha256'
+CHUNK_SIZE = 256 * 1024
+
+_CAS_NAME_RE = re.compile(r'^epreuves/sha256/[0-9a-f]{2}/([0-9a-f]{64})\.pdf$')
+
+
+def content_addressed_name(file_hash):
+    """Chemin de stockage d'un PDF à partir de son SHA-256."""
+    return f'{CAS_PREFIX}/{file_hash[:2]}/{file_hash}.pdf'
+
+
+def hash_from_name(name):
+    """Hash contenu dans un chemin adressé par contenu, sinon None."""
+    match = _CAS_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+def etag_for(file_hash):
+    """ETag fort (RFC 7232) dérivé du hash du contenu."""
+    return f'"{file_hash}"' if file_hash else None
+
+
+def hash_stored_file(storage, name):
+    """
+    SHA-256 et taille d'un fichier du storage, lu par blocs.
+
+    Returns:
+        tuple: (hash, taille)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with storage.open(name, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def sync_references(file_hash):
+    """
+    Recalcule le nombre de références d'un fichier et le supprime s'il n'est plus utilisé.
+    """
+    from .models import Epreuve, FichierPDF
+
+    if not file_hash:
+        return
+    epreuves = (
+        Epreuve.objects.filter(hash_fichier=file_hash)
+        .exclude(fichier_pdf='').exclude(fichier_pdf__isnull=True)
+    )
+    references = epreuves.count()
+    if references:
+        first = epreuves.only('fichier_pdf', 'taille_fichier').first()
+        FichierPDF.objects.update_or_create(
+            hash=file_hash,
+            defaults={
+                'chemin': first.fichier_pdf.name,
+                'taille': first.taille_fichier,
+                'nb_references': references,
+            },
+        )
+        return
+
+    fichier = FichierPDF.objects.filter(hash=file_hash).first()
+    if fichier is None:
+        return
+    from .previews import delete_previews
+
+    storage = Epreuve._meta.get_field('fichier_pdf').storage
+    try:
+        storage.delete(fichier.chemin)
+        delete_previews(storage, fichier.chemin)
+    except Exception as e:
+        logger.warning(f"Suppression du fichier {fichier.chemin} impossible: {e}")
+    fichier.delete()
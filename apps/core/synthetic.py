@@ -0,0 +1,393 @@
+"""
+Génération de données synthétiques réalistes (commande generate_data).
+
+Modèle de génération :
+- Popularité des épreuves en loi de puissance (Zipf) : quelques épreuves
+  concentrent l'essentiel des consultations.
+- Activité des utilisateurs en loi de puissance également.
+- Affinité : un étudiant consulte surtout les matières de sa filière et les
+  épreuves de son niveau.
+- Calendrier : pics avant les sessions d'examens (janvier-février, juin-juillet),
+  creux en août, moins d'activité le week-end, pointe en soirée ; l'activité
+  croît au fil de la période.
+
+Le tirage (CPU) peut être réparti sur un pool de processus ; l'écriture se
+fait par lots `bulk_create` dans une seule transaction, puis les compteurs
+(vues, téléchargements) et les moyennes sont calculés en une passe d'agrégation.
+
+Les fonctions de tirage n'utilisent que la bibliothèque standard : les
+processus du pool n'ont pas besoin de Django.
+"""
+import bisect
+import itertools
+import random
+import time
+from multiprocessing import Pool
+
+NIVEAUX = ['P1', 'P2', 'L3', 'M1', 'M2']
+NIVEAU_WEIGHTS = [0.3, 0.25, 0.2, 0.15, 0.1]
+
+MATIERES_PAR_FILIERE = {
+    'MATH': ['Analyse', 'Algebre', 'Probabilites', 'Statistiques', 'Geometrie'],
+    'INFO': ['Algorithmes', 'Bases de donnees', 'Reseaux', 'IA', 'Programmation'],
+    'PHYSIQUE': ['Mecanique', 'Thermodynamique', 'Electromagnetisme', 'Optique'],
+    'CHIMIE': ['Chimie organique', 'Chimie minerale', 'Chimie analytique'],
+    'RO': ['Programmation lineaire', 'Optimisation combinatoire', 'Theorie des graphes', 'Simulation'],
+    'STAT_PROB': ['Probabilites', 'Statistique descriptive', 'Statistique inferentielle', 'Processus stochastiques'],
+    'MATH_FOND': ['Topologie', 'Analyse fonctionnelle', 'Theorie des nombres', 'Algebre abstraite'],
+}
+FILIERES = list(MATIERES_PAR_FILIERE)
+FILIERE_WEIGHTS = [0.22, 0.25, 0.14, 0.09, 0.1, 0.1, 0.1]
+
+TYPES = ['PARTIEL', 'EXAMEN', 'TD', 'RATTRAPAGE', 'CC']
+ANNEES = ['2020-2021', '2021-2022', '2022-2023', '2023-2024', '2024-2025']
+
+ACTION_TYPES = ['VIEW', 'DOWNLOAD', 'CLICK', 'RATE']
+ACTION_CUM_WEIGHTS = list(itertools.accumulate([0.5, 0.25, 0.15, 0.1]))
+
+COMMENTAIRES = [
+    'Tres bonne epreuve, bien structuree',
+    'Difficile mais interessante',
+    'Manque de clarte dans certaines questions',
+    'Excellente preparation pour les examens',
+    'Trop facile pour le niveau',
+    'Questions pertinentes et bien formulees',
+]
+
+# Exposants des lois de puissance et multiplicateurs d'affinité
+ITEM_ZIPF = 1.1
+USER_ZIPF = 0.8
+AFFINITE_FILIERE = 6.0
+AFFINITE_NIVEAU = 3.0
+
+# Saisonnalité (mois 1-12), jour de la semaine (lundi = 0), heure
+MONTH_FACTOR = {1: 2.2, 2: 1.8, 3: 1.0, 4: 1.0, 5: 1.4, 6: 2.5, 7: 1.6, 8: 0.3, 9: 0.8, 10: 1.0, 11: 1.2, 12: 1.0}
+WEEKDAY_FACTOR = [1.0, 1.0, 1.0, 1.0, 0.9, 0.6, 0.5]
+HOUR_WEIGHTS = [
+    0.2, 0.1, 0.05, 0.05, 0.05, 0.1, 0.3, 0.6, 0.9, 1.0, 1.1, 1.0,
+    0.8, 0.9, 1.0, 1.0, 1.1, 1.2, 1.4, 1.7, 2.0, 2.0, 1.5, 0.7,
+]
+
+# Interactions tirées par tâche du pool
+CHUNK_SIZE = 50_000
+
+
+# ════════════════════════════════════════════════════════
+# Tirage (bibliothèque standard uniquement)
+# ════════════════════════════════════════════════════════
+
+def zipf_weights(count, exponent, rng):
+    """Poids 1/rang^s attribués dans un ordre aléatoire."""
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return [1.0 / rank ** exponent for rank in ranks]
+
+
+def build_sampler(users, epreuves, days, end_epoch, rng):
+    """
+    État (sérialisable) du tirage des interactions.
+
+    Args:
+        users: [(id, filiere, niveau)]
+        epreuves: [(id, filiere, niveau)]
+    """
+    user_weights = zipf_weights(len(users), USER_ZIPF, rng)
+    popularity = zipf_weights(len(epreuves), ITEM_ZIPF, rng)
+
+    segments = {}
+    for _, filiere, niveau in users:
+        if (filiere, niveau) in segments:
+            continue
+        weights = [
+            pop
+            * (AFFINITE_FILIERE if ep_filiere == filiere else 1.0)
+            * (AFFINITE_NIVEAU if ep_niveau == niveau else 1.0)
+            for pop, (_, ep_filiere, ep_niveau) in zip(popularity, epreuves)
+        ]
+        segments[(filiere, niveau)] = list(itertools.accumulate(weights))
+
+    start_epoch = end_epoch - days * 86400
+    day_weights = []
+    for day in range(days):
+        date = time.gmtime(start_epoch + day * 86400)
+        growth = 0.5 + day / max(days - 1, 1)
+        day_weights.append(MONTH_FACTOR[date.tm_mon] * WEEKDAY_FACTOR[date.tm_wday] * growth)
+
+    return {
+        'user_ids': [u[0] for u in users],
+        'user_segments': [(u[1], u[2]) for u in users],
+        'user_cum': list(itertools.accumulate(user_weights)),
+        'epreuve_ids': [e[0] for e in epreuves],
+        'epreuve_profiles': {e[0]: (e[1], e[2]) for e in epreuves},
+        'segment_cum': segments,
+        'day_cum': list(itertools.accumulate(day_weights)),
+        'hour_cum': list(itertools.accumulate(HOUR_WEIGHTS)),
+        'start_epoch': start_epoch,
+        'end_epoch': end_epoch,
+    }
+
+
+def sample_pairs(sampler, count, rng):
+    """(user_id, epreuve_id) tirés selon l'activité, la popularité et l'affinité."""
+    user_positions = rng.choices(range(len(sampler['user_ids'])), cum_weights=sampler['user_cum'], k=count)
+    by_segment = {}
+    for position in user_positions:
+        by_segment.setdefault(sampler['user_segments'][position], []).append(sampler['user_ids'][position])
+    pairs = []
+    for segment, user_ids in by_segment.items():
+        epreuve_ids = rng.choices(sampler['epreuve_ids'], cum_weights=sampler['segment_cum'][segment], k=len(user_ids))
+        pairs.extend(zip(user_ids, epreuve_ids))
+    rng.shuffle(pairs)
+    return pairs
+
+
+def sample_timestamp(sampler, rng):
+    day = bisect.bisect_left(sampler['day_cum'], rng.random() * sampler['day_cum'][-1])
+    hour = bisect.bisect_left(sampler['hour_cum'], rng.random() * sampler['hour_cum'][-1])
+    epoch = sampler['start_epoch'] + day * 86400 + hour * 3600 + rng.random() * 3600
+    return min(epoch, sampler['end_epoch'] - 1)
+
+
+def sample_interactions(sampler, count, seed):
+    """[(user_id, epreuve_id, action_type, epoch, session_duration)]"""
+    rng = random.Random(seed)
+    rows = []
+    for user_id, epreuve_id in sample_pairs(sampler, count, rng):
+        action = ACTION_TYPES[bisect.bisect_left(ACTION_CUM_WEIGHTS, rng.random() * ACTION_CUM_WEIGHTS[-1])]
+        duration = None
+        if action == 'VIEW':
+            duration = int(min(max(rng.lognormvariate(5.0, 1.0), 10), 3600))
+        rows.append((user_id, epreuve_id, action, sample_timestamp(sampler, rng), duration))
+    return rows
+
+
+_worker_sampler = None
+
+
+def _init_worker(sampler):
+    global _worker_sampler
+    _worker_sampler = sampler
+
+
+def _sample_chunk(task):
+    count, seed = task
+    return sample_interactions(_worker_sampler, count, seed)
+
+
+def iter_interaction_chunks(sampler, total, rng, workers=1):
+    """Interactions tirées par morceaux de CHUNK_SIZE, en parallèle si workers > 1."""
+    tasks = []
+    remaining = total
+    while remaining > 0:
+        count = min(CHUNK_SIZE, remaining)
+        tasks.append((count, rng.randrange(2 ** 32)))
+        remaining -= count
+
+    if workers <= 1 or len(tasks) <= 1:
+        for count, seed in tasks:
+            yield sample_interactions(sampler, count, seed)
+        return
+
+    with Pool(workers, initializer=_init_worker, initargs=(sampler,)) as pool:
+        yield from pool.imap_unordered(_sample_chunk, tasks)
+
+
+# ════════════════════════════════════════════════════════
+# Écriture en base
+# ════════════════════════════════════════════════════════
+
+def _aware(epoch):
+    from datetime import datetime, timezone
+
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+def generate(users=200, epreuves=150, interactions=15000, days=365, workers=1,
+             seed=None, batch_size=5000, password='password123', log=None):
+    """
+    Remplace les données (hors superutilisateurs) par un jeu synthétique.
+
+    Returns:
+        dict: nombre de lignes créées par table
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+
+    from . import cache_tags, search, stats, taxonomy
+    from .importer import explicit_dates
+    from .models import Commentaire, Epreuve, Evaluation, Interaction
+    from .signals import derived_updates_suspended
+
+    User = get_user_model()
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    end_epoch = time.time()
+    counts = {}
+
+    with transaction.atomic(), derived_updates_suspended(), \
+            explicit_dates(User, Epreuve, Interaction, Evaluation, Commentaire):
+        log('Suppression des anciennes donnees...')
+        for model in (Commentaire, Evaluation, Interaction, Epreuve):
+            model.objects.all().delete()
+        User.objects.filter(is_superuser=False).delete()
+
+        # ── Utilisateurs ──
+        log(f'Creation de {users} utilisateurs...')
+        password_hash = make_password(password)
+        user_objs = []
+        for i in range(users):
+            joined = _aware(end_epoch - days * 86400 - rng.uniform(0, 3 * 365 * 86400))
+            user_objs.append(User(
+                username=f'etudiant{i + 1}',
+                email=f'etudiant{i + 1}@imsp.bj',
+                password=password_hash,
+                first_name=f'Prenom{i + 1}',
+                last_name=f'Nom{i + 1}',
+                niveau=rng.choices(NIVEAUX, weights=NIVEAU_WEIGHTS)[0],
+                filiere=rng.choices(FILIERES, weights=FILIERE_WEIGHTS)[0],
+                date_joined=joined,
+                date_inscription=joined,
+            ))
+        User.objects.bulk_create(user_objs, batch_size=batch_size)
+        user_ids = dict(
+            User.objects.filter(username__startswith='etudiant', is_superuser=False)
+            .values_list('username', 'id')
+        )
+        user_rows = [(user_ids[u.username], u.filiere, u.niveau) for u in user_objs]
+        counts['utilisateurs'] = len(user_rows)
+
+        # ── Épreuves ──
+        log(f'Creation de {epreuves} epreuves...')
+        epreuve_objs, epreuve_filieres = [], []
+        for _ in range(epreuves):
+            filiere = rng.choice(FILIERES)
+            matiere = rng.choice(MATIERES_PAR_FILIERE[filiere])
+            niveau = rng.choice(NIVEAUX)
+            type_epreuve = rng.choice(TYPES)
+            created = _aware(end_epoch - days * 86400 - rng.uniform(0, 2 * 365 * 86400))
+            epreuve_objs.append(Epreuve(
+                titre=f'{type_epreuve} {matiere} {niveau}',
+                matiere=matiere,
+                **taxonomy.fields(matiere),
+                niveau=niveau,
+                type_epreuve=type_epreuve,
+                annee_academique=rng.choice(ANNEES),
+                # Pas de fichier PDF pour les données synthétiques
+                description=f'Epreuve de {matiere} pour le niveau {niveau}. Annee {rng.choice(ANNEES)}.',
+                created_at=created,
+                updated_at=created,
+            ))
+            epreuve_filieres.append(filiere)
+        Epreuve.objects.bulk_create(epreuve_objs, batch_size=batch_size)
+        epreuve_rows = [(e.pk, f, e.niveau) for e, f in zip(epreuve_objs, epreuve_filieres)]
+        counts['epreuves'] = len(epreuve_rows)
+
+        sampler = build_sampler(user_rows, epreuve_rows, days, end_epoch, rng)
+
+        # ── Interactions ──
+        log(f'Creation de {interactions} interactions ({max(workers, 1)} processus)...')
+        counts['interactions'] = 0
+        for rows in iter_interaction_chunks(sampler, interactions, rng, workers):
+            Interaction.objects.bulk_create([
+                Interaction(
+                    user_id=user_id, epreuve_id=epreuve_id, action_type=action,
+                    timestamp=_aware(epoch), session_duration=duration,
+                )
+                for user_id, epreuve_id, action, epoch, duration in rows
+            ], batch_size=batch_size)
+            counts['interactions'] += len(rows)
+            log(f'  {counts["interactions"]}/{interactions}')
+
+        # ── Évaluations : une par (utilisateur, épreuve), notes cohérentes avec le profil ──
+        log('Creation des evaluations...')
+        target = min(int(interactions * 0.1), len(user_rows) * len(epreuve_rows))
+        user_profiles = {user_id: (filiere, niveau) for user_id, filiere, niveau in user_rows}
+        seen = set()
+        evaluations = []
+        attempts = 0
+        while len(evaluations) < target and attempts < 20:
+            attempts += 1
+            for user_id, epreuve_id in sample_pairs(sampler, target - len(evaluations), rng):
+                if (user_id, epreuve_id) in seen:
+                    continue
+                seen.add((user_id, epreuve_id))
+                evaluations.append(_evaluation(Evaluation, sampler, user_profiles, user_id, epreuve_id, rng))
+        Evaluation.objects.bulk_create(evaluations, batch_size=batch_size)
+        counts['evaluations'] = len(evaluations)
+
+        log('Creation des commentaires...')
+        commentaires = []
+        for user_id, epreuve_id in sample_pairs(sampler, int(interactions * 0.05), rng):
+            created = _aware(sample_timestamp(sampler, rng))
+            commentaires.append(Commentaire(
+                user_id=user_id,
+                epreuve_id=epreuve_id,
+                contenu=rng.choice(COMMENTAIRES),
+                note_utilite=rng.randint(2, 5),
+                recommande=rng.random() < 0.75,
+                niveau_difficulte_ressenti=rng.randint(1, 5),
+                created_at=created,
+                updated_at=created,
+            ))
+        Commentaire.objects.bulk_create(commentaires, batch_size=batch_size)
+        counts['commentaires'] = len(commentaires)
+
+        log('Calcul des compteurs et moyennes...')
+        refresh_epreuve_aggregates(batch_size)
+        search.index_epreuves(epreuve_objs)
+        stats.reconcile()
+
+    cache_tags.invalidate(cache_tags.MODELE)
+    return counts
+
+
+def _evaluation(Evaluation, sampler, user_profiles, user_id, epreuve_id, rng):
+    filiere, niveau = user_profiles[user_id]
+    ep_filiere, ep_niveau = sampler['epreuve_profiles'][epreuve_id]
+    # Difficulté croissante avec le niveau, pertinence plus haute dans la filière et le niveau
+    difficulte = 1.5 + NIVEAUX.index(ep_niveau) * 0.6 + rng.gauss(0, 0.8)
+    pertinence = 2.5 + (1.0 if ep_filiere == filiere else 0.0) + (0.5 if ep_niveau == niveau else 0.0) \
+        + rng.gauss(0, 0.8)
+    epoch = sample_timestamp(sampler, rng)
+    return Evaluation(
+        user_id=user_id,
+        epreuve_id=epreuve_id,
+        note_difficulte=min(max(round(difficulte), 1), 5),
+        note_pertinence=min(max(round(pertinence), 1), 5),
+        created_at=_aware(epoch),
+        updated_at=_aware(epoch),
+    )
+
+
+def refresh_epreuve_aggregates(batch_size=5000):
+    """Vues, téléchargements et moyennes de toutes les épreuves en une passe d'agrégation."""
+    from django.db.models import Avg, Count, Q
+
+    from .models import Epreuve, Evaluation, Interaction
+
+    compteurs = {
+        row['epreuve_id']: row
+        for row in Interaction.objects.values('epreuve_id').annotate(
+            vues=Count('id', filter=Q(action_type='VIEW')),
+            telechargements=Count('id', filter=Q(action_type='DOWNLOAD')),
+        )
+    }
+    moyennes = {
+        row['epreuve_id']: row
+        for row in Evaluation.objects.values('epreuve_id').annotate(
+            difficulte=Avg('note_difficulte'), pertinence=Avg('note_pertinence'),
+        )
+    }
+    empty = {}
+    Epreuve.objects.bulk_update([
+        Epreuve(
+            id=epreuve_id,
+            nb_vues=compteurs.get(epreuve_id, empty).get('vues', 0),
+            nb_telechargements=compteurs.get(epreuve_id, empty).get('telechargements', 0),
+            note_moyenne_difficulte=moyennes.get(epreuve_id, empty).get('difficulte') or 0.0,
+            note_moyenne_pertinence=moyennes.get(epreuve_id, empty).get('pertinence') or 0.0,
+        )
+        for epreuve_id in Epreuve.objects.values_list('id', flat=True)
+    ], ['nb_vues', 'nb_telechargements', 'note_moyenne_difficulte', 'note_moyenne_pertinence'],
+        batch_size=batch_size)
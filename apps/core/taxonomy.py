@@ -0,0 +1,138 @@
+"""
+Taxonomie des matières.
+
+Les matières sont saisies librement (« Algebre abstraite », « Analyse2 »,
+« Réseau »...). Chaque épreuve porte deux colonnes calculées une fois pour
+toutes à l'enregistrement :
+- `categorie` : catégorie principale (code de CATEGORIES, AUTRE à défaut),
+  indexée — filtre d'égalité pour le démarrage à froid ;
+- `categories` : masque de bits de toutes les catégories reconnues dans la
+  matière (« Programmation lineaire » : OPTIMISATION | PROGRAMMATION).
+
+Chaque filière a son masque (FILIERE_MASKS) : la correspondance filière ↔
+matière du recommandeur est un simple `&` au lieu d'une recherche de
+mots-clés par candidat.
+
+Les chemins en masse (bulk_create, QuerySet.update) ne passent pas par
+`Epreuve.save()` : ils renseignent les colonnes avec `fields(matiere)`, ou
+appellent `backfill()` (une requête par matière distincte).
+"""
+import re
+import unicodedata
+
+# ── Catégories : code → racines reconnues en début de mot (sans accents) ──
+# L'ordre compte : la première catégorie reconnue est la catégorie principale
+# (« Programmation lineaire » relève d'abord de l'optimisation).
+CATEGORIES = (
+    ('OPTIMISATION', ('optimis', 'recherche op', 'programmation lineair', 'graph', 'simulation')),
+    ('PROBABILITES', ('probabilit', 'stochastiq')),
+    ('STATISTIQUES', ('statistiq',)),
+    ('ALGEBRE', ('algebre', 'theorie des nombres')),
+    ('ANALYSE', ('analyse', 'methodes numeriq')),
+    ('GEOMETRIE', ('geometri',)),
+    ('TOPOLOGIE', ('topologi',)),
+    ('MATHEMATIQUES', ('math', r'om\b')),
+    ('BASES_DE_DONNEES', ('bases? de donn',)),
+    ('RESEAUX', ('reseau',)),
+    ('IA', (r'ia\b', 'machine', 'intelligence artificiel', 'apprentissage')),
+    ('ALGORITHMIQUE', ('algorithm',)),
+    ('PROGRAMMATION', ('programm',)),
+    ('INFORMATIQUE', ('informati',)),
+    ('MECANIQUE', ('mecaniq',)),
+    ('THERMODYNAMIQUE', ('thermodyn',)),
+    ('ELECTROMAGNETISME', ('electro',)),
+    ('OPTIQUE', ('optiq',)),
+    ('PHYSIQUE', ('physiq', 'quantiq')),
+    ('BIOCHIMIE', ('biochimi',)),
+    ('CHIMIE', ('chimi', 'organiq', 'mineral', 'analytiq')),
+    ('SII', (r'sii\b', r'ssi\b', 'sciences? industriel')),
+    ('ANGLAIS', ('anglais',)),
+)
+
+AUTRE = 'AUTRE'
+
+BITS = {code: 1 << i for i, (code, _) in enumerate(CATEGORIES)}
+
+_PATTERNS = [
+    (code, re.compile(r'\b(?:' + '|'.join(roots) + ')'))
+    for code, roots in CATEGORIES
+]
+
+# ── Filières (User.FILIERE_CHOICES) → catégories de matières ──
+FILIERE_CATEGORIES = {
+    'MATH': ('MATHEMATIQUES', 'ANALYSE', 'ALGEBRE', 'GEOMETRIE', 'TOPOLOGIE',
+             'PROBABILITES', 'STATISTIQUES'),
+    'INFO': ('INFORMATIQUE', 'ALGORITHMIQUE', 'PROGRAMMATION', 'BASES_DE_DONNEES',
+             'RESEAUX', 'IA'),
+    'PHYSIQUE': ('PHYSIQUE', 'MECANIQUE', 'THERMODYNAMIQUE', 'ELECTROMAGNETISME',
+                 'OPTIQUE'),
+    'CHIMIE': ('CHIMIE', 'BIOCHIMIE'),
+    'RO': ('OPTIMISATION', 'MATHEMATIQUES'),
+    'STAT_PROB': ('STATISTIQUES', 'PROBABILITES', 'ANALYSE', 'MATHEMATIQUES'),
+    'MATH_FOND': ('ALGEBRE', 'ANALYSE', 'TOPOLOGIE', 'GEOMETRIE', 'MATHEMATIQUES'),
+}
+
+FILIERE_MASKS = {
+    filiere: sum(BITS[code] for code in codes)
+    for filiere, codes in FILIERE_CATEGORIES.items()
+}
+
+# Colonnes de Epreuve tenues à jour à partir de `matiere`
+FIELDS = ('categorie', 'categories')
+
+
+def _normalize(matiere):
+    decomposed = unicodedata.normalize('NFKD', matiere or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def classify(matiere):
+    """Retourne `(catégorie principale, masque des catégories)` d'une matière."""
+    text = _normalize(matiere)
+    primary, mask = AUTRE, 0
+    for code, pattern in _PATTERNS:
+        if pattern.search(text):
+            if not mask:
+                primary = code
+            mask |= BITS[code]
+    return primary, mask
+
+
+def fields(matiere):
+    """Valeurs des colonnes `categorie` / `categories` (bulk_create, update)."""
+    categorie, categories = classify(matiere)
+    return {'categorie': categorie, 'categories': categories}
+
+
+def filiere_mask(filiere):
+    return FILIERE_MASKS.get(filiere or '', 0)
+
+
+def filiere_categories(filiere):
+    return FILIERE_CATEGORIES.get(filiere or '', ())
+
+
+def matches(filiere, categories):
+    """Vrai si une matière (masque `categories`) relève de la filière."""
+    return bool(filiere_mask(filiere) & categories)
+
+
+def backfill(model=None, stdout=None):
+    """
+    Recalcule les colonnes de toutes les épreuves : une requête UPDATE par
+    matière distincte (et non par épreuve). `model` : modèle historique des
+    migrations. Retourne le nombre d'épreuves modifiées.
+    """
+    if model is None:
+        from .models import Epreuve as model
+
+    changed = 0
+    matieres = model.objects.order_by().values_list('matiere', flat=True).distinct()
+    for matiere in list(matieres):
+        values = fields(matiere)
+        stale = model.objects.filter(matiere=matiere).exclude(**values)
+        count = stale.update(**values)
+        if count and stdout is not None:
+            stdout.write(f"  {matiere} → {values['categorie']} : {count} épreuve(s)")
+        changed += count
+    return changed
@@ -0,0 +1,186 @@
+"""
+Cache à deux niveaux : LRU en mémoire du processus devant un cache Django partagé.
+
+    L1 : LRU borné en octets, propre au worker (pas d'aller-retour réseau).
+    L2 : alias `TIERED_CACHE_ALIAS` (Redis, base de données, LocMem...).
+
+Les valeurs sont sérialisées une fois (pickle) : la taille mesurée sert à
+l'éviction du L1 et les deux niveaux stockent les mêmes octets. Chaque cache
+nommé compte ses succès par niveau (`stats()`, `all_stats()`).
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import instrumentation, metrics
+
+
+class LRUCache:
+    """LRU thread-safe borné par la taille cumulée des valeurs (en octets)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()  # clé → (octets, expiration)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            raw, expires_at = item
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return raw
+
+    def set(self, key, raw, timeout):
+        size = len(raw)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (raw, time.monotonic() + timeout)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        raw, _ = self._data.pop(key)
+        self._bytes -= len(raw)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class TieredCache:
+    """
+    Cache nommé L1 (LRU local) + L2 (cache Django).
+
+    `local_timeout` borne la durée de vie en L1 : une entrée supprimée du L2 par
+    un autre processus reste servie au plus `local_timeout` secondes ici.
+    """
+
+    def __init__(self, name, max_bytes, local_timeout=300):
+        self.name = name
+        self.local_timeout = local_timeout
+        self.local = LRUCache(max_bytes)
+        self.hits_l1 = 0
+        self.hits_l2 = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[getattr(settings, 'TIERED_CACHE_ALIAS', 'default')]
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        results = {}
+        missing = []
+        l2_hits = 0
+        for key in keys:
+            raw = self.local.get(self._key(key))
+            if raw is None:
+                missing.append(key)
+            else:
+                self.hits_l1 += 1
+                results[key] = pickle.loads(raw)
+        if missing:
+            found = self.shared.get_many([self._key(k) for k in missing])
+            for key in missing:
+                raw = found.get(self._key(key))
+                if raw is None:
+                    self.misses += 1
+                    continue
+                self.hits_l2 += 1
+                l2_hits += 1
+                self.local.set(self._key(key), raw, self.local_timeout)
+                results[key] = pickle.loads(raw)
+        instrumentation.record_cache(len(results), len(keys) - len(results))
+        if results:
+            metrics.CACHE_LOOKUPS.inc(len(results) - l2_hits, cache=self.name, result='l1_hit')
+        if l2_hits:
+            metrics.CACHE_LOOKUPS.inc(l2_hits, cache=self.name, result='l2_hit')
+        if len(keys) > len(results):
+            metrics.CACHE_LOOKUPS.inc(len(keys) - len(results), cache=self.name, result='miss')
+        return results
+
+    def set(self, key, value, timeout):
+        self.set_many({key: value}, timeout)
+
+    def set_many(self, values, timeout):
+        encoded = {
+            self._key(key): pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            for key, value in values.items()
+        }
+        for full_key, raw in encoded.items():
+            self.local.set(full_key, raw, min(timeout, self.local_timeout))
+        self.shared.set_many(encoded, timeout)
+
+    def delete(self, key):
+        self.local.delete(self._key(key))
+        self.shared.delete(self._key(key))
+
+    def stats(self):
+        lookups = self.hits_l1 + self.hits_l2 + self.misses
+        return {
+            'l1_hits': self.hits_l1,
+            'l2_hits': self.hits_l2,
+            'misses': self.misses,
+            'l1_hit_ratio': round(self.hits_l1 / lookups, 4) if lookups else None,
+            'l2_hit_ratio': round(self.hits_l2 / lookups, 4) if lookups else None,
+            'l1_entries': len(self.local),
+            'l1_bytes': self.local.size_bytes,
+            'l1_evictions': self.local.evictions,
+        }
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_tiered_cache(name, max_bytes=None, local_timeout=300):
+    """Cache nommé (singleton par processus)."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = TieredCache(
+                name,
+                max_bytes=max_bytes or getattr(settings, 'TIERED_CACHE_LOCAL_BYTES', 4 * 1024 * 1024),
+                local_timeout=local_timeout,
+            )
+        return _registry[name]
+
+
+def all_stats():
+    """Statistiques par niveau de tous les caches nommés de ce processus."""
+    with _registry_lock:
+        return {name: tiered.stats() for name, tiered in _registry.items()}
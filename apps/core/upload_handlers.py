@@ -0,0 +1,89 @@
+"""
+Gestionnaire d'upload pour les PDF d'épreuves.
+
+Le fichier est écrit directement sur disque (jamais gardé en mémoire) et, au fil
+des blocs reçus, on vérifie la signature `%PDF-`, on calcule le SHA-256 et la
+taille. Le fichier obtenu porte ces informations (`sha256`, `pdf_signature_ok`,
+`too_large`) : la vue et le modèle n'ont plus à relire le fichier.
+"""
+import hashlib
+
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from . import metrics
+
+PDF_SIGNATURE = b'%PDF-'
+
+# Taille max d'un PDF d'épreuve (20 MB)
+MAX_PDF_SIZE = 20 * 1024 * 1024
+
+
+class HashingPDFUploadHandler(TemporaryFileUploadHandler):
+    """
+    Écrit l'upload dans un fichier temporaire en calculant hash et signature.
+
+    Au-delà de `max_size` octets, ou si la signature est invalide, le reste du
+    fichier est lu mais plus écrit ni haché : l'upload sera refusé de toute façon.
+    """
+
+    def __init__(self, request=None, field_names=('fichier_pdf',), max_size=MAX_PDF_SIZE):
+        super().__init__(request)
+        self.field_names = set(field_names)
+        self.max_size = max_size
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.checked = field_name in self.field_names
+        self.hasher = hashlib.sha256()
+        self.header = b''
+        self.file.sha256 = None
+        self.file.pdf_signature_ok = not self.checked
+        self.file.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.checked:
+            return super().receive_data_chunk(raw_data, start)
+
+        if len(self.header) < len(PDF_SIGNATURE):
+            self.header += raw_data[:len(PDF_SIGNATURE) - len(self.header)]
+            if len(self.header) == len(PDF_SIGNATURE):
+                self.file.pdf_signature_ok = self.header == PDF_SIGNATURE
+
+        if start + len(raw_data) > self.max_size:
+            self.file.too_large = True
+        if self.file.too_large or (len(self.header) == len(PDF_SIGNATURE) and not self.file.pdf_signature_ok):
+            return None
+
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if self.checked and uploaded.pdf_signature_ok and not uploaded.too_large:
+            uploaded.sha256 = self.hasher.hexdigest()
+        if self.checked:
+            metrics.UPLOAD_BYTES.inc(file_size)
+            metrics.UPLOADS.inc(result='accepted' if uploaded.sha256 else 'rejected')
+        return uploaded
+
+
+def has_pdf_signature(uploaded_file):
+    """Signature `%PDF-` : réutilise le contrôle du handler s'il existe."""
+    if hasattr(uploaded_file, 'pdf_signature_ok'):
+        return uploaded_file.pdf_signature_ok
+    header = uploaded_file.read(len(PDF_SIGNATURE))
+    uploaded_file.seek(0)
+    return header == PDF_SIGNATURE
+
+
+def compute_sha256(uploaded_file):
+    """SHA-256 d'un fichier uploadé : réutilise celui du handler s'il existe."""
+    file_hash = getattr(uploaded_file, 'sha256', None)
+    if file_hash:
+        return file_hash
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
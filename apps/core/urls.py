@@ -1,10 +1,11 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     UserViewSet, EpreuveViewSet, InteractionViewSet,
     EvaluationViewSet, CommentaireViewSet,
     upload_epreuve, record_view,
-    register_user, generate_sample_data, dashboard_stats,
+    register_user, generate_sample_data, dashboard_stats, instrumentation_metrics,
     export_data_api,
     pending_epreuves, approve_epreuve, reject_epreuve,
 )
@@ -28,6 +29,7 @@ urlpatterns = [
     # Admin : génération de données et statistiques
     path('admin/generate-data/', generate_sample_data, name='generate-data'),
     path('admin/stats/', dashboard_stats, name='dashboard-stats'),
+    path('admin/metrics/', instrumentation_metrics, name='instrumentation-metrics'),
     path('admin/export-data/', export_data_api, name='export-data'),
 
     # Admin : modération
@@ -38,3 +40,13 @@ urlpatterns = [
     # Router DRF
     path('', include(router.urls)),
 ]
+
+# Mode ASGI : versions asynchrones des vues de lecture, placées avant les vues DRF
+if settings.SERVE_ASGI:
+    from . import async_views
+
+    urlpatterns = [
+        path('epreuves/populaires/', async_views.populaires),
+        path('epreuves/recentes/', async_views.recentes),
+        path('admin/stats/', async_views.dashboard_stats),
+    ] + urlpatterns
@@ -1,8 +1,4 @@
 import random
-import json
-import csv
-import io
-import hashlib
 
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes, parser_classes
@@ -10,13 +6,13 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count
-from django.http import FileResponse, Http404, HttpResponse
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
-from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.text import slugify
 from datetime import timedelta
-import mimetypes
 
 from .models import Epreuve, Interaction, Evaluation, Commentaire
 from .serializers import (
@@ -27,6 +23,12 @@ from .serializers import (
     EvaluationSerializer, EvaluationCreateUpdateSerializer,
     CommentaireSerializer, CommentaireCreateUpdateSerializer
 )
+from .pagination import KeysetPagination
+from .search import FullTextSearchFilter
+from .extraction import schedule_extraction
+from .upload_handlers import HashingPDFUploadHandler, compute_sha256, has_pdf_signature
+from .storage import hash_from_name as content_hash_from_name
+from . import columnar, downloads, exports, instrumentation, metrics, previews, stats
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -66,12 +68,39 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response({'detail': 'Photo de profil supprimée.'}, status=status.HTTP_200_OK)
 
 
+def visible_epreuves(user):
+    """Épreuves visibles par un utilisateur : son niveau et les niveaux inférieurs."""
+    niveau_order = ['P1', 'P2', 'L3', 'M1', 'M2']
+
+    if not user.is_authenticated or user.is_staff:
+        # Visiteurs anonymes et admins : toutes les épreuves visibles
+        return Epreuve.objects.all()
+    user_niveau = user.niveau
+    if user_niveau and user_niveau in niveau_order:
+        idx = niveau_order.index(user_niveau)
+        allowed_niveaux = niveau_order[:idx + 1]
+    else:
+        allowed_niveaux = niveau_order
+    return Epreuve.objects.filter(niveau__in=allowed_niveaux)
+
+
 class EpreuveViewSet(viewsets.ModelViewSet):
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # La recherche passe après le tri pour pouvoir classer par pertinence
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['niveau', 'matiere', 'type_epreuve', 'annee_academique']
-    search_fields = ['titre', 'description', 'matiere']
+    search_fields = ['titre', 'description', 'matiere', 'texte_extrait']
     ordering_fields = ['created_at', 'nb_vues', 'nb_telechargements', 'note_moyenne_pertinence']
     ordering = ['-created_at']
+
+    @property
+    def paginator(self):
+        """Pagination keyset si `cursor` est fourni, sinon pagination par page."""
+        if not hasattr(self, '_paginator'):
+            if KeysetPagination.cursor_query_param in self.request.query_params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class() if self.pagination_class else None
+        return self._paginator
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -81,8 +110,8 @@ class EpreuveViewSet(viewsets.ModelViewSet):
         return EpreuveDetailSerializer
     
     def get_permissions(self):
-        """List et retrieve sont publics, le reste nécessite auth."""
-        if self.action in ['list', 'retrieve']:
+        """List, retrieve et les aperçus sont publics, le reste nécessite auth."""
+        if self.action in ['list', 'retrieve', 'apercu']:
             return [AllowAny()]
         return [IsAuthenticated()]
 
@@ -91,25 +120,26 @@ class EpreuveViewSet(viewsets.ModelViewSet):
         if getattr(self, 'swagger_fake_view', False):
             return Epreuve.objects.none()
 
-        niveau_order = ['P1', 'P2', 'L3', 'M1', 'M2']
-        user = self.request.user
-
-        if not user.is_authenticated:
-            # Visiteurs anonymes : toutes les épreuves visibles
-            return Epreuve.objects.all()
-
-        if user.is_staff:
-            queryset = Epreuve.objects.all()
-        else:
-            user_niveau = user.niveau
-            if user_niveau and user_niveau in niveau_order:
-                idx = niveau_order.index(user_niveau)
-                allowed_niveaux = niveau_order[:idx + 1]
-            else:
-                allowed_niveaux = niveau_order
-            queryset = Epreuve.objects.filter(niveau__in=allowed_niveaux)
-        
+        queryset = visible_epreuves(self.request.user)
+        if self.action in ['list', 'populaires', 'recentes']:
+            # Projection limitée aux champs de la liste (pas de texte_extrait, description...)
+            queryset = queryset.only(*EpreuveListSerializer.queryset_fields)
+        elif self.action == 'retrieve':
+            # Le texte extrait (jusqu'à 500 000 caractères) ne sert qu'à l'index de recherche
+            queryset = queryset.defer('texte_extrait')
         return queryset
+
+    def perform_create(self, serializer):
+        epreuve = serializer.save()
+        if epreuve.fichier_pdf:
+            schedule_extraction(epreuve.id)
+            previews.schedule_previews(epreuve.id)
+
+    def perform_update(self, serializer):
+        epreuve = serializer.save()
+        if serializer.validated_data.get('fichier_pdf'):
+            schedule_extraction(epreuve.id)
+            previews.schedule_previews(epreuve.id)
     
     @action(detail=True, methods=['post'])
     def view(self, request, pk=None):
@@ -126,7 +156,15 @@ class EpreuveViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def download(self, request, pk=None):
-        """Retourne l'URL de téléchargement du fichier PDF"""
+        """
+        Télécharge le PDF d'une épreuve.
+
+        Storage distant (Cloudinary) : retourne l'URL en JSON. Storage local :
+        sert le fichier avec ETag/304 et Range/206, ou délègue le transfert au
+        proxy (voir apps/core/downloads.py).
+        
+        `?inline=1` : affichage dans le lecteur PDF, non compté comme téléchargement.
+        """
         epreuve = self.get_object()
         
         # Vérifier si le fichier existe
@@ -136,50 +174,95 @@ class EpreuveViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Incrémenter le compteur de téléchargements
-        epreuve.increment_telechargements()
-        
-        # Enregistrer l'interaction
-        Interaction.objects.create(
-            user=request.user,
-            epreuve=epreuve,
-            action_type='DOWNLOAD'
-        )
+        # Les fichiers adressés par contenu s'appellent <hash>.pdf : nom lisible dérivé du titre
+        inline = request.query_params.get('inline') == '1'
+        filename = epreuve.fichier_pdf.name.split('/')[-1]
+        if content_hash_from_name(epreuve.fichier_pdf.name):
+            filename = f"{slugify(epreuve.titre)[:80] or 'epreuve'}.pdf"
         
-        # Retourner l'URL du fichier en JSON
         try:
             file_url = epreuve.fichier_pdf.url
             # Si l'URL est externe (Cloudinary), retourner l'URL directe
             if file_url.startswith('http'):
-                return Response({
+                response = Response({
                     'url': file_url,
-                    'filename': epreuve.fichier_pdf.name.split('/')[-1],
+                    'filename': filename,
                 })
-            # Sinon, servir le fichier local directement
-            file_path = epreuve.fichier_pdf.path
-            content_type, _ = mimetypes.guess_type(file_path)
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type=content_type or 'application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{epreuve.fichier_pdf.name.split("/")[-1]}"'
-            return response
+            else:
+                # Sinon, servir le fichier local (ou le confier au proxy)
+                response = downloads.serve_pdf(
+                    request, epreuve.fichier_pdf, filename, epreuve.hash_fichier,
+                    disposition='inline' if inline else 'attachment',
+                )
+        except FileNotFoundError:
+            raise Http404('Fichier PDF introuvable')
         except Exception as e:
             return Response(
                 {'error': f'Erreur lors du téléchargement: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        # Compteur et interaction enregistrés hors du chemin de la réponse
+        if not inline and downloads.counts_as_download(request, response):
+            downloads.record_download(epreuve.id, request.user.id)
+        return response
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def apercu(self, request, pk=None):
+        """
+        Image WebP basse résolution de la première page, ou miniature d'une page
+        avec `?page=N`. Seules les images déjà générées sont servies : une image
+        manquante est planifiée en arrière-plan et la réponse est 202 (réessayer
+        après `Retry-After` secondes).
+        
+        Avec `?v=<hash>` (URL fournie par les serializers), l'image ne change
+        jamais : elle peut être mise en cache un an par le navigateur et les CDN.
+        """
+        epreuve = self.get_object()
+        page = request.query_params.get('page')
+        try:
+            page = int(page) if page else None
+        except ValueError:
+            page = 0
+        if page is not None and page < 1:
+            return Response({'error': 'Paramètre page invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        etag = f'"{epreuve.hash_fichier}-{page or 0}"' if epreuve.hash_fichier else None
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+        
+        name, pending = previews.get_or_schedule(epreuve, page)
+        if pending:
+            response = Response({'detail': 'Aperçu en cours de génération'}, status=status.HTTP_202_ACCEPTED)
+            response['Retry-After'] = '5'
+            return response
+        if name is None:
+            raise Http404('Aperçu indisponible')
+        
+        response = FileResponse(
+            epreuve.fichier_pdf.storage.open(name, 'rb'),
+            content_type=previews.CONTENT_TYPE,
+        )
+        if epreuve.hash_fichier and request.query_params.get('v') == epreuve.hash_fichier[:16]:
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=3600'
+        if etag:
+            response['ETag'] = etag
+        return response
     
     @action(detail=False, methods=['get'])
     def populaires(self, request):
         queryset = self.get_queryset().order_by('-nb_telechargements')[:10]
-        serializer = EpreuveListSerializer(queryset, many=True)
+        serializer = EpreuveListSerializer(queryset, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def recentes(self, request):
         queryset = self.get_queryset().order_by('-created_at')[:10]
-        serializer = EpreuveListSerializer(queryset, many=True)
+        serializer = EpreuveListSerializer(queryset, many=True, context={'request': request})
         return Response(serializer.data)
 
 
@@ -315,28 +398,31 @@ def upload_epreuve(request):
     - Détecte les doublons par hash SHA-256
     - Détecte les doublons par titre similaire (même matière + niveau + année)
     - Les épreuves ne sont PAS approuvées automatiquement (sauf si admin)
+
+    Le fichier est reçu en une seule passe par `HashingPDFUploadHandler` :
+    écriture sur disque, signature, taille et SHA-256 calculés au vol.
     """
     user = request.user
 
-    # ── Vérification magic bytes PDF ──
+    # À installer avant le premier accès à request.FILES
+    request._request.upload_handlers = [HashingPDFUploadHandler(request._request)]
+
     fichier = request.FILES.get('fichier_pdf')
+    file_hash = None
     if fichier:
-        header = fichier.read(5)
-        fichier.seek(0)  # remettre le curseur au début
-        if header != b'%PDF-':
+        # ── Vérification magic bytes PDF ──
+        if not has_pdf_signature(fichier):
             return Response(
                 {'error': 'Le fichier envoyé n\'est pas un vrai PDF (signature invalide).'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         # ── Détection de doublon par hash SHA-256 ──
-        hasher = hashlib.sha256()
-        for chunk in fichier.chunks():
-            hasher.update(chunk)
-        file_hash = hasher.hexdigest()
-        fichier.seek(0)  # remettre le curseur au début
+        # (le fichier trop volumineux sera refusé par le serializer, sans hash)
+        if not getattr(fichier, 'too_large', False):
+            file_hash = compute_sha256(fichier)
 
-        existing_hash = Epreuve.objects.filter(hash_fichier=file_hash).first()
+        existing_hash = file_hash and Epreuve.objects.filter(hash_fichier=file_hash).first()
         if existing_hash:
             return Response(
                 {
@@ -382,7 +468,13 @@ def upload_epreuve(request):
         epreuve = serializer.save(
             uploaded_by=user,
             is_approved=True,
+            # Déjà calculés pendant la réception : Epreuve.save() ne relit pas le fichier
+            taille_fichier=fichier.size if fichier else 0,
+            hash_fichier=file_hash or '',
         )
+        # Pages et texte du PDF extraits en arrière-plan, après le commit
+        schedule_extraction(epreuve.id)
+        previews.schedule_previews(epreuve.id)
         
         detail_serializer = EpreuveDetailSerializer(
             epreuve,
@@ -671,48 +763,35 @@ def generate_sample_data(request):
 def dashboard_stats(request):
     """
     GET /api/admin/stats/
-    Statistiques globales pour le tableau de bord.
+    Statistiques globales pour le tableau de bord (compteurs de apps/core/stats.py).
     """
-    User = get_user_model()
+    return Response(stats.dashboard(request.user))
 
-    stats = {
-        'total_users': User.objects.filter(is_superuser=False).count(),
-        'total_epreuves': Epreuve.objects.filter(is_approved=True).count(),
-        'total_interactions': Interaction.objects.count(),
-        'total_evaluations': Evaluation.objects.count(),
-        'total_commentaires': Commentaire.objects.count(),
-        'pending_count': Epreuve.objects.filter(is_approved=False).count(),
-        'epreuves_par_matiere': list(
-            Epreuve.objects.values('matiere')
-            .annotate(count=Count('id'))
-            .order_by('-count')[:10]
-        ),
-        'epreuves_par_niveau': list(
-            Epreuve.objects.values('niveau')
-            .annotate(count=Count('id'))
-            .order_by('niveau')
-        ),
-        'top_epreuves': list(
-            Epreuve.objects.order_by('-nb_telechargements')[:5]
-            .values('id', 'titre', 'matiere', 'niveau', 'nb_telechargements', 'nb_vues')
-        ),
-    }
 
-    if request.user.is_staff:
-        stats['users_par_filiere'] = list(
-            User.objects.filter(is_superuser=False)
-            .values('filiere')
-            .annotate(count=Count('id'))
-            .order_by('-count')
-        )
-        stats['users_par_niveau'] = list(
-            User.objects.filter(is_superuser=False)
-            .values('niveau')
-            .annotate(count=Count('id'))
-            .order_by('niveau')
-        )
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def instrumentation_metrics(request):
+    """
+    GET /api/admin/metrics/
+    Mesures par vue de ce processus (apps/core/instrumentation.py) : latences,
+    requêtes SQL, caches, prédicteurs, requêtes hors budget.
+    `?reset=1` remet les compteurs à zéro après lecture.
+    """
+    data = instrumentation.summary()
+    if request.query_params.get('reset') == '1':
+        instrumentation.get_recorder().reset()
+    return Response(data)
 
-    return Response(stats)
+
+def metrics_view(request):
+    """
+    GET /metrics
+    Exposition Prometheus (apps/core/metrics.py), agrégée entre les workers
+    si METRICS_DIR est défini. Accès : jeton METRICS_TOKEN ou administrateur.
+    """
+    if not metrics.is_authorized(request):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 # ────────────────────────────────────────────────────────
@@ -722,153 +801,36 @@ def dashboard_stats(request):
 @permission_classes([IsAdminUser])
 def export_data_api(request):
     """
-    GET /api/admin/export-data/?format=json|csv
-    Exporte toutes les données de la BDD pour récupération locale
-    et entraînement du modèle ML. Admin seulement.
+    GET /api/admin/export-data/?format=json|ndjson|csv|parquet[&table=interactions][&compress=gzip]
+    Exporte les données de la BDD en flux (apps/core/exports.py) pour
+    récupération locale et entraînement du modèle ML. Admin seulement.
+    Sans `table`, le CSV est une archive ZIP d'un fichier par table.
     """
     fmt = request.query_params.get('export_format', request.query_params.get('format', 'json'))
+    table = request.query_params.get('table')
+    compress = request.query_params.get('compress') == 'gzip'
 
-    if fmt == 'csv':
-        return _export_csv_response()
-    else:
-        return _export_json_response()
-
-
-def _export_json_response():
-    """Exporte toutes les données en JSON."""
-    User = get_user_model()
-
-    data = {
-        'export_info': {
-            'version': '1.0',
-            'tables': ['utilisateurs', 'epreuves', 'interactions', 'evaluations', 'commentaires'],
-        },
-        'utilisateurs': list(User.objects.values(
-            'id', 'username', 'email', 'first_name', 'last_name',
-            'niveau', 'filiere', 'date_joined', 'is_staff', 'is_active'
-        )),
-        'epreuves': list(Epreuve.objects.values(
-            'id', 'titre', 'matiere', 'niveau', 'type_epreuve',
-            'annee_academique', 'description',
-            'fichier_pdf', 'taille_fichier', 'nb_pages',
-            'nb_vues', 'nb_telechargements',
-            'note_moyenne_difficulte', 'note_moyenne_pertinence',
-            'created_at', 'updated_at'
-        )),
-        'interactions': list(Interaction.objects.values(
-            'id', 'user_id', 'epreuve_id',
-            'action_type', 'session_duration', 'timestamp'
-        )),
-        'evaluations': list(Evaluation.objects.values(
-            'id', 'user_id', 'epreuve_id',
-            'note_difficulte', 'note_pertinence', 'created_at', 'updated_at'
-        )),
-        'commentaires': list(Commentaire.objects.values(
-            'id', 'user_id', 'epreuve_id', 'contenu',
-            'note_utilite', 'recommande', 'niveau_difficulte_ressenti',
-            'created_at', 'updated_at'
-        )),
-    }
+    if fmt not in exports.FORMATS:
+        return Response(
+            {'error': f"Format inconnu : {fmt} ({', '.join(exports.FORMATS)})"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if fmt == 'parquet' and not columnar.is_available():
+        return Response(
+            {'error': "Export Parquet indisponible : pyarrow n'est pas installé"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    if table and table not in exports.TABLES:
+        return Response(
+            {'error': f"Table inconnue : {table} ({', '.join(exports.TABLES)})"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    response = HttpResponse(
-        json.dumps(data, ensure_ascii=False, indent=2, cls=DjangoJSONEncoder),
-        content_type='application/json'
+    chunks, content_type, filename = exports.stream(
+        fmt, tables=[table] if table else None, compress=compress,
     )
-    response['Content-Disposition'] = 'attachment; filename="banque_epreuves_export.json"'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Pas de mise en tampon côté proxy (nginx) : le téléchargement démarre tout de suite
+    response['X-Accel-Buffering'] = 'no'
     return response
-
-
-def _export_csv_response():
-    """Exporte les données en CSV dans un ZIP."""
-    import zipfile
-    import traceback
-
-    User = get_user_model()
-
-    try:
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-
-            def write_csv(filename, headers, rows):
-                """Écrit un CSV UTF-8 avec BOM dans le ZIP."""
-                output = io.StringIO()
-                writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
-                writer.writerow(headers)
-                for row in rows:
-                    writer.writerow([str(v) if v is not None else '' for v in row])
-                # BOM UTF-8 pour compatibilité Excel
-                zf.writestr(filename, '\ufeff' + output.getvalue())
-
-            # Interactions CSV
-            write_csv(
-                'interactions.csv',
-                ['id', 'user_id', 'epreuve_id', 'action_type', 'session_duration', 'timestamp'],
-                Interaction.objects.values_list(
-                    'id', 'user_id', 'epreuve_id', 'action_type', 'session_duration', 'timestamp'
-                ).order_by('id'),
-            )
-
-            # Évaluations CSV
-            write_csv(
-                'evaluations.csv',
-                ['id', 'user_id', 'epreuve_id', 'note_difficulte', 'note_pertinence',
-                 'created_at', 'updated_at'],
-                Evaluation.objects.values_list(
-                    'id', 'user_id', 'epreuve_id', 'note_difficulte', 'note_pertinence',
-                    'created_at', 'updated_at'
-                ).order_by('id'),
-            )
-
-            # Épreuves CSV
-            write_csv(
-                'epreuves.csv',
-                ['id', 'titre', 'matiere', 'niveau', 'type_epreuve', 'annee_academique',
-                 'description', 'nb_vues', 'nb_telechargements',
-                 'note_moyenne_difficulte', 'note_moyenne_pertinence',
-                 'created_at', 'updated_at'],
-                Epreuve.objects.values_list(
-                    'id', 'titre', 'matiere', 'niveau', 'type_epreuve', 'annee_academique',
-                    'description', 'nb_vues', 'nb_telechargements',
-                    'note_moyenne_difficulte', 'note_moyenne_pertinence',
-                    'created_at', 'updated_at'
-                ).order_by('id'),
-            )
-
-            # Utilisateurs CSV
-            write_csv(
-                'utilisateurs.csv',
-                ['id', 'username', 'email', 'first_name', 'last_name',
-                 'niveau', 'filiere', 'is_staff', 'is_active', 'date_joined'],
-                User.objects.values_list(
-                    'id', 'username', 'email', 'first_name', 'last_name',
-                    'niveau', 'filiere', 'is_staff', 'is_active', 'date_joined'
-                ).order_by('id'),
-            )
-
-            # Commentaires CSV (inclut tous les champs ML)
-            write_csv(
-                'commentaires.csv',
-                ['id', 'user_id', 'epreuve_id', 'contenu',
-                 'note_utilite', 'recommande', 'niveau_difficulte_ressenti',
-                 'created_at', 'updated_at'],
-                Commentaire.objects.values_list(
-                    'id', 'user_id', 'epreuve_id', 'contenu',
-                    'note_utilite', 'recommande', 'niveau_difficulte_ressenti',
-                    'created_at', 'updated_at'
-                ).order_by('id'),
-            )
-
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/zip')
-        response['Content-Disposition'] = 'attachment; filename="banque_epreuves_export.zip"'
-        return response
-
-    except Exception as e:
-        error_detail = traceback.format_exc()
-        import logging
-        logging.getLogger(__name__).error(f"CSV export failed: {error_detail}")
-        return HttpResponse(
-            json.dumps({'error': f'Erreur lors de la génération CSV : {str(e)}', 'detail': error_detail}),
-            content_type='application/json',
-            status=500,
-        )
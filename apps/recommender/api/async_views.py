@@ -0,0 +1,123 @@
+"""
+Versions asynchrones des vues de recommandation (mode ASGI).
+
+Le calcul des scores est synchrone (ORM + calcul) : il est exécuté dans le pool
+de `apps.core.async_utils` pour que la boucle d'événements continue à servir
+les autres requêtes. `engine` choisit le prédicteur : 'lite' (Render /
+PythonAnywhere) ou 'ncf' (modèle PyTorch, config/urls.py).
+"""
+from contextlib import nullcontext
+
+from django.http import JsonResponse
+
+from apps.core.async_utils import async_api_view, error_response, run_in_pool
+from apps.core.models import Epreuve
+
+from apps.recommender.ml import latency, profiling
+
+from .serializers import RecommendationSerializer, SimilarItemSerializer
+
+
+def _get_predictor(engine):
+    if engine == 'ncf':
+        from apps.recommender.ml.predictor import get_predictor
+        return get_predictor()
+    from apps.recommender.ml.lite_predictor import get_lite_predictor
+    return get_lite_predictor()
+
+
+def _recommend(engine, user_id, top_k, exclude_seen, budget_ms=None, profile=False):
+    with profiling.capture() if profile else nullcontext() as report:
+        recommendations = _get_predictor(engine).recommend_for_user(
+            user_db_id=user_id,
+            top_k=top_k,
+            exclude_seen=exclude_seen,
+            filter_by_niveau=True,
+            budget_ms=budget_ms,
+        )
+    debug = report.as_dict() if report is not None else None
+    return RecommendationSerializer(recommendations, many=True).data, latency.provenance(recommendations), debug
+
+
+def _similar(engine, epreuve_id, top_k):
+    similar = _get_predictor(engine).recommend_similar_items(item_db_id=epreuve_id, top_k=top_k)
+    return SimilarItemSerializer(similar, many=True).data
+
+
+def _model_not_trained():
+    return JsonResponse({
+        'error': 'Model not trained yet',
+        'message': 'Please train the model first using: python manage.py train_model',
+    }, status=503)
+
+
+@async_api_view
+async def personalized_recommendations(request, engine='lite'):
+    """GET /api/recommendations/personalized/"""
+    user = request.user
+    try:
+        top_k = int(request.GET.get('top_k', 10))
+    except ValueError:
+        return error_response('top_k doit être un entier', 400)
+    exclude_seen = request.GET.get('exclude_seen', 'true').lower() == 'true'
+
+    if top_k < 1 or top_k > 100:
+        return error_response('top_k doit être entre 1 et 100', 400)
+    try:
+        budget_ms = latency.parse_budget(request.GET.get('budget_ms'))
+    except ValueError:
+        return error_response('budget_ms doit être un entier positif', 400)
+
+    try:
+        data, provenance, debug = await run_in_pool(
+            _recommend, engine, user.id, top_k, exclude_seen, budget_ms, profiling.requested_by(request),
+        )
+    except FileNotFoundError:
+        return _model_not_trained()
+    except Exception as e:
+        return error_response(str(e), 500)
+
+    response = {
+        'user_id': user.id,
+        'username': user.username,
+        'niveau': user.niveau,
+        'count': len(data),
+        'recommendations': data,
+        **provenance,
+    }
+    if debug is not None:
+        response['debug'] = debug
+    return JsonResponse(response)
+
+
+@async_api_view
+async def similar_epreuves(request, engine='lite'):
+    """GET /api/recommendations/similar/?epreuve_id=123"""
+    epreuve_id = request.GET.get('epreuve_id')
+    try:
+        top_k = int(request.GET.get('top_k', 10))
+    except ValueError:
+        return error_response('top_k doit être un entier', 400)
+
+    if not epreuve_id:
+        return error_response('Le paramètre epreuve_id est requis', 400)
+
+    try:
+        epreuve_id = int(epreuve_id)
+        epreuve = await Epreuve.objects.only('id', 'titre').aget(id=epreuve_id)
+    except (ValueError, Epreuve.DoesNotExist):
+        return error_response('epreuve_id invalide', 404)
+
+    try:
+        data = await run_in_pool(_similar, engine, epreuve_id, top_k)
+    except FileNotFoundError:
+        return _model_not_trained()
+    except Exception as e:
+        return error_response(str(e), 500)
+
+    return JsonResponse({
+        'epreuve_id': epreuve_id,
+        'epreuve_titre': epreuve.titre,
+        'count': len(data),
+        'similar_epreuves': data,
+    })
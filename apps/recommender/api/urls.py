@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     PersonalizedRecommendationsView,
@@ -12,3 +13,12 @@ urlpatterns = [
     path('status/', ModelStatusView.as_view(), name='model-status'),
     path('stats/', RecommendationStatsView.as_view(), name='recommendation-stats'),
 ]
+
+# Mode ASGI : recommandations calculées hors de la boucle d'événements
+if settings.SERVE_ASGI:
+    from . import async_views
+
+    urlpatterns = [
+        path('personalized/', async_views.personalized_recommendations, {'engine': 'ncf'}),
+        path('similar/', async_views.similar_epreuves, {'engine': 'ncf'}),
+    ] + urlpatterns
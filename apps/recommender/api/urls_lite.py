@@ -1,6 +1,7 @@
 """
 URLs recommandeur — version légère (sans PyTorch).
 """
+from django.conf import settings
 from django.urls import path
 from .views_lite import (
     PersonalizedRecommendationsView,
@@ -15,3 +16,12 @@ urlpatterns = [
     path('status/', ModelStatusView.as_view(), name='model-status'),
     path('stats/', RecommendationStatsView.as_view(), name='recommendation-stats'),
 ]
+
+# Mode ASGI : recommandations calculées hors de la boucle d'événements
+if settings.SERVE_ASGI:
+    from . import async_views
+
+    urlpatterns = [
+        path('personalized/', async_views.personalized_recommendations, {'engine': 'lite'}),
+        path('similar/', async_views.similar_epreuves, {'engine': 'lite'}),
+    ] + urlpatterns
@@ -8,6 +8,7 @@ from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
+from apps.recommender.ml import latency
 from apps.recommender.ml.predictor import get_predictor
 from .serializers import RecommendationSerializer, SimilarItemSerializer
 from apps.core.models import Epreuve
@@ -37,6 +38,13 @@ class PersonalizedRecommendationsView(APIView):
                 description='Exclude already seen epreuves (default: true)',
                 required=False
             ),
+            OpenApiParameter(
+                name='budget_ms',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Latency budget in ms (0 = unlimited): popular items fill what the model cannot score in time',
+                required=False
+            ),
         ],
         responses={200: RecommendationSerializer(many=True)}
     )
@@ -54,6 +62,13 @@ class PersonalizedRecommendationsView(APIView):
                 {'error': 'top_k must be between 1 and 100'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            budget_ms = latency.parse_budget(request.query_params.get('budget_ms'))
+        except ValueError:
+            return Response(
+                {'error': 'budget_ms must be a non-negative integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             # Get predictor
@@ -64,7 +79,8 @@ class PersonalizedRecommendationsView(APIView):
                 user_db_id=user.id,
                 top_k=top_k,
                 exclude_seen=exclude_seen,
-                filter_by_niveau=True
+                filter_by_niveau=True,
+                budget_ms=budget_ms
             )
             
             # Serialize
@@ -75,7 +91,8 @@ class PersonalizedRecommendationsView(APIView):
                 'username': user.username,
                 'niveau': user.niveau,
                 'count': len(serializer.data),
-                'recommendations': serializer.data
+                'recommendations': serializer.data,
+                **latency.provenance(recommendations)
             })
         
         except FileNotFoundError:
@@ -228,6 +245,11 @@ class ModelStatusView(APIView):
                     'recall_at_10': latest_log.recall_at_10,
                 }
             
+            from apps.core.tiered_cache import all_stats
+            from apps.recommender.ml.scoring import get_scoring_executor
+            response_data['cache'] = all_stats()
+            response_data['scoring'] = get_scoring_executor().stats
+            
             return Response(response_data)
         
         except Exception as e:
@@ -251,11 +273,9 @@ class RecommendationStatsView(APIView):
         """
         GET /api/recommendations/stats/
         """
-        from apps.core.models import Interaction, Epreuve
-        from django.db.models import Count, Avg
-        from django.contrib.auth import get_user_model
-        
-        User = get_user_model()
+        from apps.core.models import Interaction
+        from apps.core.stats import global_recommendation_stats
+        from django.db.models import Count
         
         user = request.user
         
@@ -273,15 +293,7 @@ class RecommendationStatsView(APIView):
         # Global stats (if admin)
         global_stats = None
         if user.is_staff:
-            global_stats = {
-                'total_users': User.objects.count(),
-                'total_epreuves': Epreuve.objects.count(),
-                'total_interactions': Interaction.objects.count(),
-                'avg_interactions_per_user': Interaction.objects.values('user').annotate(count=Count('id')).aggregate(avg=Avg('count'))['avg'],
-                'most_popular_epreuves': list(
-                    Epreuve.objects.order_by('-nb_telechargements')[:5].values('id', 'titre', 'nb_telechargements', 'nb_vues')
-                )
-            }
+            global_stats = global_recommendation_stats()
         
         return Response({
             'user_stats': user_stats,
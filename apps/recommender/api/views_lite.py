@@ -2,6 +2,8 @@
 API views pour le système de recommandation — version légère (sans PyTorch).
 Utilisé en déploiement Render quand le modèle NCF n'est pas disponible.
 """
+from contextlib import nullcontext
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -9,7 +11,10 @@ from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
+from apps.core.tiered_cache import all_stats as all_cache_stats
+from apps.recommender.ml import latency, profiling
 from apps.recommender.ml.lite_predictor import get_lite_predictor
+from apps.recommender.ml.scoring import get_scoring_executor
 from .serializers import RecommendationSerializer, SimilarItemSerializer
 from apps.core.models import Epreuve
 
@@ -26,6 +31,12 @@ class PersonalizedRecommendationsView(APIView):
                              description='Nombre de recommandations (défaut: 10)', required=False),
             OpenApiParameter(name='exclude_seen', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY,
                              description='Exclure les épreuves déjà vues (défaut: true)', required=False),
+            OpenApiParameter(name='budget_ms', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='Budget de latence en ms (0 = illimité) : au-delà, stratégies écartées',
+                             required=False),
+            OpenApiParameter(name='profile', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY,
+                             description='Administrateurs : calcul sans cache, détail par stratégie dans `debug`',
+                             required=False),
         ],
         responses={200: RecommendationSerializer(many=True)},
     )
@@ -36,23 +47,33 @@ class PersonalizedRecommendationsView(APIView):
 
         if top_k < 1 or top_k > 100:
             return Response({'error': 'top_k doit être entre 1 et 100'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            budget_ms = latency.parse_budget(request.query_params.get('budget_ms'))
+        except ValueError:
+            return Response({'error': 'budget_ms doit être un entier positif'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             predictor = get_lite_predictor()
-            recommendations = predictor.recommend_for_user(
-                user_db_id=user.id,
-                top_k=top_k,
-                exclude_seen=exclude_seen,
-                filter_by_niveau=True,
-            )
+            with profiling.capture() if profiling.requested_by(request) else nullcontext() as report:
+                recommendations = predictor.recommend_for_user(
+                    user_db_id=user.id,
+                    top_k=top_k,
+                    exclude_seen=exclude_seen,
+                    filter_by_niveau=True,
+                    budget_ms=budget_ms,
+                )
             serializer = RecommendationSerializer(recommendations, many=True)
-            return Response({
+            data = {
                 'user_id': user.id,
                 'username': user.username,
                 'niveau': user.niveau,
                 'count': len(serializer.data),
                 'recommendations': serializer.data,
-            })
+                **latency.provenance(recommendations),
+            }
+            if report is not None:
+                data['debug'] = report.as_dict()
+            return Response(data)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -118,6 +139,11 @@ class ModelStatusView(APIView):
                 'total_epreuves': Epreuve.objects.count(),
                 'total_interactions': Interaction.objects.count(),
             },
+            # Taux de succès par niveau de cache et activité du pool de calcul (ce worker)
+            'cache': all_cache_stats(),
+            'scoring': get_scoring_executor().stats,
+            # Durée, requêtes SQL et candidats par stratégie (RECO_PROFILING ou ?profile=1)
+            'profiling': profiling.summary(),
         })
 
 
@@ -127,10 +153,9 @@ class RecommendationStatsView(APIView):
 
     @extend_schema(summary="Statistiques", description="Statistiques des interactions et recommandations.")
     def get(self, request):
-        from apps.core.models import Interaction, Epreuve
-        from django.db.models import Count, Avg
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
+        from apps.core.models import Interaction
+        from apps.core.stats import global_recommendation_stats
+        from django.db.models import Count
 
         user = request.user
         user_interactions = Interaction.objects.filter(user=user)
@@ -147,14 +172,6 @@ class RecommendationStatsView(APIView):
 
         global_stats = None
         if user.is_staff:
-            global_stats = {
-                'total_users': User.objects.count(),
-                'total_epreuves': Epreuve.objects.count(),
-                'total_interactions': Interaction.objects.count(),
-                'avg_interactions_per_user': Interaction.objects.values('user').annotate(count=Count('id')).aggregate(avg=Avg('count'))['avg'],
-                'most_popular_epreuves': list(
-                    Epreuve.objects.order_by('-nb_telechargements')[:5].values('id', 'titre', 'nb_telechargements', 'nb_vues')
-                ),
-            }
+            global_stats = global_recommendation_stats()
 
         return Response({'user_stats': user_stats, 'global_stats': global_stats})
@@ -4,3 +4,6 @@ class RecommenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.recommender'
     verbose_name = 'Recommender System'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,26 @@
+"""
+Reconstruit les profils de préférences des utilisateurs (apps/recommender/ml/preferences.py).
+
+Les profils sont tenus à jour à chaque interaction ; une reconstruction
+périodique (ex: chaque nuit) prend en compte les interactions supprimées et
+les matières modifiées.
+
+Usage :
+    python manage.py rebuild_preferences
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.recommender.ml import preferences
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les profils de préférences des utilisateurs (avec décroissance temporelle)"
+
+    def handle(self, *args, **options):
+        start = time.time()
+        total = preferences.rebuild(log=lambda message: self.stdout.write(f"   {message}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Profils de {total} utilisateur(s) calculés en {time.time() - start:.1f}s"
+        ))
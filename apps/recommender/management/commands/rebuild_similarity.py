@@ -0,0 +1,25 @@
+"""
+Reconstruit l'index de similarité épreuve → épreuves (apps/recommender/ml/similarity.py).
+
+L'index est tenu à jour à chaque interaction ; une reconstruction périodique
+(ex: chaque nuit) recale les scores des épreuves qui n'ont pas été touchées.
+
+Usage :
+    python manage.py rebuild_similarity
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.recommender.ml import similarity
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index des épreuves similaires (métadonnées, co-occurrences, co-évaluations)"
+
+    def handle(self, *args, **options):
+        start = time.time()
+        total = similarity.rebuild(log=lambda message: self.stdout.write(f"   {message}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Voisins de {total} épreuve(s) calculés en {time.time() - start:.1f}s"
+        ))
@@ -7,6 +7,7 @@ import pickle
 from pathlib import Path
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from apps.core import cache_tags
 from apps.recommender.ml.ncf_model import NCFModel
 from apps.recommender.ml.data_loader import NCFDataLoader
 from apps.recommender.ml.trainer import NCFTrainer
@@ -61,6 +62,19 @@ class Command(BaseCommand):
             default=4,
             help='Number of negative samples per positive sample (default: 4)'
         )
+        parser.add_argument(
+            '--from-parquet',
+            type=str,
+            default=None,
+            help='Train on a Parquet export directory instead of the database '
+                 '(python manage.py export_data --format parquet)'
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            default=None,
+            help='With --from-parquet: only load interactions from this month on (YYYY-MM)'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('=' * 60))
@@ -88,9 +102,15 @@ class Command(BaseCommand):
         self.stdout.write('')
         
         # Step 1: Load data
-        self.stdout.write(self.style.WARNING('Step 1/5: Loading interaction data from database...'))
         data_loader = NCFDataLoader(negative_samples=negative_samples)
-        df = data_loader.load_data_from_db()
+        if options['from_parquet']:
+            self.stdout.write(self.style.WARNING(
+                f"Step 1/5: Loading interaction data from {options['from_parquet']}..."
+            ))
+            df = data_loader.load_data_from_parquet(options['from_parquet'], since=options['since'])
+        else:
+            self.stdout.write(self.style.WARNING('Step 1/5: Loading interaction data from database...'))
+            df = data_loader.load_data_from_db()
         
         self.stdout.write(self.style.SUCCESS(f'  ✓ Loaded {len(df)} interactions'))
         self.stdout.write(f'  ✓ Users: {data_loader.num_users}')
@@ -240,6 +260,9 @@ class Command(BaseCommand):
         )
         
         self.stdout.write(self.style.SUCCESS(f'  ✓ Metadata saved to database'))
+        
+        # New model: cached recommendations from the previous one are obsolete
+        cache_tags.invalidate(cache_tags.MODELE)
         self.stdout.write('')
         
         # Summary
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 01:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_stat_compteur"),
+        ("recommender", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EpreuveVoisins",
+            fields=[
+                (
+                    "epreuve",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="voisins",
+                        serialize=False,
+                        to="core.epreuve",
+                    ),
+                ),
+                ("voisins", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Voisins d'une epreuve",
+                "verbose_name_plural": "Voisins des epreuves",
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_epreuve_categories"),
+        ("recommender", "0002_epreuve_voisins"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProfilPreferences",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="preferences",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("poids", models.JSONField(default=dict)),
+                (
+                    "reference",
+                    models.DateTimeField(
+                        help_text="Date à laquelle les poids sont exprimés"
+                    ),
+                ),
+                ("nb_interactions", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Preferences d'un utilisateur",
+                "verbose_name_plural": "Preferences des utilisateurs",
+            },
+        ),
+    ]
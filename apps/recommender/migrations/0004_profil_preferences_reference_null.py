@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recommender", "0003_profil_preferences"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="profilpreferences",
+            name="reference",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Date à laquelle les poids sont exprimés (vide : aucune interaction)",
+                null=True,
+            ),
+        ),
+    ]
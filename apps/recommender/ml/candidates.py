@@ -0,0 +1,232 @@
+"""
+Génération de candidats : première étape des recommandations personnalisées.
+
+Les stratégies du recommandeur léger (fusion de LitePredictor) et l'inférence
+NCF ne notent plus tout le catalogue accessible à l'utilisateur, mais un pool
+d'au plus RECO_CANDIDATE_POOL_SIZE épreuves (0 = tout le catalogue) fourni
+par des générateurs peu coûteux, chacun borné par son quota (QUOTAS) :
+- preferences : matières et catégories du profil (ml/preferences.py) ;
+- neighbours : voisins (ml/similarity.py) des dernières épreuves consultées,
+  si l'index existe (app recommender installée) ;
+- filiere : catégories de matières de la filière (apps/core/taxonomy.py) ;
+- trending : épreuves les plus consultées sur TRENDING_DAYS jours ;
+- recent : derniers dépôts ;
+- popular : plus téléchargées.
+
+Les trois derniers ne dépendent que du niveau de l'utilisateur : ils sont
+calculés une fois par niveau et gardés en cache LIST_TIMEOUT secondes
+(invalidés quand le catalogue change). Les autres sont des lectures indexées
+ou par clé primaire. Le coût d'une recommandation dépend ainsi de la taille
+du pool, plus de celle du catalogue.
+
+Le pool est l'union des candidats dans l'ordre des générateurs ; les
+épreuves non approuvées, d'un niveau supérieur ou déjà vues en sont retirées
+par `catalogue()`, que les deux étapes partagent.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.core import cache_tags, taxonomy
+from apps.core.tiered_cache import get_tiered_cache
+
+from . import preferences, similarity
+
+NIVEAUX = ['P1', 'P2', 'L3', 'M1', 'M2']
+
+# Candidats par générateur (un pool de 300 n'est pas toujours rempli par les premiers)
+QUOTAS = {
+    'preferences': 100,
+    'neighbours': 100,
+    'filiere': 80,
+    'trending': 60,
+    'recent': 40,
+    'popular': 60,
+}
+
+# Dernières épreuves consultées dont les voisins sont candidats
+NEIGHBOUR_SEEDS = 10
+
+TRENDING_DAYS = 7
+
+# Listes partagées : durée en cache, et marge pour les épreuves déjà vues
+LIST_TIMEOUT = 300
+LIST_MARGIN = 2
+
+# Champs longs jamais lus par le recommandeur (texte extrait du PDF : jusqu'à
+# extraction.MAX_TEXT_LENGTH caractères), différés à chaque chargement d'épreuves
+DEFERRED_FIELDS = ('texte_extrait', 'description')
+
+
+def pool_size():
+    return getattr(settings, 'RECO_CANDIDATE_POOL_SIZE', 300)
+
+
+def allowed_niveaux(user):
+    """Niveaux accessibles à l'utilisateur (le sien et les précédents), None si inconnu."""
+    if user is None or user.niveau not in NIVEAUX:
+        return None
+    return NIVEAUX[:NIVEAUX.index(user.niveau) + 1]
+
+
+def catalogue(niveaux=None, seen_ids=()):
+    """Épreuves approuvées des niveaux donnés, hors épreuves déjà vues."""
+    from apps.core.models import Epreuve
+
+    queryset = Epreuve.objects.filter(is_approved=True).defer(*DEFERRED_FIELDS)
+    if niveaux:
+        queryset = queryset.filter(niveau__in=niveaux)
+    if seen_ids:
+        queryset = queryset.exclude(id__in=seen_ids)
+    return queryset
+
+
+def _ids(queryset, limit):
+    return list(queryset.values_list('id', flat=True)[:limit])
+
+
+# ════════════════════════════════════════════════════════
+# Générateurs propres à l'utilisateur
+# ════════════════════════════════════════════════════════
+
+def _by_preferences(user, niveaux, seen_ids, limit):
+    profile = preferences.get_profile(user.id)
+    if not profile:
+        return []
+    q_filter = Q(matiere__in=profile.top('matiere', 5)) | Q(categorie__in=profile.top('categorie', 2))
+    return _ids(
+        catalogue(niveaux, seen_ids).filter(q_filter).order_by('-nb_telechargements', '-note_moyenne_pertinence'),
+        limit,
+    )
+
+
+def _by_neighbours(user, niveaux, seen_ids, limit):
+    # Sans l'app recommender, pas d'index à lire : générateur ignoré
+    if not similarity.is_available():
+        return []
+
+    from apps.core.models import Interaction
+    from apps.recommender.models import EpreuveVoisins
+
+    recent = (
+        Interaction.objects.filter(user_id=user.id)
+        .order_by('-timestamp')
+        .values_list('epreuve_id', flat=True)[:NEIGHBOUR_SEEDS * 3]
+    )
+    seeds = list(dict.fromkeys(recent))[:NEIGHBOUR_SEEDS]
+    scores = defaultdict(float)
+    # Index seul : une épreuve pas encore indexée n'apporte pas de voisins
+    for voisins in EpreuveVoisins.objects.filter(pk__in=seeds).values_list('voisins', flat=True):
+        for epreuve_id, score in voisins:
+            if epreuve_id not in seen_ids:
+                scores[epreuve_id] += score
+    return heapq.nlargest(limit, scores, key=scores.get)
+
+
+def _by_filiere(user, niveaux, seen_ids, limit):
+    categories = taxonomy.filiere_categories(user.filiere)
+    if not categories:
+        return []
+    return _ids(
+        catalogue(niveaux, seen_ids).filter(categorie__in=categories)
+        .order_by('-note_moyenne_pertinence', '-nb_telechargements'),
+        limit,
+    )
+
+
+# ════════════════════════════════════════════════════════
+# Listes partagées (par niveau)
+# ════════════════════════════════════════════════════════
+
+def _cache():
+    return get_tiered_cache('candidates', local_timeout=LIST_TIMEOUT)
+
+
+def _trending_ids(niveaux, size):
+    from apps.core.models import Interaction
+
+    since = timezone.now() - timedelta(days=TRENDING_DAYS)
+    interactions = Interaction.objects.filter(timestamp__gte=since, epreuve__is_approved=True)
+    if niveaux:
+        interactions = interactions.filter(epreuve__niveau__in=niveaux)
+    return list(
+        interactions.values('epreuve_id')
+        .annotate(freq=Count('id'))
+        .order_by('-freq')
+        .values_list('epreuve_id', flat=True)[:size]
+    )
+
+
+def _recent_ids(niveaux, size):
+    return _ids(catalogue(niveaux).order_by('-created_at', '-id'), size)
+
+
+def _popular_ids(niveaux, size):
+    return _ids(catalogue(niveaux).order_by('-nb_telechargements', '-nb_vues'), size)
+
+
+def _shared(name, compute):
+    def generator(user, niveaux, seen_ids, limit):
+        key = cache_tags.tagged_key(
+            f"candidates:{name}:{'-'.join(niveaux or ['all'])}", [cache_tags.MODELE],
+        )
+        ids = _cache().get(key)
+        if ids is None:
+            ids = compute(niveaux, limit * LIST_MARGIN)
+            _cache().set(key, ids, LIST_TIMEOUT)
+        return [epreuve_id for epreuve_id in ids if epreuve_id not in seen_ids][:limit]
+    return generator
+
+
+GENERATORS = (
+    ('preferences', _by_preferences),
+    ('neighbours', _by_neighbours),
+    ('filiere', _by_filiere),
+    ('trending', _shared('trending', _trending_ids)),
+    ('recent', _shared('recent', _recent_ids)),
+    ('popular', _shared('popular', _popular_ids)),
+)
+
+
+# ════════════════════════════════════════════════════════
+# Pool
+# ════════════════════════════════════════════════════════
+
+class Pool:
+    """ID candidats dans l'ordre des générateurs, et la part de chacun."""
+
+    def __init__(self):
+        self.ids = {}
+        self.counts = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def add(self, name, ids, size):
+        added = 0
+        for epreuve_id in ids:
+            if len(self.ids) >= size:
+                break
+            if epreuve_id not in self.ids:
+                self.ids[epreuve_id] = name
+                added += 1
+        self.counts[name] = added
+
+
+def generate(user, niveaux=None, seen_ids=(), size=None):
+    """Pool de candidats de l'utilisateur (au plus `size`, défaut RECO_CANDIDATE_POOL_SIZE)."""
+    size = pool_size() if size is None else size
+    seen_ids = set(seen_ids)
+    pool = Pool()
+    for name, generator in GENERATORS:
+        if len(pool) >= size:
+            break
+        pool.add(name, generator(user, niveaux, seen_ids, QUOTAS[name]), size)
+    return pool
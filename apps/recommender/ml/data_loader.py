@@ -48,6 +48,19 @@ class NCFDataLoader:
     Handles data extraction, preprocessing, and negative sampling
     """
     
+    # Implicit rating per interaction type
+    RATING_MAP = {
+        'VIEW': 1.0,
+        'CLICK': 2.0,
+        'DOWNLOAD': 3.0,
+        'RATE': 4.0,
+        'COMMENT': 5.0,
+        'BOOKMARK': 3.5,
+    }
+    
+    # Columns read from a Parquet export (apps/core/columnar.py)
+    PARQUET_COLUMNS = ['user_id', 'epreuve_id', 'action_type', 'timestamp']
+    
     def __init__(self, test_size=0.2, val_size=0.1, negative_samples=4, random_state=42):
         """
         Initialize data loader
@@ -101,6 +114,43 @@ class NCFDataLoader:
         
         return df
     
+    def load_data_from_parquet(self, path, since=None):
+        """
+        Load interaction data from a Parquet export instead of the database
+        (python manage.py export_data --format parquet -o <path>)
+        
+        Only PARQUET_COLUMNS are read, and monthly partitions older than
+        `since` are skipped without being opened.
+        
+        Args:
+            path (str): Export directory
+            since (str): First month to load, 'YYYY-MM' (default: all)
+        
+        Returns:
+            pandas.DataFrame: DataFrame with columns [user_id, item_id, rating, timestamp]
+        """
+        from apps.core import columnar
+        
+        filters = [('mois', '>=', since)] if since else None
+        table = columnar.read_table(path, 'interactions', columns=self.PARQUET_COLUMNS, filters=filters)
+        
+        # Numeric columns are converted without copies; action_type arrives
+        # as a categorical, so ratings are looked up once per category
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        actions = df['action_type']
+        lookup = np.array([self._interaction_to_rating(a) for a in actions.cat.categories] + [1.0])
+        
+        df = pd.DataFrame({
+            'user_id': df['user_id'].to_numpy(),
+            'item_id': df['epreuve_id'].to_numpy(),
+            'rating': lookup[actions.cat.codes.to_numpy()],
+            'timestamp': df['timestamp'],
+        })
+        
+        self._create_mappings(df)
+        
+        return df
+    
     def _interaction_to_rating(self, action_type):
         """
         Convert interaction type to implicit rating
@@ -111,15 +161,7 @@ class NCFDataLoader:
         Returns:
             float: Implicit rating score
         """
-        rating_map = {
-            'VIEW': 1.0,
-            'CLICK': 2.0,
-            'DOWNLOAD': 3.0,
-            'RATE': 4.0,
-            'COMMENT': 5.0,
-            'BOOKMARK': 3.5,
-        }
-        return rating_map.get(action_type, 1.0)
+        return self.RATING_MAP.get(action_type, 1.0)
     
     def _create_mappings(self, df):
         """
@@ -0,0 +1,90 @@
+"""
+Budget de latence des recommandations.
+
+L'appelant fixe un budget (paramètre `budget_ms` des vues, défaut
+RECO_LATENCY_BUDGET_MS, 0 = illimité) converti en échéance absolue :
+- LitePredictor exécute ses stratégies par ordre de priorité
+  (STRATEGY_PRIORITY) et n'en lance plus une fois l'échéance passée ; une
+  stratégie encore en cours à l'échéance est écartée de la fusion (ses boucles
+  s'arrêtent via `profiling.out_of_time()`) ;
+- NCFPredictor complète par les épreuves populaires ce que le modèle n'a pas
+  produit à temps ;
+- l'appelant n'attend le pool de scoring que jusqu'à l'échéance plus
+  RECO_LATENCY_GRACE_MS, puis sert les épreuves populaires.
+
+Le résultat (`Recommendations`) indique les sources qui y ont contribué et
+s'il est complet. Un résultat dégradé n'est gardé en cache que
+RECO_DEGRADED_CACHE_TIMEOUT secondes, et n'est servi qu'aux appels avec budget.
+"""
+import time
+
+from django.conf import settings
+
+
+class Recommendations(list):
+    """Résultat `[(epreuve_id, score, Epreuve), ...]` et sa provenance."""
+
+    def __init__(self, items=(), sources=(), complete=True):
+        super().__init__(items)
+        self.sources = list(sources)
+        self.complete = complete
+
+
+def provenance(results):
+    """Champs `sources` / `degraded` des réponses de l'API."""
+    return {
+        'sources': getattr(results, 'sources', []),
+        'degraded': not getattr(results, 'complete', True),
+    }
+
+
+def default_budget_ms():
+    return getattr(settings, 'RECO_LATENCY_BUDGET_MS', 0)
+
+
+def effective_budget_ms(budget_ms):
+    """Budget appliqué en ms (défaut RECO_LATENCY_BUDGET_MS si absent), 0 = illimité."""
+    if budget_ms is None:
+        budget_ms = default_budget_ms()
+    return budget_ms or 0
+
+
+def deadline_for(budget_ms):
+    """Échéance (horloge `perf_counter`) pour un budget en ms ; None si illimité."""
+    budget_ms = effective_budget_ms(budget_ms)
+    if not budget_ms:
+        return None
+    return time.perf_counter() + budget_ms / 1000
+
+
+def expired(deadline):
+    return deadline is not None and time.perf_counter() >= deadline
+
+
+def wait_timeout(deadline):
+    """Attente maximale du résultat du pool de scoring (None : délai du pool)."""
+    if deadline is None:
+        return None
+    grace = getattr(settings, 'RECO_LATENCY_GRACE_MS', 100) / 1000
+    return max(deadline - time.perf_counter(), 0) + grace
+
+
+def cache_timeout(results, default):
+    if getattr(results, 'complete', True):
+        return default
+    return getattr(settings, 'RECO_DEGRADED_CACHE_TIMEOUT', 60)
+
+
+def parse_budget(value):
+    """
+    Paramètre `budget_ms` d'une requête (None si absent).
+
+    Raises:
+        ValueError: valeur non entière ou négative
+    """
+    if value in (None, ''):
+        return None
+    budget = int(value)
+    if budget < 0:
+        raise ValueError(value)
+    return budget
@@ -7,20 +7,14 @@ import logging
 import math
 from collections import defaultdict
 
-from django.db.models import Count, Q, Avg, Sum
-from django.core.cache import cache
+from django.conf import settings
+from django.db.models import Count, Q, Avg
 
-logger = logging.getLogger(__name__)
+from apps.core import cache_tags, instrumentation, metrics, snapshots, taxonomy
+from . import candidates, latency, preferences, profiling, result_cache, similarity
+from .scoring import get_scoring_executor
 
-# ── Poids des signaux d'interaction (implicites + explicites) ──
-INTERACTION_WEIGHTS = {
-    'VIEW': 1.0,
-    'CLICK': 1.5,
-    'DOWNLOAD': 3.0,
-    'RATE': 4.0,
-    'COMMENT': 5.0,   # commenter = fort engagement
-    'BOOKMARK': 3.5,
-}
+logger = logging.getLogger(__name__)
 
 # ── Poids des stratégies dans la fusion finale ──
 # Calibrés pour ~200 épreuves / ~50 users (faible densité) :
@@ -35,38 +29,10 @@ STRATEGY_WEIGHTS = {
     'profile': 0.10,
 }
 
-# ── Normalisation des noms de matières (variantes → catégorie principale) ──
-MATIERE_ALIASES = {
-    'SII': "Science industrielle de l'ingénieur",
-    'SSI': "Science industrielle de l'ingénieur",
-    'Algebre': 'Mathématiques',
-    'Algèbre': 'Mathématiques',
-    'Algebre abstraite': 'Mathématiques',
-    'Probabilites': 'Mathématiques',
-    'Analyse': 'Mathématiques',
-    'Analyse2': 'Mathématiques',
-    'Analyse fonctionnelle': 'Mathématiques',
-    'Geometrie': 'Mathématiques',
-    'Theorie des nombres': 'Mathématiques',
-    'Topologie': 'Mathématiques',
-    'Statistique descriptive': 'Mathématiques',
-    'Méthodes numériques': 'Mathématiques',
-    'Processus stochastiques': 'Mathématiques',
-    'OM': 'Mathématiques',
-    'Reseaux': 'Informatique',
-    'Réseau': 'Informatique',
-    'Bases de donnees': 'Informatique',
-    'Programmation': 'Informatique',
-    'Thermodynamique': 'Physique',
-    'Chimie minerale': 'Chimie',
-    'Chimie analytique': 'Chimie',
-    'Anglais': 'Anglais Scientifique',
-}
-
-
-def normalize_matiere(matiere: str) -> str:
-    """Retourne la catégorie principale d'une matière."""
-    return MATIERE_ALIASES.get(matiere, matiere)
+# ── Ordre d'exécution sous budget de latence (ml/latency.py) ──
+# Du moins coûteux au plus coûteux en requêtes SQL ; la popularité, toujours
+# conservée, garantit un résultat même quand l'échéance est très courte.
+STRATEGY_PRIORITY = ('popularity', 'content', 'profile', 'evaluation', 'collaborative')
 
 
 class LitePredictor:
@@ -82,26 +48,54 @@ class LitePredictor:
 
     def __init__(self):
         self.cache_enabled = True
-        self.cache_timeout = 300  # 5 min
+        # TTL long : la fraîcheur est assurée par l'invalidation par tags (apps/core/cache_tags.py)
+        self.cache_timeout = getattr(settings, 'RECO_CACHE_TIMEOUT', 6 * 3600)
 
     # ═══════════════════════════════════════════════════════════
     #  API publique
     # ═══════════════════════════════════════════════════════════
 
-    def recommend_for_user(self, user_db_id, top_k=10, exclude_seen=True, filter_by_niveau=True):
-        """Recommandations personnalisées pour un utilisateur."""
-        from apps.core.models import User, Epreuve, Interaction
-
-        cache_key = f"lite_reco:user_{user_db_id}:k_{top_k}"
+    @metrics.RECOMMENDATION_SECONDS.timed(engine='lite', kind='personalized')
+    @instrumentation.timed('predictor')
+    def recommend_for_user(self, user_db_id, top_k=10, exclude_seen=True, filter_by_niveau=True, budget_ms=None):
+        """
+        Recommandations personnalisées pour un utilisateur.
+
+        `budget_ms` : budget de latence (défaut RECO_LATENCY_BUDGET_MS, 0 = illimité) ;
+        le résultat (`latency.Recommendations`) indique les stratégies retenues.
+        """
+        deadline = latency.deadline_for(budget_ms)
+        # Clé versionnée : invalidée dès que l'utilisateur interagit ou que le catalogue change
+        cache_key = cache_tags.tagged_key(
+            f"lite_reco:user_{user_db_id}:k_{top_k}",
+            [cache_tags.MODELE, cache_tags.user_tag(user_db_id)],
+        )
+        if profiling.requested():
+            # Détail demandé (?profile=1) : calcul complet dans ce thread, sans cache
+            return self._compute_for_user(cache_key, user_db_id, top_k, exclude_seen, filter_by_niveau, deadline)
         if self.cache_enabled:
-            cached = cache.get(cache_key)
+            # Résultat dégradé en cache : seulement pour un appel lui-même sous budget
+            cached = result_cache.load(cache_key, accept_degraded=deadline is not None)
             if cached is not None:
                 return cached
 
+        # Cache manquant : un seul calcul pour les requêtes identiques simultanées (même budget)
+        return get_scoring_executor().run(
+            f"{cache_key}:seen_{exclude_seen}:niveau_{filter_by_niveau}:budget_{latency.effective_budget_ms(budget_ms)}",
+            self._compute_for_user, cache_key, user_db_id, top_k, exclude_seen, filter_by_niveau, deadline,
+            fallback=lambda: latency.Recommendations(
+                self._get_popular_items(top_k, user_db_id), sources=['popularity'], complete=False,
+            ),
+            timeout=latency.wait_timeout(deadline),
+        )
+
+    def _compute_for_user(self, cache_key, user_db_id, top_k, exclude_seen, filter_by_niveau, deadline=None):
+        from apps.core.models import User, Interaction
+
         try:
             user = User.objects.get(id=user_db_id)
         except User.DoesNotExist:
-            return self._get_popular_items(top_k)
+            return latency.Recommendations(self._get_popular_items(top_k), sources=['popularity'])
 
         # Épreuves déjà vues
         seen_ids = set()
@@ -111,127 +105,102 @@ class LitePredictor:
                 .values_list('epreuve_id', flat=True)
             )
 
-        # Base queryset
-        queryset = Epreuve.objects.filter(is_approved=True)
-        if filter_by_niveau and user.niveau:
-            niveau_order = ['P1', 'P2', 'L3', 'M1', 'M2']
-            try:
-                user_idx = niveau_order.index(user.niveau)
-                allowed = niveau_order[:user_idx + 1]
-                queryset = queryset.filter(niveau__in=allowed)
-            except ValueError:
-                pass
-
-        if exclude_seen and seen_ids:
-            queryset = queryset.exclude(id__in=seen_ids)
-
-        # ─── 5 stratégies ───
-        content_recs = self._content_based_recs(user, queryset, top_k * 3)
-        collab_recs = self._collaborative_recs(user_db_id, queryset, seen_ids, top_k * 2)
-        eval_recs = self._evaluation_based_recs(user, queryset, top_k * 2)
-        popular_recs = self._popularity_recs(queryset, top_k * 2)
-        profile_recs = self._profile_match_recs(user, queryset, top_k * 2)
+        # Catalogue accessible : niveau de l'utilisateur et précédents, hors épreuves vues
+        niveaux = candidates.allowed_niveaux(user) if filter_by_niveau else None
+        queryset = candidates.catalogue(niveaux, seen_ids)
+
+        # ─── Étape 1 : pool de candidats (ml/candidates.py), 0 = tout le catalogue ───
+        if candidates.pool_size():
+            pool = self._run_strategy('candidates', candidates.generate, user, niveaux, seen_ids, deadline=deadline)
+            queryset = queryset.filter(id__in=list(pool))
+
+        # ─── Étape 2 : 5 stratégies sur le pool (mesurées et bornées par ml/profiling.py) ───
+        plan = {
+            'content': (self._content_based_recs, (user, queryset, top_k * 3)),
+            'collaborative': (self._collaborative_recs, (user_db_id, queryset, seen_ids, top_k * 2)),
+            'evaluation': (self._evaluation_based_recs, (user, queryset, top_k * 2)),
+            'popularity': (self._popularity_recs, (queryset, top_k * 2)),
+            'profile': (self._profile_match_recs, (user, queryset, top_k * 2)),
+        }
+        recs = dict.fromkeys(plan, [])
+        sources = []
+        for name in STRATEGY_PRIORITY:
+            # Échéance passée : stratégies suivantes abandonnées
+            if sources and latency.expired(deadline):
+                break
+            func, args = plan[name]
+            result = self._run_strategy(name, func, *args, deadline=deadline)
+            # Interrompue par l'échéance : résultat partiel écarté
+            if sources and latency.expired(deadline):
+                break
+            recs[name] = result
+            sources.append(name)
 
         # ─── Fusion ───
-        merged = self._merge_all(
-            content_recs, collab_recs, eval_recs, popular_recs, profile_recs, top_k
+        merged = latency.Recommendations(
+            self._run_strategy(
+                'merge', self._merge_all,
+                recs['content'], recs['collaborative'], recs['evaluation'],
+                recs['popularity'], recs['profile'], top_k,
+            ),
+            sources=sources,
+            complete=len(sources) == len(plan),
         )
 
         if self.cache_enabled:
-            cache.set(cache_key, merged, self.cache_timeout)
+            result_cache.store(cache_key, merged, latency.cache_timeout(merged, self.cache_timeout))
         return merged
 
-    def recommend_similar_items(self, item_db_id, top_k=10):
-        """Épreuves similaires enrichies (contenu + évaluations croisées)."""
-        from apps.core.models import Epreuve, Evaluation, Interaction
-
-        cache_key = f"lite_similar:{item_db_id}:k_{top_k}"
-        if self.cache_enabled:
-            cached = cache.get(cache_key)
-            if cached is not None:
-                return cached
-
-        try:
-            source = Epreuve.objects.get(id=item_db_id)
-        except Epreuve.DoesNotExist:
-            return []
-
-        candidates = Epreuve.objects.filter(is_approved=True).exclude(id=item_db_id)
-
-        # Utilisateurs qui ont bien noté cette épreuve
-        good_raters = set(
-            Evaluation.objects.filter(epreuve_id=item_db_id, note_pertinence__gte=4)
-            .values_list('user_id', flat=True)
-        )
-        # Quelles autres épreuves ces utilisateurs ont-ils bien notées ?
-        corated_ids = set()
-        if good_raters:
-            corated_ids = set(
-                Evaluation.objects.filter(user_id__in=good_raters, note_pertinence__gte=4)
-                .exclude(epreuve_id=item_db_id)
-                .values_list('epreuve_id', flat=True)
-            )
-
-        scored = []
-        for ep in candidates:
-            score = 0.0
-            if ep.matiere == source.matiere:
-                score += 0.35
-            if ep.niveau == source.niveau:
-                score += 0.15
-            if ep.type_epreuve == source.type_epreuve:
-                score += 0.1
-            if ep.annee_academique == source.annee_academique:
-                score += 0.05
-            # Bonus co-évaluation
-            if ep.id in corated_ids:
-                score += 0.2
-            # Bonus qualité (pertinence moyenne)
-            if ep.note_moyenne_pertinence and ep.note_moyenne_pertinence > 3:
-                score += (ep.note_moyenne_pertinence - 3) / 2 * 0.1
-
-            if score > 0.1:
-                scored.append((ep.id, round(score, 4), ep))
-
-        scored.sort(key=lambda x: x[1], reverse=True)
-        result = scored[:top_k]
+    def _run_strategy(self, name, func, *args, deadline=None):
+        with profiling.strategy(name, deadline) as probe:
+            recs = func(*args)
+            probe.candidates = len(recs)
+        return recs
 
-        if self.cache_enabled:
-            cache.set(cache_key, result, self.cache_timeout)
+    @metrics.RECOMMENDATION_SECONDS.timed(engine='lite', kind='similar')
+    @instrumentation.timed('predictor')
+    def recommend_similar_items(self, item_db_id, top_k=10):
+        """
+        Épreuves similaires : métadonnées, co-occurrences et co-évaluations,
+        lues dans l'index précalculé (ml/similarity.py, au plus similarity.TOP_N).
+        """
+        voisins = similarity.get_neighbours(item_db_id)
+        epreuves = snapshots.get_epreuves(epreuve_id for epreuve_id, _ in voisins)
+        result = []
+        for epreuve_id, score in voisins:
+            ep = epreuves.get(epreuve_id)
+            # Épreuve supprimée ou retirée depuis le calcul de l'index
+            if ep is None or not ep.is_approved:
+                continue
+            result.append((epreuve_id, score, ep))
+            if len(result) == top_k:
+                break
         return result
 
     # ═══════════════════════════════════════════════════════════
     #  Stratégie 1 : Content-based
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='content')
     def _content_based_recs(self, user, queryset, limit):
-        """Basé sur matières / profs / types préférés — pondéré par engagement."""
-        from apps.core.models import Interaction
-
-        interactions = (
-            Interaction.objects.filter(user=user)
-            .select_related('epreuve')
-        )
-
-        matiere_scores = defaultdict(float)
-        type_scores = defaultdict(float)
-
-        for inter in interactions:
-            ep = inter.epreuve
-            w = INTERACTION_WEIGHTS.get(inter.action_type, 1.0)
-            matiere_scores[ep.matiere] += w
-            type_scores[ep.type_epreuve] += w
-
-        if not matiere_scores:
+        """Basé sur les matières / catégories / types / niveaux préférés (profil avec décroissance)."""
+        profile = preferences.get_profile(user.id)
+        if not profile:
             return self._cold_start_content(user, queryset, limit)
 
-        top_matieres = sorted(matiere_scores, key=matiere_scores.get, reverse=True)[:5]
-        top_types = sorted(type_scores, key=type_scores.get, reverse=True)[:2] if type_scores else []
+        matiere_scores = profile.weights('matiere')
+        categorie_scores = profile.weights('categorie')
+        niveau_scores = profile.weights('niveau')
+        top_matieres = profile.top('matiere', 5)
+        top_categories = profile.top('categorie', 2)
+        top_types = profile.top('type_epreuve', 2)
 
-        # Score max pour normaliser
-        max_m = matiere_scores[top_matieres[0]] if top_matieres else 1
+        # Scores max pour normaliser
+        max_m = matiere_scores[top_matieres[0]]
+        max_c = max(categorie_scores.values(), default=0) or 1
+        max_n = max(niveau_scores.values(), default=0) or 1
 
-        q_filter = Q(matiere__in=top_matieres)
+        q_filter = Q(matiere__in=top_matieres) | Q(categorie__in=top_categories)
 
         recs = queryset.filter(q_filter).order_by('-nb_telechargements', '-note_moyenne_pertinence')[:limit]
 
@@ -239,11 +208,13 @@ class LitePredictor:
         for ep in recs:
             score = 0.0
             if ep.matiere in matiere_scores:
-                score += (matiere_scores[ep.matiere] / max_m) * 0.7
+                score += (matiere_scores[ep.matiere] / max_m) * 0.55
+            score += (categorie_scores.get(ep.categorie, 0) / max_c) * 0.15
             if ep.type_epreuve in top_types:
                 score += 0.1
+            score += (niveau_scores.get(ep.niveau, 0) / max_n) * 0.05
             if ep.note_moyenne_pertinence:
-                score += (ep.note_moyenne_pertinence / 5) * 0.15
+                score += (ep.note_moyenne_pertinence / 5) * 0.1
             pop = min((ep.nb_telechargements * 2 + ep.nb_vues) / 100, 1.0)
             score += pop * 0.05
             results.append((ep.id, round(score, 4), ep))
@@ -252,22 +223,13 @@ class LitePredictor:
 
     def _cold_start_content(self, user, queryset, limit):
         """Nouveau utilisateur → recommandations basées sur la filière."""
-        FILIERE_MATIERES = {
-            'MATH': ['Analyse', 'Algebre', 'Probabilites', 'Statistiques', 'Geometrie', 'Mathematiques'],
-            'INFO': ['Algorithmes', 'Bases de donnees', 'Reseaux', 'IA', 'Programmation', 'Informatique'],
-            'PHYSIQUE': ['Mecanique', 'Thermodynamique', 'Electromagnetisme', 'Optique', 'Physique'],
-            'CHIMIE': ['Chimie organique', 'Chimie minerale', 'Chimie analytique', 'Chimie'],
-            'RO': ['Recherche Operationnelle', 'Optimisation', 'Programmation lineaire', 'Mathematiques'],
-            'STAT_PROB': ['Probabilites', 'Statistiques', 'Analyse', 'Mathematiques'],
-            'MATH_FOND': ['Algebre', 'Analyse', 'Topologie', 'Geometrie', 'Mathematiques'],
-        }
-        matieres = FILIERE_MATIERES.get(user.filiere or '', [])
-        if matieres:
-            # Recherche flexible : la matière contient un des mots-clés
-            q = Q()
-            for m in matieres:
-                q |= Q(matiere__icontains=m)
-            recs = queryset.filter(q).order_by('-note_moyenne_pertinence', '-nb_telechargements')[:limit]
+        categories = taxonomy.filiere_categories(user.filiere)
+        if categories:
+            # Catégorie principale précalculée (colonne indexée)
+            recs = (
+                queryset.filter(categorie__in=categories)
+                .order_by('-note_moyenne_pertinence', '-nb_telechargements')[:limit]
+            )
             return [(ep.id, 0.3, ep) for ep in recs]
         return []
 
@@ -275,6 +237,7 @@ class LitePredictor:
     #  Stratégie 2 : Collaborative filtering
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='collaborative')
     def _collaborative_recs(self, user_id, queryset, seen_ids, limit):
         """Utilisateurs similaires par comportement ET par évaluations."""
         from apps.core.models import Interaction, Evaluation
@@ -337,35 +300,40 @@ class LitePredictor:
         if not top_similar:
             return []
 
-        # Épreuves aimées par les utilisateurs similaires mais pas vues par l'utilisateur
-        collab_epreuves = (
-            Interaction.objects.filter(user_id__in=top_similar)
+        # Épreuves aimées par les utilisateurs similaires mais pas vues par l'utilisateur,
+        # restreintes aux candidats (pool ou catalogue accessible) avant la coupe à `limit`
+        collab_epreuves = list(
+            Interaction.objects.filter(user_id__in=top_similar, epreuve_id__in=queryset.values('id'))
             .exclude(epreuve_id__in=my_epreuves | set(my_evaluations.keys()))
             .values('epreuve_id')
-            .annotate(
-                freq=Count('user_id', distinct=True),
-                total_weight=Sum('id')  # placeholder
-            )
-            .order_by('-freq')[:limit]
+            .annotate(freq=Count('user_id', distinct=True))
+            .order_by('-freq', '-epreuve_id')[:limit]
+        )
+        if not collab_epreuves:
+            return []
+
+        ids = [item['epreuve_id'] for item in collab_epreuves]
+        epreuves = queryset.in_bulk(ids)
+        # Note moyenne des utilisateurs similaires, pour toutes les épreuves en une requête
+        avg_evals = dict(
+            Evaluation.objects.filter(user_id__in=top_similar, epreuve_id__in=ids)
+            .values('epreuve_id')
+            .annotate(avg=Avg('note_pertinence'))
+            .values_list('epreuve_id', 'avg')
         )
 
-        max_freq = max((c['freq'] for c in collab_epreuves), default=1)
+        max_freq = max(item['freq'] for item in collab_epreuves)
         results = []
         for item in collab_epreuves:
-            try:
-                ep = queryset.get(id=item['epreuve_id'])
-                score = (item['freq'] / max_freq) * 0.8
-                # Bonus si bien noté par les utilisateurs similaires
-                avg_eval = (
-                    Evaluation.objects.filter(
-                        user_id__in=top_similar, epreuve_id=ep.id
-                    ).aggregate(avg=Avg('note_pertinence'))['avg']
-                )
-                if avg_eval and avg_eval > 3:
-                    score += (avg_eval - 3) / 2 * 0.2
-                results.append((ep.id, round(score, 4), ep))
-            except Exception:
+            ep = epreuves.get(item['epreuve_id'])
+            if ep is None:
                 continue
+            score = (item['freq'] / max_freq) * 0.8
+            # Bonus si bien noté par les utilisateurs similaires
+            avg_eval = avg_evals.get(ep.id)
+            if avg_eval and avg_eval > 3:
+                score += (avg_eval - 3) / 2 * 0.2
+            results.append((ep.id, round(score, 4), ep))
 
         return results
 
@@ -373,6 +341,7 @@ class LitePredictor:
     #  Stratégie 3 : Évaluations explicites (NOUVEAU)
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='evaluation')
     def _evaluation_based_recs(self, user, queryset, limit):
         """Épreuves bien notées globalement + commentaires positifs."""
         from apps.core.models import Evaluation, Commentaire
@@ -390,6 +359,8 @@ class LitePredictor:
         # Enrichir avec les données de commentaires
         results = []
         for ep in well_rated:
+            if profiling.out_of_time():
+                break
             score = 0.0
             # Score pertinence (normalisé 0-1)
             score += (ep.note_moyenne_pertinence / 5) * 0.6
@@ -411,10 +382,8 @@ class LitePredictor:
             score *= (0.5 + confidence * 0.5)
 
             # Correspondance matière avec l'utilisateur
-            if user.filiere:
-                filiere_match = self._filiere_matches_matiere(user.filiere, ep.matiere)
-                if filiere_match:
-                    score += 0.05
+            if taxonomy.matches(user.filiere, ep.categories):
+                score += 0.05
 
             results.append((ep.id, round(score, 4), ep))
 
@@ -424,6 +393,7 @@ class LitePredictor:
     #  Stratégie 4 : Popularité pondérée
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='popularity')
     def _popularity_recs(self, queryset, limit):
         """Popularité pondérée par qualité."""
         popular = queryset.order_by('-nb_telechargements', '-nb_vues', '-note_moyenne_pertinence')[:limit]
@@ -444,6 +414,7 @@ class LitePredictor:
     #  Stratégie 5 : Correspondance profil (NOUVEAU)
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='profile')
     def _profile_match_recs(self, user, queryset, limit):
         """Épreuves correspondant au profil académique de l'utilisateur."""
         results = []
@@ -453,7 +424,7 @@ class LitePredictor:
             if user.niveau and ep.niveau == user.niveau:
                 score += 0.4
             # Filière correspond à la matière
-            if user.filiere and self._filiere_matches_matiere(user.filiere, ep.matiere):
+            if taxonomy.matches(user.filiere, ep.categories):
                 score += 0.4
             # Bonus qualité
             if ep.note_moyenne_pertinence:
@@ -467,6 +438,7 @@ class LitePredictor:
     #  Fusion multi-stratégies
     # ═══════════════════════════════════════════════════════════
 
+    @metrics.STRATEGY_SECONDS.timed(engine='lite', strategy='merge')
     def _merge_all(self, content_recs, collab_recs, eval_recs, popular_recs, profile_recs, top_k):
         """Fusionne les 5 sources avec pondération configurable."""
         scores = {}  # epreuve_id → [total_score, epreuve_obj]
@@ -499,25 +471,10 @@ class LitePredictor:
     #  Utilitaires
     # ═══════════════════════════════════════════════════════════
 
-    def _filiere_matches_matiere(self, filiere, matiere):
-        """Vérifie si une filière correspond à une matière."""
-        FILIERE_KEYWORDS = {
-            'MATH': ['analyse', 'algebre', 'math', 'probabilit', 'statistiq', 'geometrie', 'topolog'],
-            'INFO': ['algorithm', 'informati', 'programm', 'base de donn', 'reseaux', 'ia', 'machine'],
-            'PHYSIQUE': ['mecaniq', 'thermodyn', 'electro', 'optiq', 'physiq', 'quantiq'],
-            'CHIMIE': ['chimi', 'organi', 'mineral', 'analytiq', 'biochimi'],
-            'RO': ['optimis', 'recherche op', 'programm lineair', 'graph', 'math'],
-            'STAT_PROB': ['statistiq', 'probabilit', 'stochastiq', 'analyse', 'math'],
-            'MATH_FOND': ['algebre', 'analyse', 'topologi', 'geometri', 'math'],
-        }
-        keywords = FILIERE_KEYWORDS.get(filiere, [])
-        matiere_lower = matiere.lower()
-        return any(k in matiere_lower for k in keywords)
-
     def _get_popular_items(self, top_k, user_db_id=None):
         """Fallback : items populaires."""
         from apps.core.models import Epreuve, User
-        queryset = Epreuve.objects.filter(is_approved=True)
+        queryset = Epreuve.objects.filter(is_approved=True).defer(*candidates.DEFERRED_FIELDS)
         if user_db_id:
             try:
                 user = User.objects.get(id=user_db_id)
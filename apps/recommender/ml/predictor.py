@@ -4,11 +4,14 @@ Handles model loading and inference
 """
 import torch
 import pickle
+import time
 from pathlib import Path
 from django.conf import settings
-from django.core.cache import cache
+from apps.core import cache_tags, instrumentation, metrics
 from apps.core.models import Epreuve, Interaction
 from .ncf_model import NCFModel
+from . import candidates, latency, result_cache
+from .scoring import get_scoring_executor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,7 +45,8 @@ class NCFPredictor:
         self.mappings_path = mappings_path or self._get_default_mappings_path()
         
         # Cache settings
-        self.cache_timeout = 3600  # 1 hour
+        # Long TTL: freshness comes from tag invalidation (apps/core/cache_tags.py)
+        self.cache_timeout = getattr(settings, 'RECO_CACHE_TIMEOUT', 6 * 3600)
         self.cache_enabled = True
     
     def _get_default_model_path(self):
@@ -61,6 +65,8 @@ class NCFPredictor:
         if not self.model_path.exists():
             raise FileNotFoundError(f"Model not found at {self.model_path}")
         
+        start = time.perf_counter()
+
         # Load checkpoint
         checkpoint = torch.load(self.model_path, map_location=self.device)
         
@@ -85,6 +91,10 @@ class NCFPredictor:
         else:
             logger.warning(f"Mappings file not found at {self.mappings_path}")
         
+        # Exposed on /metrics: version = file name and modification time
+        version = f"{self.model_path.name}@{int(self.model_path.stat().st_mtime)}"
+        metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - start, engine='ncf')
+        metrics.MODEL_INFO.set(1, engine='ncf', version=version)
         logger.info(f"Model loaded successfully from {self.model_path}")
     
     def is_model_loaded(self):
@@ -122,7 +132,9 @@ class NCFPredictor:
         
         return score
     
-    def recommend_for_user(self, user_db_id, top_k=10, exclude_seen=True, filter_by_niveau=True):
+    @metrics.RECOMMENDATION_SECONDS.timed(engine='ncf', kind='personalized')
+    @instrumentation.timed('predictor')
+    def recommend_for_user(self, user_db_id, top_k=10, exclude_seen=True, filter_by_niveau=True, budget_ms=None):
         """
         Generate top-K recommendations for a user
         
@@ -131,17 +143,39 @@ class NCFPredictor:
             top_k (int): Number of recommendations to return
             exclude_seen (bool): Exclude items the user has already interacted with
             filter_by_niveau (bool): Filter recommendations by user's niveau
+            budget_ms (int, optional): Latency budget (default RECO_LATENCY_BUDGET_MS, 0 = unlimited)
         
         Returns:
-            list: List of tuples (epreuve_id, score, epreuve_obj)
+            latency.Recommendations: List of tuples (epreuve_id, score, epreuve_obj)
+            with the contributing sources ('model', 'popularity')
         """
+        deadline = latency.deadline_for(budget_ms)
         # Check cache first
-        cache_key = f"recommendations:user_{user_db_id}:k_{top_k}"
+        cache_key = cache_tags.tagged_key(
+            f"recommendations:user_{user_db_id}:k_{top_k}",
+            [cache_tags.MODELE, cache_tags.user_tag(user_db_id)],
+        )
         if self.cache_enabled:
-            cached_result = cache.get(cache_key)
+            # Degraded results are only served to callers that are themselves on a budget
+            cached_result = result_cache.load(cache_key, accept_degraded=deadline is not None)
             if cached_result is not None:
                 return cached_result
         
+        # Cache miss: identical concurrent requests (same budget) share a single computation
+        return get_scoring_executor().run(
+            f"{cache_key}:seen_{exclude_seen}:niveau_{filter_by_niveau}:budget_{latency.effective_budget_ms(budget_ms)}",
+            self._compute_for_user, cache_key, user_db_id, top_k, exclude_seen, filter_by_niveau, deadline,
+            fallback=lambda: self._popular_result(top_k, user_db_id, filter_by_niveau, complete=False),
+            timeout=latency.wait_timeout(deadline),
+        )
+    
+    def _popular_result(self, top_k, user_db_id, filter_by_niveau, complete=True):
+        return latency.Recommendations(
+            self._get_popular_items(top_k, user_db_id if filter_by_niveau else None),
+            sources=['popularity'], complete=complete,
+        )
+    
+    def _compute_for_user(self, cache_key, user_db_id, top_k, exclude_seen, filter_by_niveau, deadline=None):
         if not self.is_model_loaded():
             self.load_model()
         
@@ -149,33 +183,38 @@ class NCFPredictor:
         user_idx = self.user_id_to_idx.get(user_db_id)
         if user_idx is None:
             # New user - return popular items
-            return self._get_popular_items(top_k, user_db_id if filter_by_niveau else None)
-        
-        # Get all available items
-        all_item_indices = list(self.item_id_to_idx.values())
-        
-        # Get items to exclude
-        excluded_items = set()
+            return self._popular_result(top_k, user_db_id, filter_by_niveau)
+        
+        # Candidate generation (ml/candidates.py): only the pool is scored,
+        # already restricted to approved, unseen items at the user's niveau or below
+        from apps.core.models import User
+        user = User.objects.filter(id=user_db_id).first()
+        niveaux = candidates.allowed_niveaux(user) if filter_by_niveau else None
+        seen_ids = set()
         if exclude_seen:
-            seen_epreuves = Interaction.objects.filter(
-                user_id=user_db_id
-            ).values_list('epreuve_id', flat=True)
-            
-            excluded_items = {
-                self.item_id_to_idx.get(epreuve_id) 
-                for epreuve_id in seen_epreuves 
-                if self.item_id_to_idx.get(epreuve_id) is not None
-            }
+            seen_ids = set(
+                Interaction.objects.filter(user_id=user_db_id).values_list('epreuve_id', flat=True)
+            )
+        queryset = candidates.catalogue(niveaux, seen_ids)
+        if candidates.pool_size() and user is not None:
+            queryset = queryset.filter(id__in=list(candidates.generate(user, niveaux, seen_ids)))
         
-        # Filter items
-        candidate_items = [idx for idx in all_item_indices if idx not in excluded_items]
+        candidate_items = [
+            self.item_id_to_idx[epreuve_id]
+            for epreuve_id in queryset.values_list('id', flat=True)
+            if epreuve_id in self.item_id_to_idx
+        ]
         
         if not candidate_items:
             # All items seen, return popular unseen ones or just popular
-            return self._get_popular_items(top_k, user_db_id if filter_by_niveau else None)
+            return self._popular_result(top_k, user_db_id, filter_by_niveau)
+        
+        if latency.expired(deadline):
+            # Budget spent before inference (e.g. model loading): popular items only
+            return self._popular_result(top_k, user_db_id, filter_by_niveau, complete=False)
         
         # Make predictions
-        with torch.no_grad():
+        with torch.no_grad(), metrics.STRATEGY_SECONDS.time(engine='ncf', strategy='model'):
             user_tensor = torch.tensor([user_idx] * len(candidate_items), dtype=torch.long).to(self.device)
             item_tensor = torch.tensor(candidate_items, dtype=torch.long).to(self.device)
             
@@ -187,27 +226,24 @@ class NCFPredictor:
         # Get top-K
         k = min(top_k, len(predictions))
         top_scores, top_indices = torch.topk(predictions, k)
+        top = [
+            (self.idx_to_item_id.get(candidate_items[idx]), float(score))
+            for idx, score in zip(top_indices.cpu().numpy(), top_scores.cpu().numpy())
+        ]
+        epreuves = Epreuve.objects.defer(*candidates.DEFERRED_FIELDS).in_bulk(
+            [epreuve_id for epreuve_id, _ in top if epreuve_id]
+        )
         
         # Convert indices to database IDs
-        recommendations = []
-        for idx, score in zip(top_indices.cpu().numpy(), top_scores.cpu().numpy()):
-            item_idx = candidate_items[idx]
-            epreuve_id = self.idx_to_item_id.get(item_idx)
-            
-            if epreuve_id:
-                try:
-                    epreuve = Epreuve.objects.get(id=epreuve_id)
-                    
-                    # Filter by niveau if requested
-                    if filter_by_niveau:
-                        from apps.core.models import User
-                        user = User.objects.get(id=user_db_id)
-                        if user.niveau and epreuve.niveau > user.niveau:
-                            continue
-                    
-                    recommendations.append((epreuve_id, float(score), epreuve))
-                except Epreuve.DoesNotExist:
-                    continue
+        recommendations = latency.Recommendations(sources=['model'])
+        for epreuve_id, score in top:
+            if latency.expired(deadline):
+                # Deadline reached: the remaining slots are filled with popular items
+                recommendations.complete = False
+                break
+            epreuve = epreuves.get(epreuve_id)
+            if epreuve is not None:
+                recommendations.append((epreuve_id, score, epreuve))
         
         # If not enough recommendations, add popular items
         if len(recommendations) < top_k:
@@ -216,13 +252,19 @@ class NCFPredictor:
                 user_db_id if filter_by_niveau else None
             )
             recommendations.extend(popular)
+            recommendations.sources.append('popularity')
         
         # Cache results
         if self.cache_enabled:
-            cache.set(cache_key, recommendations, self.cache_timeout)
+            result_cache.store(
+                cache_key, recommendations, latency.cache_timeout(recommendations, self.cache_timeout)
+            )
         
-        return recommendations[:top_k]
+        del recommendations[top_k:]
+        return recommendations
     
+    @metrics.RECOMMENDATION_SECONDS.timed(engine='ncf', kind='similar')
+    @instrumentation.timed('predictor')
     def recommend_similar_items(self, item_db_id, top_k=10):
         """
         Find similar items based on embeddings
@@ -234,6 +276,13 @@ class NCFPredictor:
         Returns:
             list: List of similar epreuve IDs with similarity scores
         """
+        return get_scoring_executor().run(
+            f"recommendations:similar_{item_db_id}:k_{top_k}",
+            self._compute_similar, item_db_id, top_k,
+            fallback=lambda: [r for r in self._get_popular_items(top_k + 1) if r[0] != item_db_id][:top_k],
+        )
+    
+    def _compute_similar(self, item_db_id, top_k):
         if not self.is_model_loaded():
             self.load_model()
         
@@ -248,7 +297,7 @@ class NCFPredictor:
         all_item_indices = list(self.item_id_to_idx.values())
         similarities = []
         
-        with torch.no_grad():
+        with torch.no_grad(), metrics.STRATEGY_SECONDS.time(engine='ncf', strategy='embedding_similarity'):
             for idx in all_item_indices:
                 if idx == item_idx:
                     continue
@@ -272,13 +321,14 @@ class NCFPredictor:
             epreuve_id = self.idx_to_item_id.get(item_idx)
             if epreuve_id:
                 try:
-                    epreuve = Epreuve.objects.get(id=epreuve_id)
+                    epreuve = Epreuve.objects.defer(*candidates.DEFERRED_FIELDS).get(id=epreuve_id)
                     similar_items.append((epreuve_id, score, epreuve))
                 except Epreuve.DoesNotExist:
                     continue
         
         return similar_items
     
+    @metrics.STRATEGY_SECONDS.timed(engine='ncf', strategy='popularity')
     def _get_popular_items(self, top_k, user_db_id=None):
         """
         Get popular items as fallback
@@ -290,7 +340,7 @@ class NCFPredictor:
         Returns:
             list: List of popular epreuves
         """
-        queryset = Epreuve.objects.all()
+        queryset = Epreuve.objects.defer(*candidates.DEFERRED_FIELDS)
         
         # Filter by niveau if user provided
         if user_db_id:
@@ -322,11 +372,10 @@ class NCFPredictor:
         """
         if user_db_id:
             # Invalidate specific user's cache
-            cache_pattern = f"recommendations:user_{user_db_id}:*"
-            cache.delete_pattern(cache_pattern)
+            cache_tags.invalidate(cache_tags.user_tag(user_db_id))
         else:
             # Invalidate all recommendation caches
-            cache.delete_pattern("recommendations:*")
+            cache_tags.invalidate(cache_tags.MODELE)
         
         logger.info(f"Cache invalidated for user {user_db_id or 'all'}")
 
@@ -0,0 +1,280 @@
+"""
+Profils de préférences des utilisateurs (LitePredictor._content_based_recs).
+
+Pour chaque utilisateur, `ProfilPreferences` garde un poids par matière,
+catégorie de matière (apps/core/taxonomy.py), type d'épreuve et niveau : la
+somme des poids de ses interactions (INTERACTION_WEIGHTS), chacun divisé par
+deux toutes les RECO_PREFERENCE_HALF_LIFE_DAYS (0 = pas de décroissance).
+Une consultation d'hier compte ainsi plus qu'un téléchargement d'il y a six mois.
+
+Les poids sont exprimés à la date `reference` (dernière interaction) : une
+nouvelle interaction multiplie les poids existants par la décroissance écoulée
+depuis `reference` puis ajoute le sien. La décroissance jusqu'à la lecture est
+la même pour toutes les valeurs, et les scores sont normalisés par le maximum
+de chaque dimension : elle est donc sans effet et n'est pas appliquée.
+
+Mise à jour incrémentale (apps/recommender/signals.py) : chaque interaction
+validée met à jour la ligne de son utilisateur (quelques requêtes, quel que
+soit l'historique). Un utilisateur sans ligne est calculé depuis ses
+MAX_HISTORY dernières interactions à la première lecture, et la ligne est
+enregistrée même vide ; ses interactions d'ici là ne coûtent rien. Les
+interactions supprimées et les matières
+modifiées ne sont prises en compte qu'à la reconstruction
+(`manage.py rebuild_preferences`, suspendue par les imports en masse puis
+relancée par ceux-ci).
+
+Le coût d'une recommandation ne dépend plus de la longueur de l'historique :
+une lecture par clé primaire.
+
+Sans l'app recommender (PythonAnywhere : pas de table pour les profils), le
+profil est calculé à la lecture et gardé en cache jusqu'à la prochaine
+interaction de l'utilisateur.
+"""
+import heapq
+import logging
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from apps.core import cache_tags
+from apps.core.tiered_cache import get_tiered_cache
+
+logger = logging.getLogger(__name__)
+
+# ── Poids des signaux d'interaction (implicites + explicites) ──
+INTERACTION_WEIGHTS = {
+    'VIEW': 1.0,
+    'CLICK': 1.5,
+    'DOWNLOAD': 3.0,
+    'RATE': 4.0,
+    'COMMENT': 5.0,   # commenter = fort engagement
+    'BOOKMARK': 3.5,
+}
+
+# Dimensions du profil (champs de Epreuve)
+DIMENSIONS = ('matiere', 'categorie', 'type_epreuve', 'niveau')
+
+# Valeurs gardées par dimension, et poids en dessous duquel une valeur est oubliée
+MAX_VALUES = 30
+MIN_WEIGHT = 0.01
+
+# Interactions (les plus récentes) lues pour calculer un profil : borne le coût
+# d'un calcul pour les gros historiques, dont les plus anciennes pèsent peu
+MAX_HISTORY = 1000
+
+BATCH_SIZE = 1000
+
+
+def is_available():
+    """Vrai si l'app recommender (table des profils) est installée."""
+    return apps.is_installed('apps.recommender')
+
+
+def half_life_seconds():
+    return getattr(settings, 'RECO_PREFERENCE_HALF_LIFE_DAYS', 30) * 86400
+
+
+def decay(seconds):
+    """Facteur appliqué à un poids après `seconds` secondes."""
+    half_life = half_life_seconds()
+    if not half_life or seconds <= 0:
+        return 1.0
+    return 0.5 ** (seconds / half_life)
+
+
+class Profile:
+    """Poids {dimension: {valeur: poids}} d'un utilisateur, exprimés à la date `reference`."""
+
+    def __init__(self, poids=None, reference=None, nb_interactions=0):
+        poids = poids or {}
+        self.poids = {dimension: dict(poids.get(dimension, {})) for dimension in DIMENSIONS}
+        self.reference = reference
+        self.nb_interactions = nb_interactions
+
+    def __bool__(self):
+        return bool(self.poids['matiere'])
+
+    def add(self, values, action_type, timestamp):
+        """Ajoute une interaction (`values` : {dimension: valeur} de l'épreuve)."""
+        weight = INTERACTION_WEIGHTS.get(action_type, 1.0)
+        if self.reference is None or timestamp > self.reference:
+            if self.reference is not None:
+                factor = decay((timestamp - self.reference).total_seconds())
+                for scores in self.poids.values():
+                    for value in scores:
+                        scores[value] *= factor
+            self.reference = timestamp
+        else:
+            weight *= decay((self.reference - timestamp).total_seconds())
+        for dimension in DIMENSIONS:
+            value = values.get(dimension)
+            if value:
+                scores = self.poids[dimension]
+                scores[value] = scores.get(value, 0.0) + weight
+        self.nb_interactions += 1
+
+    def prune(self):
+        """Garde les MAX_VALUES valeurs les plus fortes de chaque dimension."""
+        for dimension, scores in self.poids.items():
+            kept = heapq.nlargest(MAX_VALUES, scores.items(), key=itemgetter(1))
+            self.poids[dimension] = {value: round(w, 6) for value, w in kept if w >= MIN_WEIGHT}
+        return self
+
+    def weights(self, dimension):
+        return self.poids[dimension]
+
+    def top(self, dimension, n):
+        """Les `n` valeurs de plus fort poids d'une dimension."""
+        scores = self.poids[dimension]
+        return heapq.nlargest(n, scores, key=scores.get)
+
+
+def _history(queryset):
+    """(user_id, action_type, timestamp, *dimensions), de la plus récente à la plus ancienne."""
+    return (
+        queryset.order_by('user_id', '-timestamp')
+        .values_list('user_id', 'action_type', 'timestamp', *[f'epreuve__{d}' for d in DIMENSIONS])
+    )
+
+
+def _build(rows):
+    profile = Profile()
+    for row in rows:
+        profile.add(dict(zip(DIMENSIONS, row[3:])), row[1], row[2])
+    return profile.prune()
+
+
+# ════════════════════════════════════════════════════════
+# Reconstruction
+# ════════════════════════════════════════════════════════
+
+def _save(user_id, profile):
+    from apps.recommender.models import ProfilPreferences
+
+    ProfilPreferences.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'poids': profile.poids,
+            'reference': profile.reference,
+            'nb_interactions': profile.nb_interactions,
+        },
+    )
+
+
+def compute(user_id):
+    """Profil d'un utilisateur calculé depuis ses MAX_HISTORY dernières interactions."""
+    from apps.core.models import Interaction
+
+    return _build(_history(Interaction.objects.filter(user_id=user_id))[:MAX_HISTORY])
+
+
+def rebuild(log=None):
+    """Recalcule les profils de tous les utilisateurs. Retourne le nombre de lignes."""
+    from apps.core.models import Interaction
+
+    log = log or (lambda message: None)
+    if not is_available():
+        log("Profils de préférences indisponibles (apps.recommender non installée)")
+        return 0
+
+    from apps.recommender.models import ProfilPreferences
+    log("Profils de préférences...")
+    history = _history(Interaction.objects.all()).iterator(chunk_size=BATCH_SIZE)
+    rows = []
+    for user_id, user_rows in groupby(history, key=itemgetter(0)):
+        profile = _build(islice(user_rows, MAX_HISTORY))
+        rows.append(ProfilPreferences(
+            user_id=user_id,
+            poids=profile.poids,
+            reference=profile.reference,
+            nb_interactions=profile.nb_interactions,
+        ))
+
+    with transaction.atomic():
+        ProfilPreferences.objects.all().delete()
+        ProfilPreferences.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+# ════════════════════════════════════════════════════════
+# Mise à jour incrémentale
+# ════════════════════════════════════════════════════════
+
+def record(user_id, epreuve_id, action_type, timestamp):
+    """
+    Ajoute une interaction au profil de l'utilisateur. Sans ligne, rien n'est
+    fait : le profil sera calculé à la prochaine lecture, interaction comprise.
+    """
+    from apps.core.models import Epreuve
+    from apps.recommender.models import ProfilPreferences
+
+    with transaction.atomic():
+        row = ProfilPreferences.objects.select_for_update().filter(pk=user_id).first()
+        if row is None:
+            return
+        values = Epreuve.objects.filter(pk=epreuve_id).values(*DIMENSIONS).first()
+        if values is None:
+            return
+        profile = Profile(row.poids, row.reference, row.nb_interactions)
+        profile.add(values, action_type, timestamp)
+        profile.prune()
+        row.poids = profile.poids
+        row.reference = profile.reference
+        row.nb_interactions = profile.nb_interactions
+        row.save(update_fields=['poids', 'reference', 'nb_interactions', 'updated_at'])
+
+
+def schedule(interaction):
+    """Met à jour le profil après validation de l'interaction."""
+    if not is_available():
+        return
+    user_id, epreuve_id = interaction.user_id, interaction.epreuve_id
+    action_type, timestamp = interaction.action_type, interaction.timestamp
+
+    def _record():
+        try:
+            record(user_id, epreuve_id, action_type, timestamp)
+        except Exception as e:
+            logger.error(f"Mise à jour du profil de préférences de {user_id} impossible : {e}")
+
+    transaction.on_commit(_record)
+
+
+# ════════════════════════════════════════════════════════
+# Lecture
+# ════════════════════════════════════════════════════════
+
+def _cache():
+    return get_tiered_cache('preferences', local_timeout=3600)
+
+
+def get_profile(user_id):
+    """
+    Profil d'un utilisateur, calculé et enregistré à la première demande (même
+    vide : un utilisateur sans interaction n'est pas recalculé à chaque appel).
+    """
+    if not is_available():
+        # Pas de table pour les profils : calcul gardé en cache jusqu'à la
+        # prochaine interaction de l'utilisateur
+        key = cache_tags.tagged_key(f"preferences:{user_id}", [cache_tags.user_tag(user_id)])
+        row = _cache().get(key)
+        if row is None:
+            profile = compute(user_id)
+            row = (profile.poids, profile.reference, profile.nb_interactions)
+            _cache().set(key, row, getattr(settings, 'RECO_CACHE_TIMEOUT', 3600))
+        return Profile(*row)
+
+    from apps.recommender.models import ProfilPreferences
+    row = (
+        ProfilPreferences.objects.filter(pk=user_id)
+        .values_list('poids', 'reference', 'nb_interactions')
+        .first()
+    )
+    if row is None:
+        profile = compute(user_id)
+        _save(user_id, profile)
+        return profile
+    return Profile(*row)
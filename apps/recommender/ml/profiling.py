@@ -0,0 +1,223 @@
+"""
+Profilage des stratégies du recommandeur léger (LitePredictor).
+
+Chaque stratégie de `_compute_for_user` (et la fusion) s'exécute dans
+`strategy(name)`, qui mesure :
+- la durée (horloge murale) ;
+- le nombre de requêtes SQL (execute_wrapper sur la connexion du thread de calcul) ;
+- le nombre de candidats produits.
+
+Activation :
+- RECO_PROFILING : tous les calculs (hors cache) sont profilés et agrégés ;
+- par requête : `?profile=1` (administrateurs, ou DEBUG) force un calcul
+  sans cache et renvoie le détail dans le champ `debug` de la réponse.
+
+Les agrégats par stratégie (totaux depuis le démarrage, percentiles sur les
+RECO_PROFILING_WINDOW derniers appels) sont servis par
+/api/recommendations/status/ : ils indiquent quelle stratégie optimiser ou
+abandonner.
+
+Budgets : RECO_STRATEGY_BUDGETS = {'collaborative': 200, ...} (ms). Une
+stratégie qui a consommé son budget s'arrête à la prochaine vérification
+(`out_of_time()` dans ses boucles) et rend les candidats déjà calculés ;
+l'appel est compté comme tronqué.
+"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+from apps.core import metrics
+
+_report = ContextVar('strategy_report', default=None)
+_deadline = ContextVar('strategy_deadline', default=None)
+
+
+def is_enabled():
+    return getattr(settings, 'RECO_PROFILING', False)
+
+
+def budget_ms(name):
+    return getattr(settings, 'RECO_STRATEGY_BUDGETS', {}).get(name)
+
+
+# ════════════════════════════════════════════════════════
+# Mesure d'un calcul
+# ════════════════════════════════════════════════════════
+
+class StrategyProbe:
+    """Mesures d'une stratégie pendant un calcul."""
+
+    __slots__ = ('name', 'seconds', 'queries', 'candidates', 'truncated')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.queries = 0
+        self.candidates = 0
+        self.truncated = False
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def as_dict(self):
+        return {
+            'ms': round(self.seconds * 1000, 1),
+            'queries': self.queries,
+            'candidates': self.candidates,
+            'budget_ms': budget_ms(self.name),
+            'truncated': self.truncated,
+        }
+
+
+class Report:
+    """Mesures de toutes les stratégies d'un calcul (champ `debug` des réponses)."""
+
+    def __init__(self):
+        self.probes = []
+
+    def as_dict(self):
+        return {
+            'strategies': {probe.name: probe.as_dict() for probe in self.probes},
+            'total_ms': round(sum(probe.seconds for probe in self.probes) * 1000, 1),
+            'total_queries': sum(probe.queries for probe in self.probes),
+        }
+
+
+@contextmanager
+def capture():
+    """Profile les calculs lancés dans le bloc (sans cache) ; rend le `Report`."""
+    report = Report()
+    token = _report.set(report)
+    try:
+        yield report
+    finally:
+        _report.reset(token)
+
+
+def requested_by(request):
+    """`?profile=1` : détail du calcul, réservé aux administrateurs (ou DEBUG)."""
+    if request.GET.get('profile', '').lower() not in ('1', 'true'):
+        return False
+    return settings.DEBUG or request.user.is_staff
+
+
+def requested():
+    """Vrai si l'appelant attend le détail du calcul (`capture()`)."""
+    return _report.get() is not None
+
+
+def out_of_time():
+    """Vrai si la stratégie en cours a consommé son budget."""
+    deadline = _deadline.get()
+    return deadline is not None and time.perf_counter() > deadline
+
+
+@contextmanager
+def strategy(name, deadline=None):
+    """
+    Exécute une stratégie sous son budget ; la mesure si le profilage est actif.
+
+    `deadline` : échéance de la recommandation entière (ml/latency.py), qui
+    borne aussi les boucles de la stratégie. Le bloc renseigne
+    `probe.candidates` avec le nombre de résultats.
+    """
+    budget = budget_ms(name)
+    start = time.perf_counter()
+    if budget:
+        deadline = min(deadline or math.inf, start + budget / 1000)
+    deadline_token = _deadline.set(deadline)
+    report = _report.get()
+    probe = StrategyProbe(name)
+    try:
+        if report is None and not is_enabled():
+            yield probe
+        else:
+            with connection.execute_wrapper(probe._count_query):
+                yield probe
+    finally:
+        _deadline.reset(deadline_token)
+        probe.seconds = time.perf_counter() - start
+        probe.truncated = bool(budget) and probe.seconds * 1000 > budget
+        if probe.truncated:
+            metrics.STRATEGY_TRUNCATED.inc(engine='lite', strategy=name)
+        if report is not None:
+            report.probes.append(probe)
+        if report is not None or is_enabled():
+            get_aggregator().add(probe)
+
+
+# ════════════════════════════════════════════════════════
+# Agrégation
+# ════════════════════════════════════════════════════════
+
+TOTAL_FIELDS = ('calls', 'truncated', 'seconds', 'queries', 'candidates')
+
+
+class Aggregator:
+    """Totaux cumulés et dernières durées par stratégie (ce processus)."""
+
+    def __init__(self, window=512):
+        self.window = window
+        self.totals = defaultdict(lambda: dict.fromkeys(TOTAL_FIELDS, 0))
+        self.recent = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def add(self, probe):
+        with self._lock:
+            totals = self.totals[probe.name]
+            totals['calls'] += 1
+            totals['truncated'] += probe.truncated
+            totals['seconds'] += probe.seconds
+            totals['queries'] += probe.queries
+            totals['candidates'] += probe.candidates
+            self.recent[probe.name].append(probe.seconds)
+
+    def summary(self):
+        with self._lock:
+            totals = {name: dict(values) for name, values in self.totals.items()}
+            recent = {name: sorted(values) for name, values in self.recent.items()}
+        strategies = {}
+        for name, values in sorted(totals.items()):
+            calls = values['calls']
+            durations = recent[name]
+            strategies[name] = {
+                'calls': calls,
+                'truncated': values['truncated'],
+                'mean_ms': round(values['seconds'] / calls * 1000, 1),
+                'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 1),
+                'max_ms': round(durations[-1] * 1000, 1),
+                'queries_mean': round(values['queries'] / calls, 1),
+                'candidates_mean': round(values['candidates'] / calls, 1),
+                'budget_ms': budget_ms(name),
+            }
+        return {'enabled': is_enabled(), 'since': self.started_at, 'strategies': strategies}
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.recent.clear()
+        self.started_at = time.time()
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = Aggregator(getattr(settings, 'RECO_PROFILING_WINDOW', 512))
+    return _aggregator
+
+
+def summary():
+    return get_aggregator().summary()
@@ -0,0 +1,57 @@
+"""
+Cache des résultats de recommandation au format compact.
+
+Un résultat `[(epreuve_id, score, Epreuve), ...]` est stocké sous forme de deux
+tableaux (ID, scores) dans le cache à deux niveaux ; les épreuves sont
+reconstruites à la lecture depuis leurs instantanés (apps/core/snapshots.py).
+Une entrée fait quelques centaines d'octets au lieu de plusieurs Ko par
+épreuve picklée (avec `texte_extrait`). La provenance (`latency.Recommendations` :
+sources, résultat complet ou dégradé) est stockée avec les tableaux.
+"""
+from array import array
+
+from apps.core import snapshots
+from apps.core.tiered_cache import get_tiered_cache
+
+from .latency import Recommendations
+
+
+def _cache():
+    # Les clés sont versionnées par tags : le L1 peut garder une entrée aussi
+    # longtemps que le L2 sans risque de servir un résultat invalidé
+    return get_tiered_cache('reco', local_timeout=3600)
+
+
+def encode(results):
+    return (
+        array('q', [epreuve_id for epreuve_id, _, _ in results]),
+        array('d', [score for _, score, _ in results]),
+        tuple(getattr(results, 'sources', ())),
+        getattr(results, 'complete', True),
+    )
+
+
+def load(key, accept_degraded=True):
+    """Résultat en cache reconstruit (`Recommendations`), ou None."""
+    entry = _cache().get(key)
+    if entry is None:
+        return None
+    # Entrées antérieures à la provenance : (ids, scores)
+    ids, scores, sources, complete = entry if len(entry) == 4 else (*entry, (), True)
+    if not complete and not accept_degraded:
+        return None
+    epreuves = snapshots.get_epreuves(ids)
+    return Recommendations(
+        (
+            (epreuve_id, score, epreuves[epreuve_id])
+            for epreuve_id, score in zip(ids, scores)
+            if epreuve_id in epreuves
+        ),
+        sources=sources,
+        complete=complete,
+    )
+
+
+def store(key, results, timeout):
+    _cache().set(key, encode(results), timeout)
+    snapshots.remember(ep for _, _, ep in results)
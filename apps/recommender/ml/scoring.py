@@ -0,0 +1,125 @@
+"""
+Exécuteur des calculs de recommandation.
+
+- Pool borné : au plus RECO_SCORING_WORKERS calculs en parallèle par processus.
+- Single-flight : les requêtes identiques simultanées (même utilisateur et même
+  top_k, ou même épreuve) partagent un seul calcul en cours. À l'expiration
+  d'une entrée de cache, une rafale de requêtes ne déclenche donc qu'un calcul.
+- Backpressure : au-delà de RECO_SCORING_MAX_PENDING calculs en attente, ou si
+  le résultat n'arrive pas en RECO_SCORING_TIMEOUT secondes, l'appelant reçoit
+  tout de suite la solution de repli (épreuves populaires). Un calcul expiré
+  continue en arrière-plan et remplit le cache pour les requêtes suivantes.
+"""
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    pass
+
+
+class ScoringExecutor:
+    """Pool de threads avec regroupement des calculs identiques (single-flight)."""
+
+    def __init__(self, max_workers=2, max_pending=8, timeout=10.0):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='reco-scoring')
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'computed': 0, 'coalesced': 0, 'rejected': 0, 'timeouts': 0}
+
+    def _call(self, func, args, kwargs):
+        self._local.in_worker = True
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            self._local.in_worker = False
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Soumet un calcul, ou rejoint le calcul identique déjà en cours.
+
+        Raises:
+            PoolSaturated: trop de calculs en attente
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future
+            if len(self._inflight) >= self.max_pending:
+                self.stats['rejected'] += 1
+                raise PoolSaturated(key)
+            # Contexte de la requête propagé (instrumentation : SQL compté pour elle)
+            future = self._pool.submit(contextvars.copy_context().run, self._call, func, args, kwargs)
+            self._inflight[key] = future
+            self.stats['computed'] += 1
+        future.add_done_callback(lambda f: self._release(key, f))
+        return future
+
+    def _release(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def run(self, key, func, *args, fallback=None, timeout=None, **kwargs):
+        """
+        Exécute `func` via le pool et attend son résultat.
+
+        `fallback` (sans argument) est appelé si le pool est saturé ou si le
+        calcul dépasse le délai (`timeout`, défaut RECO_SCORING_TIMEOUT) ;
+        sans fallback, l'exception est propagée.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        # Appel imbriqué depuis un thread du pool : pas de nouvelle soumission
+        if getattr(self._local, 'in_worker', False):
+            return func(*args, **kwargs)
+
+        try:
+            future = self.submit(key, func, *args, **kwargs)
+        except PoolSaturated:
+            if fallback is None:
+                raise
+            logger.warning(f"Pool de scoring saturé, repli pour {key}")
+            return fallback()
+
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            self.stats['timeouts'] += 1
+            if fallback is None:
+                raise
+            logger.warning(f"Calcul trop long ({timeout:.2f}s), repli pour {key}")
+            return fallback()
+
+    def pending(self):
+        with self._lock:
+            return len(self._inflight)
+
+
+# Singleton
+_executor_instance = None
+_executor_lock = threading.Lock()
+
+
+def get_scoring_executor():
+    global _executor_instance
+    with _executor_lock:
+        if _executor_instance is None:
+            _executor_instance = ScoringExecutor(
+                max_workers=getattr(settings, 'RECO_SCORING_WORKERS', 2),
+                max_pending=getattr(settings, 'RECO_SCORING_MAX_PENDING', 8),
+                timeout=getattr(settings, 'RECO_SCORING_TIMEOUT', 10.0),
+            )
+    return _executor_instance
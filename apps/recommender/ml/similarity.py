@@ -0,0 +1,445 @@
+"""
+Index de similarité épreuve → épreuves (LitePredictor.recommend_similar_items).
+
+Pour chaque épreuve approuvée, `EpreuveVoisins` garde ses TOP_N voisins
+[[id, score], ...] par score décroissant : un appel « épreuves similaires »
+est une lecture par clé primaire, les épreuves venant de leurs instantanés
+(apps/core/snapshots.py).
+
+Score d'un voisin j de l'épreuve i :
+  - métadonnées : même matière, niveau, type, année (METADATA_WEIGHTS) et
+    bonus qualité de j (pertinence moyenne > 3) ;
+  - co-occurrence : utilisateurs ayant interagi avec i et j, normalisé en
+    cosinus c_ij / sqrt(n_i · n_j) ;
+  - co-évaluation : utilisateurs ayant bien noté (≥ 4) i et j, même normalisation.
+
+Reconstruction en masse (`rebuild`, `manage.py rebuild_similarity`) : les
+co-occurrences sont le produit Xᵀ·X de la matrice creuse utilisateurs ×
+épreuves, calculé avec scipy.sparse s'il est installé (déploiements ML), sinon
+par comptage dans des dictionnaires (Render, PythonAnywhere). Les candidats
+d'une épreuve sont ses co-occurrences, les épreuves de même matière et les
+PROFILE_CANDIDATES mieux notées de même niveau et même type.
+
+Mise à jour incrémentale (apps/recommender/signals.py) : à la première
+interaction d'un utilisateur avec une épreuve, ou à une bonne évaluation, la
+ligne de l'épreuve est recalculée depuis la base et son score reporté dans les
+listes des autres épreuves de l'utilisateur. Le calcul (quelques centaines de
+ms pour une épreuve populaire) est fait hors requête par un thread dédié ; les
+demandes en attente pour une même épreuve sont regroupées. Une épreuve sans
+ligne est calculée à la première demande.
+
+Sans l'app recommender (PythonAnywhere : pas de table pour l'index), les
+voisins sont calculés à la demande et gardés en cache, sans mise à jour
+incrémentale.
+"""
+import heapq
+import logging
+import math
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+
+from apps.core import cache_tags
+from apps.core.tiered_cache import get_tiered_cache
+
+try:
+    from scipy import sparse
+except ImportError:  # scipy absent (déploiements légers) : comptage en Python
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+# Voisins gardés par épreuve (plafond de top_k pour les épreuves similaires)
+TOP_N = 50
+
+# Score minimal d'un voisin
+MIN_SCORE = 0.1
+
+METADATA_WEIGHTS = {
+    'matiere': 0.35,
+    'niveau': 0.15,
+    'type_epreuve': 0.1,
+    'annee_academique': 0.05,
+}
+CO_OCCURRENCE_WEIGHT = 0.3
+CO_EVALUATION_WEIGHT = 0.2
+QUALITY_WEIGHT = 0.1
+
+# Note de pertinence à partir de laquelle une évaluation compte comme « bien noté »
+GOOD_RATING = 4
+
+# Épreuves retenues par utilisateur : borne le coût en k² des gros historiques
+MAX_USER_ITEMS = 500
+
+# Épreuves de même niveau et même type (autre matière) considérées par épreuve
+PROFILE_CANDIDATES = 2 * TOP_N
+
+# Autres épreuves de l'utilisateur mises à jour après une interaction
+MAX_PATCHED = 50
+
+META_FIELDS = ('id', 'matiere', 'niveau', 'type_epreuve', 'annee_academique', 'note_moyenne_pertinence')
+
+BATCH_SIZE = 1000
+
+
+def is_available():
+    """Vrai si l'app recommender (table de l'index) est installée."""
+    return apps.is_installed('apps.recommender')
+
+
+# ════════════════════════════════════════════════════════
+# Score
+# ════════════════════════════════════════════════════════
+
+def _shared_score(meta_i, meta_j, co_occurrence, co_evaluation):
+    """Partie symétrique du score (tout sauf le bonus qualité du voisin)."""
+    score = 0.0
+    for position, field in enumerate(META_FIELDS[1:5], start=1):
+        if meta_i[position] == meta_j[position]:
+            score += METADATA_WEIGHTS[field]
+    return score + co_occurrence * CO_OCCURRENCE_WEIGHT + co_evaluation * CO_EVALUATION_WEIGHT
+
+
+def _quality(meta):
+    pertinence = meta[5]
+    if pertinence and pertinence > 3:
+        return (pertinence - 3) / 2 * QUALITY_WEIGHT
+    return 0.0
+
+
+def _cosine(count, degree_i, degree_j):
+    if not count or not degree_i or not degree_j:
+        return 0.0
+    return count / math.sqrt(degree_i * degree_j)
+
+
+def _neighbours(epreuve_id, candidates, metas, co_occurrences, degrees, co_evaluations, eval_degrees):
+    """TOP_N voisins [[id, score], ...] de `epreuve_id` parmi `candidates`."""
+    meta_i = metas[epreuve_id]
+    scored = []
+    for other_id in candidates:
+        meta_j = metas.get(other_id)
+        if other_id == epreuve_id or meta_j is None:
+            continue
+        score = _shared_score(
+            meta_i, meta_j,
+            _cosine(co_occurrences.get(other_id, 0), degrees.get(epreuve_id), degrees.get(other_id)),
+            _cosine(co_evaluations.get(other_id, 0), eval_degrees.get(epreuve_id), eval_degrees.get(other_id)),
+        ) + _quality(meta_j)
+        if score > MIN_SCORE:
+            scored.append((round(score, 4), other_id))
+    return [[other_id, score] for score, other_id in heapq.nlargest(TOP_N, scored)]
+
+
+# ════════════════════════════════════════════════════════
+# Reconstruction en masse
+# ════════════════════════════════════════════════════════
+
+def _items_by_user(queryset):
+    by_user = defaultdict(set)
+    for user_id, epreuve_id in queryset.order_by().values_list('user_id', 'epreuve_id').iterator(chunk_size=BATCH_SIZE):
+        items = by_user[user_id]
+        if len(items) < MAX_USER_ITEMS:
+            items.add(epreuve_id)
+    return by_user
+
+
+def cooccurrences(by_user):
+    """
+    Co-occurrences des épreuves : ({i: {j: c_ij}}, {i: n_i}).
+
+    Avec scipy : C = Xᵀ·X sur la matrice binaire utilisateurs × épreuves.
+    """
+    counts = defaultdict(dict)
+    degrees = defaultdict(int)
+    if sparse is not None:
+        item_ids = sorted({epreuve_id for items in by_user.values() for epreuve_id in items})
+        if not item_ids:
+            return counts, degrees
+        position = {epreuve_id: index for index, epreuve_id in enumerate(item_ids)}
+        rows, cols = [], []
+        for row, items in enumerate(by_user.values()):
+            rows.extend([row] * len(items))
+            cols.extend(position[epreuve_id] for epreuve_id in items)
+        matrix = sparse.csr_matrix(
+            ([1] * len(rows), (rows, cols)), shape=(len(by_user), len(item_ids)), dtype='int32',
+        )
+        product = (matrix.T @ matrix).tocsr()
+        for index, epreuve_id in enumerate(item_ids):
+            start, end = product.indptr[index], product.indptr[index + 1]
+            row_counts = counts[epreuve_id]
+            for other, count in zip(product.indices[start:end], product.data[start:end]):
+                if other == index:
+                    degrees[epreuve_id] = int(count)
+                else:
+                    row_counts[item_ids[other]] = int(count)
+        return counts, degrees
+
+    for items in by_user.values():
+        for epreuve_id in items:
+            degrees[epreuve_id] += 1
+        for i, j in combinations(items, 2):
+            counts[i][j] = counts[i].get(j, 0) + 1
+            counts[j][i] = counts[j].get(i, 0) + 1
+    return counts, degrees
+
+
+def rebuild(log=None):
+    """Recalcule les voisins de toutes les épreuves approuvées. Retourne le nombre de lignes."""
+    from apps.core.models import Epreuve, Evaluation, Interaction
+
+    log = log or (lambda message: None)
+    if not is_available():
+        log("Index de similarité indisponible (apps.recommender non installée)")
+        return 0
+
+    from apps.recommender.models import EpreuveVoisins
+    metas = {row[0]: row for row in Epreuve.objects.filter(is_approved=True).values_list(*META_FIELDS)}
+    by_matiere = defaultdict(list)
+    by_profile = defaultdict(list)
+    for meta in sorted(metas.values(), key=lambda meta: -(meta[5] or 0)):
+        by_matiere[meta[1]].append(meta[0])
+        profile = by_profile[(meta[2], meta[3])]
+        if len(profile) < PROFILE_CANDIDATES:
+            profile.append(meta[0])
+
+    log(f"Co-occurrences ({'scipy.sparse' if sparse is not None else 'Python'})...")
+    co_occurrences, degrees = cooccurrences(_items_by_user(Interaction.objects.all()))
+    co_evaluations, eval_degrees = cooccurrences(
+        _items_by_user(Evaluation.objects.filter(note_pertinence__gte=GOOD_RATING))
+    )
+
+    log(f"Voisins de {len(metas)} épreuves...")
+    rows = []
+    for epreuve_id, meta in metas.items():
+        candidates = set(co_occurrences.get(epreuve_id, ())) | set(co_evaluations.get(epreuve_id, ()))
+        candidates.update(by_matiere[meta[1]])
+        candidates.update(by_profile[(meta[2], meta[3])])
+        rows.append(EpreuveVoisins(
+            epreuve_id=epreuve_id,
+            voisins=_neighbours(
+                epreuve_id, candidates, metas,
+                co_occurrences.get(epreuve_id, {}), degrees,
+                co_evaluations.get(epreuve_id, {}), eval_degrees,
+            ),
+        ))
+
+    with transaction.atomic():
+        EpreuveVoisins.objects.all().delete()
+        EpreuveVoisins.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+# ════════════════════════════════════════════════════════
+# Mise à jour incrémentale
+# ════════════════════════════════════════════════════════
+
+def _counts_with(model_queryset, epreuve_id):
+    """Co-occurrences de `epreuve_id` et degrés des épreuves concernées, en trois requêtes."""
+    users = model_queryset.filter(epreuve_id=epreuve_id).values('user_id')
+    co_occurrences = dict(
+        model_queryset.filter(user_id__in=users)
+        .exclude(epreuve_id=epreuve_id)
+        .values('epreuve_id')
+        .annotate(count=Count('user_id', distinct=True))
+        .values_list('epreuve_id', 'count')
+    )
+    degrees = dict(
+        model_queryset.filter(epreuve_id__in=[epreuve_id, *co_occurrences])
+        .values('epreuve_id')
+        .annotate(count=Count('user_id', distinct=True))
+        .values_list('epreuve_id', 'count')
+    )
+    return co_occurrences, degrees
+
+
+def _compute(epreuve_id):
+    """
+    Voisins d'une épreuve calculés depuis la base.
+
+    Returns:
+        tuple: (métadonnées de l'épreuve, voisins [[id, score], ...],
+        {voisin: partie symétrique du score}), ou None si l'épreuve n'est pas
+        (ou plus) approuvée
+    """
+    from apps.core.models import Epreuve, Evaluation, Interaction
+
+    meta_i = Epreuve.objects.filter(pk=epreuve_id, is_approved=True).values_list(*META_FIELDS).first()
+    if meta_i is None:
+        return None
+
+    co_occurrences, degrees = _counts_with(Interaction.objects.all(), epreuve_id)
+    co_evaluations, eval_degrees = _counts_with(
+        Evaluation.objects.filter(note_pertinence__gte=GOOD_RATING), epreuve_id,
+    )
+    approved = Epreuve.objects.filter(is_approved=True)
+    # Liste évaluée : MySQL refuse LIMIT dans une sous-requête IN
+    profile_ids = list(
+        approved.filter(niveau=meta_i[2], type_epreuve=meta_i[3])
+        .order_by('-note_moyenne_pertinence')
+        .values_list('id', flat=True)[:PROFILE_CANDIDATES]
+    )
+    metas = {
+        row[0]: row for row in
+        approved.filter(
+            Q(matiere=meta_i[1]) | Q(id__in=[*co_occurrences, *co_evaluations]) | Q(id__in=profile_ids)
+        )
+        .values_list(*META_FIELDS)
+    }
+    metas[epreuve_id] = meta_i
+
+    voisins = _neighbours(epreuve_id, metas, metas, co_occurrences, degrees, co_evaluations, eval_degrees)
+    shared = {
+        other_id: _shared_score(
+            meta_i, metas[other_id],
+            _cosine(co_occurrences.get(other_id, 0), degrees.get(epreuve_id), degrees.get(other_id)),
+            _cosine(co_evaluations.get(other_id, 0), eval_degrees.get(epreuve_id), eval_degrees.get(other_id)),
+        )
+        for other_id in metas if other_id != epreuve_id
+    }
+    return meta_i, voisins, shared
+
+
+def update_epreuve(epreuve_id):
+    """
+    Recalcule et enregistre la ligne d'une épreuve.
+
+    Returns:
+        tuple: (métadonnées de l'épreuve, {voisin: partie symétrique du score}),
+        ou None si l'épreuve n'est pas (ou plus) approuvée
+    """
+    from apps.recommender.models import EpreuveVoisins
+
+    result = _compute(epreuve_id)
+    if result is None:
+        EpreuveVoisins.objects.filter(epreuve_id=epreuve_id).delete()
+        return None
+    meta_i, voisins, shared = result
+    EpreuveVoisins.objects.update_or_create(epreuve_id=epreuve_id, defaults={'voisins': voisins})
+    return meta_i, shared
+
+
+def _patch_user_items(user_id, epreuve_id, meta_i, shared):
+    """Reporte le nouveau score de `epreuve_id` dans les listes des autres épreuves de l'utilisateur."""
+    from apps.core.models import Interaction
+    from apps.recommender.models import EpreuveVoisins
+
+    quality = _quality(meta_i)
+    others = list(
+        Interaction.objects.filter(user_id=user_id)
+        .exclude(epreuve_id=epreuve_id)
+        .order_by('-timestamp')
+        .values_list('epreuve_id', flat=True)[:MAX_PATCHED * 4]
+    )
+    others = list(dict.fromkeys(others))[:MAX_PATCHED]
+    rows = list(EpreuveVoisins.objects.filter(epreuve_id__in=others))
+    for row in rows:
+        voisins = [pair for pair in row.voisins if pair[0] != epreuve_id]
+        score = shared.get(row.epreuve_id, 0.0) + quality
+        if score > MIN_SCORE:
+            voisins.append([epreuve_id, round(score, 4)])
+            voisins.sort(key=lambda pair: pair[1], reverse=True)
+        row.voisins = voisins[:TOP_N]
+    EpreuveVoisins.objects.bulk_update(rows, ['voisins'], batch_size=BATCH_SIZE)
+
+
+def record_pair(epreuve_id, user_ids=()):
+    """
+    Nouvelle(s) paire(s) utilisateur–épreuve : recalcule la ligne de l'épreuve
+    et reporte son score dans les listes des autres épreuves des utilisateurs.
+    """
+    result = update_epreuve(epreuve_id)
+    if result is None:
+        return
+    for user_id in user_ids:
+        _patch_user_items(user_id, epreuve_id, *result)
+
+
+# ── Exécution hors requête ──
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# epreuve_id → utilisateurs à reporter, en attente du thread de mise à jour
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similarity-index')
+    return _executor
+
+
+def _process_in_worker(epreuve_id):
+    with _pending_lock:
+        user_ids = _pending.pop(epreuve_id, set())
+    close_old_connections()
+    try:
+        record_pair(epreuve_id, user_ids)
+    finally:
+        close_old_connections()
+
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Mise à jour de l'index de similarité impossible : {error}")
+
+
+def schedule(epreuve_id, user_id=None):
+    """Met à jour l'index pour `epreuve_id` (et la paire avec `user_id`) après validation."""
+    if not is_available():
+        return
+
+    def _submit():
+        with _pending_lock:
+            queued = epreuve_id in _pending
+            user_ids = _pending.setdefault(epreuve_id, set())
+            if user_id is not None:
+                user_ids.add(user_id)
+        if not queued:
+            get_executor().submit(_process_in_worker, epreuve_id).add_done_callback(_log_failure)
+
+    transaction.on_commit(_submit)
+
+
+# ════════════════════════════════════════════════════════
+# Lecture
+# ════════════════════════════════════════════════════════
+
+def _cache():
+    return get_tiered_cache('similarity', local_timeout=3600)
+
+
+def get_neighbours(epreuve_id):
+    """Voisins [[id, score], ...] d'une épreuve (calculés à la première demande)."""
+    if not is_available():
+        # Pas de table pour l'index : voisins calculés à la demande, gardés en
+        # cache jusqu'à la prochaine modification du catalogue
+        key = cache_tags.tagged_key(
+            f"similarity:{epreuve_id}", [cache_tags.MODELE, cache_tags.epreuve_tag(epreuve_id)],
+        )
+        voisins = _cache().get(key)
+        if voisins is None:
+            result = _compute(epreuve_id)
+            voisins = result[1] if result is not None else []
+            _cache().set(key, voisins, getattr(settings, 'RECO_CACHE_TIMEOUT', 3600))
+        return voisins
+
+    from apps.recommender.models import EpreuveVoisins
+
+    voisins = EpreuveVoisins.objects.filter(pk=epreuve_id).values_list('voisins', flat=True).first()
+    if voisins is None:
+        if update_epreuve(epreuve_id) is None:
+            return []
+        voisins = EpreuveVoisins.objects.filter(pk=epreuve_id).values_list('voisins', flat=True).first()
+    return voisins
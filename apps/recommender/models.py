@@ -50,3 +50,55 @@ class TrainingLog(models.Model):
     
     def __str__(self):
         return f"{self.model_version.version} - {self.training_date.strftime('%Y-%m-%d %H:%M')} (RMSE: {self.rmse:.3f})"
+
+
+class EpreuveVoisins(models.Model):
+    """
+    Épreuves les plus similaires à une épreuve : [[id, score], ...] par score décroissant.
+    Maintenu par `apps.recommender.ml.similarity` ; reconstruit par `manage.py rebuild_similarity`.
+    """
+    epreuve = models.OneToOneField(
+        'core.Epreuve',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='voisins'
+    )
+    voisins = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Voisins d\'une epreuve'
+        verbose_name_plural = 'Voisins des epreuves'
+    
+    def __str__(self):
+        return f"Voisins {self.epreuve_id} ({len(self.voisins)})"
+
+
+class ProfilPreferences(models.Model):
+    """
+    Préférences d'un utilisateur avec décroissance exponentielle :
+    {dimension: {valeur: poids}} pour la matière, la catégorie, le type et le niveau,
+    poids exprimés à la date `reference`.
+    Maintenu par `apps.recommender.ml.preferences` ; reconstruit par `manage.py rebuild_preferences`.
+    """
+    user = models.OneToOneField(
+        'core.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='preferences'
+    )
+    poids = models.JSONField(default=dict)
+    reference = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Date à laquelle les poids sont exprimés (vide : aucune interaction)"
+    )
+    nb_interactions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Preferences d\'un utilisateur'
+        verbose_name_plural = 'Preferences des utilisateurs'
+    
+    def __str__(self):
+        return f"Preferences {self.user_id} ({self.nb_interactions} interactions)"
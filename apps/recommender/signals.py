@@ -0,0 +1,52 @@
+"""
+Signaux du recommandeur : mise à jour incrémentale de l'index de similarité
+(apps/recommender/ml/similarity.py, hors requête) et des profils de préférences
+(apps/recommender/ml/preferences.py), après validation.
+Suspendus pendant les imports en masse (`derived_updates_suspended`), qui
+reconstruisent index et profils ensuite.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.core.models import Epreuve, Evaluation, Interaction
+from apps.core.signals import updates_suspended
+
+from .ml import preferences, similarity
+
+# Champs de `Epreuve` qui entrent dans le score de similarité
+SIMILARITY_FIELDS = ('matiere', 'niveau', 'type_epreuve', 'annee_academique', 'is_approved')
+
+
+@receiver(post_save, sender=Interaction)
+def update_similarity_on_interaction(sender, instance, created, **kwargs):
+    """Seule la première interaction d'un utilisateur avec une épreuve change les co-occurrences."""
+    if not created or updates_suspended():
+        return
+    if Interaction.objects.filter(
+        user_id=instance.user_id, epreuve_id=instance.epreuve_id,
+    ).exclude(pk=instance.pk).exists():
+        return
+    similarity.schedule(instance.epreuve_id, instance.user_id)
+
+
+@receiver(post_save, sender=Interaction)
+def update_preferences_on_interaction(sender, instance, created, **kwargs):
+    if not created or updates_suspended():
+        return
+    preferences.schedule(instance)
+
+
+@receiver(post_save, sender=Evaluation)
+def update_similarity_on_evaluation(sender, instance, **kwargs):
+    if updates_suspended() or instance.note_pertinence < similarity.GOOD_RATING:
+        return
+    similarity.schedule(instance.epreuve_id, instance.user_id)
+
+
+@receiver(post_save, sender=Epreuve)
+def update_similarity_on_epreuve(sender, instance, update_fields=None, **kwargs):
+    if updates_suspended():
+        return
+    if update_fields is not None and not set(update_fields) & set(SIMILARITY_FIELDS):
+        return
+    similarity.schedule(instance.pk)
@@ -28,6 +28,12 @@ python manage.py collectstatic --noinput
 echo "==> Application des migrations..."
 python manage.py migrate
 
+echo "==> Table de cache partagée (tags d'invalidation)..."
+python manage.py createcachetable
+
+echo "==> Index de recherche plein texte..."
+python manage.py rebuild_search_index
+
 echo "==> Création du superuser (si inexistant)..."
 python manage.py create_superuser_auto
 
@@ -46,4 +52,7 @@ else:
     print(f'   {Epreuve.objects.count()} épreuves existantes, pas de génération.')
 "
 
+echo "==> Compteurs du tableau de bord..."
+python manage.py reconcile_stats
+
 echo "==> Build terminé !"
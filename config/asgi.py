@@ -0,0 +1,8 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Sous ASGI, les vues de lecture les plus sollicitées passent en asynchrone
+os.environ.setdefault('SERVE_ASGI', 'True')
+
+application = get_asgi_application()
@@ -122,7 +122,53 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Upload settings
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
+# Au-delà, les fichiers uploadés sont écrits sur disque au lieu de rester en RAM
+# (les PDF d'épreuves passent toujours par HashingPDFUploadHandler, sur disque)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5 MB (valeur par défaut de Django)
+
+# Extraction des PDF (pages, texte) en arrière-plan
+PDF_EXTRACTION_ASYNC = env.bool('PDF_EXTRACTION_ASYNC', default=True)
+PDF_EXTRACTION_WORKERS = env.int('PDF_EXTRACTION_WORKERS', default=1)
+
+# Téléchargement des PDF : '' (servi par Django), 'x-accel-redirect' (nginx)
+# ou 'x-sendfile' (Apache/lighttpd). Avec nginx, DOWNLOAD_ACCEL_PREFIX doit
+# correspondre à une location `internal` dont l'alias est MEDIA_ROOT.
+DOWNLOAD_OFFLOAD = env('DOWNLOAD_OFFLOAD', default='')
+DOWNLOAD_ACCEL_PREFIX = env('DOWNLOAD_ACCEL_PREFIX', default='/protected-media/')
+DOWNLOAD_STATS_ASYNC = env.bool('DOWNLOAD_STATS_ASYNC', default=True)
+
+# Export en flux (apps/core/exports.py) : lignes lues par lot depuis la base
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=2000)
+
+# Mode ASGI (config/asgi.py) : vues asynchrones pour les recommandations, les
+# listes populaires/récentes et les statistiques. Le calcul des scores passe
+# par un pool de ASYNC_SCORING_WORKERS threads.
+SERVE_ASGI = env.bool('SERVE_ASGI', default=False)
+ASYNC_SCORING_WORKERS = env.int('ASYNC_SCORING_WORKERS', default=2)
+
+# Instrumentation des requêtes (apps/core/instrumentation.py) : SQL, caches,
+# prédicteurs et latence par vue, résumés dans les logs et /api/admin/metrics/.
+# Budget SQL par requête : INSTRUMENTATION_QUERY_BUDGET, ou par nom de vue.
+INSTRUMENTATION_ENABLED = env.bool('INSTRUMENTATION_ENABLED', default=False)
+INSTRUMENTATION_BUFFER_SIZE = env.int('INSTRUMENTATION_BUFFER_SIZE', default=2048)
+INSTRUMENTATION_LOG_INTERVAL = env.int('INSTRUMENTATION_LOG_INTERVAL', default=300)
+INSTRUMENTATION_QUERY_BUDGET = env.int('INSTRUMENTATION_QUERY_BUDGET', default=25)
+INSTRUMENTATION_QUERY_BUDGETS = {
+    'epreuve-list': 10,
+    'epreuve-detail': 10,
+}
+INSTRUMENTATION_SLOW_MS = env.int('INSTRUMENTATION_SLOW_MS', default=1000)
+INSTRUMENTATION_HEADERS = env.bool('INSTRUMENTATION_HEADERS', default=True)
+if INSTRUMENTATION_ENABLED:
+    # En tête de chaîne : la latence mesurée inclut les autres middlewares
+    MIDDLEWARE.insert(0, 'apps.core.instrumentation.InstrumentationMiddleware')
+
+# Métriques Prometheus (/metrics, apps/core/metrics.py). METRICS_DIR : dossier
+# partagé où chaque worker écrit ses compteurs (agrégation entre workers).
+# METRICS_TOKEN : jeton Bearer du collecteur (sinon administrateurs, ou tous en DEBUG).
+METRICS_DIR = env('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.int('METRICS_FLUSH_INTERVAL', default=10)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -164,3 +210,42 @@ SIMPLE_JWT = {
 ML_MODEL_PATH = env('MODEL_PATH', default='ml_models/ncf_model_latest.pth')
 EMBEDDING_DIM = env.int('EMBEDDING_DIM', default=64)
 BATCH_SIZE = env.int('BATCH_SIZE', default=256)
+
+# Calcul des recommandations : pool borné, regroupement des requêtes identiques
+# et repli sur les épreuves populaires en cas de saturation (ml/scoring.py)
+RECO_SCORING_WORKERS = env.int('RECO_SCORING_WORKERS', default=2)
+RECO_SCORING_MAX_PENDING = env.int('RECO_SCORING_MAX_PENDING', default=8)
+RECO_SCORING_TIMEOUT = env.float('RECO_SCORING_TIMEOUT', default=10.0)
+
+# Budget de latence des recommandations personnalisées (ml/latency.py), surchargé
+# par le paramètre ?budget_ms= (0 = illimité) : à l'échéance, les stratégies non
+# terminées sont écartées et la réponse le signale (`sources`, `degraded`).
+RECO_LATENCY_BUDGET_MS = env.int('RECO_LATENCY_BUDGET_MS', default=2000)
+RECO_LATENCY_GRACE_MS = env.int('RECO_LATENCY_GRACE_MS', default=100)
+RECO_DEGRADED_CACHE_TIMEOUT = env.int('RECO_DEGRADED_CACHE_TIMEOUT', default=60)
+
+# Profilage des stratégies du recommandeur léger (ml/profiling.py) : durée,
+# requêtes SQL et candidats par stratégie, agrégés dans /api/recommendations/status/.
+# Budgets en ms par stratégie, ex. RECO_STRATEGY_BUDGETS="collaborative=200;evaluation=300" :
+# une stratégie au-delà de son budget rend les candidats déjà calculés.
+RECO_PROFILING = env.bool('RECO_PROFILING', default=False)
+RECO_PROFILING_WINDOW = env.int('RECO_PROFILING_WINDOW', default=512)
+RECO_STRATEGY_BUDGETS = env.dict('RECO_STRATEGY_BUDGETS', cast={'value': int}, default={})
+
+# Génération de candidats (ml/candidates.py) : les stratégies et le modèle NCF
+# ne notent qu'un pool d'au plus RECO_CANDIDATE_POOL_SIZE épreuves (0 = tout le catalogue)
+RECO_CANDIDATE_POOL_SIZE = env.int('RECO_CANDIDATE_POOL_SIZE', default=300)
+
+# Profils de préférences (ml/preferences.py) : le poids d'une interaction est
+# divisé par deux tous les RECO_PREFERENCE_HALF_LIFE_DAYS jours (0 = jamais)
+RECO_PREFERENCE_HALF_LIFE_DAYS = env.float('RECO_PREFERENCE_HALF_LIFE_DAYS', default=30)
+
+# Cache des recommandations : TTL long, invalidé par générations de tags
+# (apps/core/cache_tags.py). Les générations sont lues dans CACHE_TAGS_ALIAS.
+RECO_CACHE_TIMEOUT = env.int('RECO_CACHE_TIMEOUT', default=6 * 3600)
+CACHE_TAGS_ALIAS = 'default'
+
+# Cache à deux niveaux (apps/core/tiered_cache.py) : LRU local de
+# TIERED_CACHE_LOCAL_BYTES octets par cache nommé devant TIERED_CACHE_ALIAS
+TIERED_CACHE_ALIAS = 'default'
+TIERED_CACHE_LOCAL_BYTES = env.int('TIERED_CACHE_LOCAL_BYTES', default=4 * 1024 * 1024)
@@ -29,14 +29,30 @@ DATABASES = {
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Cache partagé entre les workers gunicorn (LocMemCache est propre à chaque
+    # processus) : générations des tags d'invalidation et niveau L2 du cache
+    # des recommandations. Table créée par build.sh.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_tags',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
+CACHE_TAGS_ALIAS = 'shared'
+TIERED_CACHE_ALIAS = 'shared'
+
+# Métriques /metrics additionnées entre les workers gunicorn
+METRICS_DIR = env('METRICS_DIR', default='/tmp/banque_metrics')
 
 # ── Sessions en BDD ────────────────────────────────────
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
 # ── WhiteNoise pour fichiers statiques ──────────────────
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+)
 
 # ── Storage : Cloudinary pour les PDFs si configuré, sinon FileSystem ──
 _CLOUDINARY_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME', '')
@@ -117,5 +133,11 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': False,
         },
+        # Résumés périodiques de l'instrumentation (INSTRUMENTATION_ENABLED)
+        'apps.core.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
@@ -5,6 +5,8 @@ from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from apps.core.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     
@@ -17,6 +19,9 @@ urlpatterns = [
     path('api/', include('apps.core.urls')),
     path('api/recommendations/', include('apps.recommender.api.urls')),
     
+    # Métriques Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
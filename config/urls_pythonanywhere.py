@@ -10,6 +10,8 @@ from django.views.generic import TemplateView, RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
+from apps.core.views import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
@@ -24,6 +26,9 @@ urlpatterns = [
     # Recommandations (version légère, sans PyTorch)
     path('api/recommendations/', include('apps.recommender.api.urls_lite')),
 
+    # Métriques Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
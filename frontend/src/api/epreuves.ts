@@ -1,5 +1,5 @@
 import apiClient from './client'
-import type { Epreuve, PaginatedResponse } from '@/types'
+import type { Epreuve, PaginatedResponse, CursorPaginatedResponse } from '@/types'
 
 interface EpreuvesParams {
   page?: number
@@ -11,12 +11,34 @@ interface EpreuvesParams {
   ordering?: string
 }
 
+interface EpreuvesCursorParams extends Omit<EpreuvesParams, 'page'> {
+  cursor?: string
+  page_size?: number
+  with_count?: boolean
+}
+
 export const epreuvesAPI = {
   getEpreuves: async (params: EpreuvesParams = {}): Promise<PaginatedResponse<Epreuve>> => {
     const response = await apiClient.get<PaginatedResponse<Epreuve>>('/epreuves/', { params })
     return response.data
   },
 
+  // Défilement infini : pagination keyset, coût constant quelle que soit la profondeur
+  getEpreuvesCursor: async (
+    { cursor = '', with_count, ...params }: EpreuvesCursorParams = {}
+  ): Promise<CursorPaginatedResponse<Epreuve>> => {
+    const response = await apiClient.get<CursorPaginatedResponse<Epreuve>>('/epreuves/', {
+      params: { ...params, cursor, ...(with_count ? { with_count: 1 } : {}) },
+    })
+    return response.data
+  },
+
+  // Curseur de la page suivante, extrait de l'URL `next` (undefined en fin de liste)
+  nextCursor: (response: CursorPaginatedResponse<Epreuve>): string | undefined => {
+    if (!response.next) return undefined
+    return new URL(response.next, window.location.origin).searchParams.get('cursor') ?? undefined
+  },
+
   getEpreuve: async (id: number): Promise<Epreuve> => {
     const response = await apiClient.get<Epreuve>(`/epreuves/${id}/`)
     return response.data
@@ -122,7 +122,7 @@ const AdminPage = () => {
   const handleExport = async (format: 'json' | 'csv') => {
     setIsExporting(true)
     try {
-      const response = await apiClient.get(`/admin/export-data/?format=${format}`, {
+      const response = await apiClient.get(`/admin/export-data/?export_format=${format}`, {
         responseType: 'blob',
       })
       const blob = new Blob([response.data])
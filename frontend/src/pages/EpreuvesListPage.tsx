@@ -1,5 +1,5 @@
-import { useState } from 'react'
-import { useQuery } from '@tanstack/react-query'
+import { useEffect, useRef, useState } from 'react'
+import { useInfiniteQuery } from '@tanstack/react-query'
 import { Link } from 'react-router-dom'
 import { epreuvesAPI } from '@/api/epreuves'
 import { FaSearch, FaFilter } from 'react-icons/fa'
@@ -13,29 +13,56 @@ const isNew = (dateStr: string) => {
 }
 
 const EpreuvesListPage = () => {
-  const [page, setPage] = useState(1)
   const [search, setSearch] = useState('')
   const [filters, setFilters] = useState({
     matiere: '',
     niveau: '',
     type_epreuve: '',
     annee_academique: '',
-    ordering: '-created_at',
+    // Vide : tri par défaut du backend (pertinence pendant une recherche, sinon plus récents)
+    ordering: '',
   })
 
-  const { data: epreuvesData, isLoading } = useQuery({
-    queryKey: ['epreuves', page, search, filters],
-    queryFn: () =>
-      epreuvesAPI.getEpreuves({
-        page,
+  // Pagination keyset : chaque page suit le curseur `next` de la précédente,
+  // le total n'est demandé qu'avec la première
+  const {
+    data,
+    isLoading,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ['epreuves', 'cursor', search, filters],
+    queryFn: ({ pageParam }) =>
+      epreuvesAPI.getEpreuvesCursor({
+        cursor: pageParam,
+        with_count: pageParam === '',
         search,
         ...Object.fromEntries(Object.entries(filters).filter(([_, v]) => v !== '')),
       }),
+    initialPageParam: '',
+    getNextPageParam: (lastPage) => epreuvesAPI.nextCursor(lastPage),
   })
 
+  const epreuves = data?.pages.flatMap((p) => p.results) ?? []
+  const count = data?.pages[0]?.count ?? epreuves.length
+
+  // Défilement infini : charge la page suivante quand la fin de la liste devient visible
+  const sentinelRef = useRef<HTMLDivElement>(null)
+  useEffect(() => {
+    const sentinel = sentinelRef.current
+    if (!sentinel || !hasNextPage) return
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting && !isFetchingNextPage) {
+        fetchNextPage()
+      }
+    }, { rootMargin: '200px' })
+    observer.observe(sentinel)
+    return () => observer.disconnect()
+  }, [hasNextPage, isFetchingNextPage, fetchNextPage])
+
   const handleFilterChange = (key: string, value: string) => {
     setFilters((prev) => ({ ...prev, [key]: value }))
-    setPage(1)
   }
 
   return (
@@ -53,10 +80,7 @@ const EpreuvesListPage = () => {
                 type="text"
                 placeholder="Rechercher..."
                 value={search}
-                onChange={(e) => {
-                  setSearch(e.target.value)
-                  setPage(1)
-                }}
+                onChange={(e) => setSearch(e.target.value)}
                 className="input-field pl-10"
               />
             </div>
@@ -101,10 +125,11 @@ const EpreuvesListPage = () => {
 
           {/* Sort */}
           <select
-            value={filters.ordering}
+            value={filters.ordering || (search ? '' : '-created_at')}
             onChange={(e) => handleFilterChange('ordering', e.target.value)}
             className="input-field"
           >
+            {search && <option value="">Pertinence</option>}
             <option value="-created_at">Plus récents</option>
             <option value="created_at">Plus anciens</option>
             <option value="-nb_vues">Plus vus</option>
@@ -122,12 +147,12 @@ const EpreuvesListPage = () => {
         <>
           <div className="flex items-center justify-between">
             <p className="text-gray-600">
-              {epreuvesData?.count || 0} épreuve(s) trouvée(s)
+              {count} épreuve(s) trouvée(s)
             </p>
           </div>
 
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
-            {epreuvesData?.results.map((epreuve) => (
+            {epreuves.map((epreuve) => (
               <div key={epreuve.id} className="card hover:shadow-lg transition-shadow relative">
                 {/* Badge Nouveau */}
                 {isNew(epreuve.created_at) && (
@@ -167,25 +192,15 @@ const EpreuvesListPage = () => {
             ))}
           </div>
 
-          {/* Pagination */}
-          {epreuvesData && epreuvesData.count > 10 && (
-            <div className="flex items-center justify-center space-x-4">
-              <button
-                onClick={() => setPage((p) => Math.max(1, p - 1))}
-                disabled={!epreuvesData.previous}
-                className="btn-secondary disabled:opacity-50"
-              >
-                Précédent
-              </button>
-              <span className="text-gray-600">
-                Page {page} sur {Math.ceil(epreuvesData.count / 10)}
-              </span>
+          {/* Page suivante (défilement ou bouton) */}
+          {hasNextPage && (
+            <div ref={sentinelRef} className="flex items-center justify-center">
               <button
-                onClick={() => setPage((p) => p + 1)}
-                disabled={!epreuvesData.next}
+                onClick={() => fetchNextPage()}
+                disabled={isFetchingNextPage}
                 className="btn-secondary disabled:opacity-50"
               >
-                Suivant
+                {isFetchingNextPage ? 'Chargement...' : 'Charger plus'}
               </button>
             </div>
           )}
@@ -26,12 +26,12 @@ export interface Epreuve {
   taille_fichier_mb?: number
   hash_fichier?: string
   nb_pages?: number
-  texte_extrait?: string
   uploaded_by?: number
   uploaded_by_username?: string
   fichier_url?: string
   download_url?: string
   preview_url?: string
+  apercu_url?: string | null
   created_at: string
   updated_at: string
   nb_vues: number
@@ -105,3 +105,9 @@ export interface PaginatedResponse<T> {
   previous: string | null
   results: T[]
 }
+
+export interface CursorPaginatedResponse<T> {
+  count: number | null
+  next: string | null
+  results: T[]
+}